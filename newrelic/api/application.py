@@ -167,6 +167,10 @@ class Application(object):
                 self._name, message, level, timestamp, attributes=attributes, priority=priority
             )
 
+    def record_log_events(self, events):
+        if self.active and events:
+            self._agent.record_log_events(self._name, events)
+
     def normalize_name(self, name, rule_type="url"):
         if self.active:
             return self._agent.normalize_name(self._name, name, rule_type)
@@ -178,6 +182,18 @@ class Application(object):
 
         return self._agent.compute_sampled(self._name)
 
+    def release_sampled(self, sampled):
+        if not self.active:
+            return
+
+        self._agent.release_sampled(self._name, sampled)
+
+    def should_sample_span_events(self, priority):
+        if not self.active:
+            return False
+
+        return self._agent.should_sample_span_events(self._name, priority)
+
 
 def application_instance(name=None, activate=True):
     return Application._instance(name, activate=activate)
@@ -16,7 +16,7 @@ import functools
 import logging
 
 from newrelic.api.time_trace import TimeTrace, current_trace
-from newrelic.common.async_wrapper import async_wrapper as get_async_wrapper
+from newrelic.common.async_wrapper import cached_async_wrapper
 from newrelic.common.object_wrapper import FunctionWrapper, wrap_object
 from newrelic.core.database_node import DatabaseNode
 from newrelic.core.stack_trace import current_stack
@@ -235,8 +235,10 @@ class DatabaseTrace(TimeTrace):
 
 
 def DatabaseTraceWrapper(wrapped, sql, dbapi2_module=None, async_wrapper=None):
+    get_async_wrapper = cached_async_wrapper(async_wrapper)
+
     def _nr_database_trace_wrapper_(wrapped, instance, args, kwargs):
-        wrapper = async_wrapper if async_wrapper is not None else get_async_wrapper(wrapped)
+        wrapper = get_async_wrapper(wrapped)
         if not wrapper:
             parent = current_trace()
             if not parent:
@@ -15,7 +15,7 @@
 import functools
 
 from newrelic.api.time_trace import TimeTrace, current_trace
-from newrelic.common.async_wrapper import async_wrapper as get_async_wrapper
+from newrelic.common.async_wrapper import cached_async_wrapper
 from newrelic.common.object_wrapper import FunctionWrapper, wrap_object
 from newrelic.core.datastore_node import DatastoreNode
 
@@ -174,8 +174,10 @@ def DatastoreTraceWrapper(wrapped, product, target, operation, host=None, port_p
 
     """
 
+    get_async_wrapper = cached_async_wrapper(async_wrapper)
+
     def _nr_datastore_trace_wrapper_(wrapped, instance, args, kwargs):
-        wrapper = async_wrapper if async_wrapper is not None else get_async_wrapper(wrapped)
+        wrapper = get_async_wrapper(wrapped)
         if not wrapper:
             parent = current_trace()
             if not parent:
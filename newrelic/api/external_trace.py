@@ -16,7 +16,7 @@ import functools
 
 from newrelic.api.cat_header_mixin import CatHeaderMixin
 from newrelic.api.time_trace import TimeTrace, current_trace
-from newrelic.common.async_wrapper import async_wrapper as get_async_wrapper
+from newrelic.common.async_wrapper import cached_async_wrapper
 from newrelic.common.object_wrapper import FunctionWrapper, wrap_object
 from newrelic.core.external_node import ExternalNode
 
@@ -67,8 +67,10 @@ class ExternalTrace(CatHeaderMixin, TimeTrace):
 
 
 def ExternalTraceWrapper(wrapped, library, url, method=None, async_wrapper=None):
+    get_async_wrapper = cached_async_wrapper(async_wrapper)
+
     def dynamic_wrapper(wrapped, instance, args, kwargs):
-        wrapper = async_wrapper if async_wrapper is not None else get_async_wrapper(wrapped)
+        wrapper = get_async_wrapper(wrapped)
         if not wrapper:
             parent = current_trace()
             if not parent:
@@ -103,7 +105,7 @@ def ExternalTraceWrapper(wrapped, library, url, method=None, async_wrapper=None)
             return wrapped(*args, **kwargs)
 
     def literal_wrapper(wrapped, instance, args, kwargs):
-        wrapper = async_wrapper if async_wrapper is not None else get_async_wrapper(wrapped)
+        wrapper = get_async_wrapper(wrapped)
         if not wrapper:
             parent = current_trace()
             if not parent:
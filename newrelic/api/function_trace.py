@@ -15,7 +15,7 @@
 import functools
 
 from newrelic.api.time_trace import TimeTrace, current_trace
-from newrelic.common.async_wrapper import async_wrapper as get_async_wrapper
+from newrelic.common.async_wrapper import cached_async_wrapper
 from newrelic.common.object_names import callable_name
 from newrelic.common.object_wrapper import FunctionWrapper, wrap_object
 from newrelic.core.function_node import FunctionNode
@@ -90,8 +90,10 @@ class FunctionTrace(TimeTrace):
 
 
 def FunctionTraceWrapper(wrapped, name=None, group=None, label=None, params=None, terminal=False, rollup=None, async_wrapper=None):
+    get_async_wrapper = cached_async_wrapper(async_wrapper)
+
     def dynamic_wrapper(wrapped, instance, args, kwargs):
-        wrapper = async_wrapper if async_wrapper is not None else get_async_wrapper(wrapped)
+        wrapper = get_async_wrapper(wrapped)
         if not wrapper:
             parent = current_trace()
             if not parent:
@@ -147,7 +149,7 @@ def FunctionTraceWrapper(wrapped, name=None, group=None, label=None, params=None
             return wrapped(*args, **kwargs)
 
     def literal_wrapper(wrapped, instance, args, kwargs):
-        wrapper = async_wrapper if async_wrapper is not None else get_async_wrapper(wrapped)
+        wrapper = get_async_wrapper(wrapped)
         if not wrapper:
             parent = current_trace()
             if not parent:
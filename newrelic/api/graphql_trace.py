@@ -16,7 +16,7 @@ import functools
 
 from newrelic.api.time_trace import TimeTrace, current_trace
 from newrelic.api.transaction import current_transaction
-from newrelic.common.async_wrapper import async_wrapper as get_async_wrapper
+from newrelic.common.async_wrapper import cached_async_wrapper
 from newrelic.common.object_wrapper import FunctionWrapper, wrap_object
 from newrelic.core.graphql_node import GraphQLOperationNode, GraphQLResolverNode
 
@@ -110,8 +110,10 @@ class GraphQLOperationTrace(TimeTrace):
 
 
 def GraphQLOperationTraceWrapper(wrapped, async_wrapper=None):
+    get_async_wrapper = cached_async_wrapper(async_wrapper)
+
     def _nr_graphql_trace_wrapper_(wrapped, instance, args, kwargs):
-        wrapper = async_wrapper if async_wrapper is not None else get_async_wrapper(wrapped)
+        wrapper = get_async_wrapper(wrapped)
         if not wrapper:
             parent = current_trace()
             if not parent:
@@ -200,8 +202,10 @@ class GraphQLResolverTrace(TimeTrace):
 
 
 def GraphQLResolverTraceWrapper(wrapped, async_wrapper=None):
+    get_async_wrapper = cached_async_wrapper(async_wrapper)
+
     def _nr_graphql_trace_wrapper_(wrapped, instance, args, kwargs):
-        wrapper = async_wrapper if async_wrapper is not None else get_async_wrapper(wrapped)
+        wrapper = get_async_wrapper(wrapped)
         if not wrapper:
             parent = current_trace()
             if not parent:
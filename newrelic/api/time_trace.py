@@ -23,6 +23,7 @@ import warnings
 from newrelic.api.settings import STRIP_EXCEPTION_MESSAGE
 from newrelic.common.object_names import parse_exc_info
 from newrelic.core.attribute import MAX_NUM_USER_ATTRIBUTES, process_user_attribute
+from newrelic.core.aggregate_node import AggregateNode, aggregate_key
 from newrelic.core.code_level_metrics import (
     extract_code_from_callable,
     extract_code_from_traceback,
@@ -40,6 +41,8 @@ class TimeTrace(object):
         self.root = None
         self.child_count = 0
         self.children = []
+        self.aggregated_child_count = 0
+        self.aggregate_nodes = None
         self.start_time = 0.0
         self.end_time = 0.0
         self.duration = 0.0
@@ -69,7 +72,7 @@ class TimeTrace(object):
         return transaction and transaction.settings
 
     def _is_leaf(self):
-        return self.child_count == len(self.children)
+        return self.child_count == self.completed_child_count()
 
     def __repr__(self):
         return "<%s object at 0x%x %s>" % (self.__class__.__name__, id(self), dict(name=getattr(self, "name", None)))
@@ -478,8 +481,13 @@ class TimeTrace(object):
     def _add_agent_attribute(self, key, value):
         self.agent_attributes[key] = value
 
+    def completed_child_count(self):
+        # Children which have been aggregated into another node are not
+        # held in the list of children, so must be counted separately.
+        return len(self.children) + self.aggregated_child_count
+
     def has_outstanding_children(self):
-        return len(self.children) != self.child_count
+        return self.completed_child_count() != self.child_count
 
     def _ready_to_complete(self):
         # we shouldn't continue if we're still running
@@ -556,7 +564,7 @@ class TimeTrace(object):
         node = self.create_node()
 
         if node:
-            transaction._process_node(node)
+            transaction._process_node(node, parent.guid)
             parent.process_child(node, self.is_async)
 
         # ----------------------------------------------------------------------
@@ -606,13 +614,13 @@ class TimeTrace(object):
             self.parent.update_async_exclusive_time(min_child_start_time, exclusive_duration_remaining)
 
     def process_child(self, node, is_async):
-        self.children.append(node)
+        self.add_child_node(node)
         if is_async:
             # record the lowest start time
             self.min_child_start_time = min(self.min_child_start_time, node.start_time)
 
             # if there are no children running, finalize exclusive time
-            if self.child_count == len(self.children):
+            if self.child_count == self.completed_child_count():
                 exclusive_duration = node.end_time - self.min_child_start_time
 
                 self.update_async_exclusive_time(self.min_child_start_time, exclusive_duration)
@@ -622,12 +630,41 @@ class TimeTrace(object):
         else:
             self.exclusive -= node.duration
 
+    def add_child_node(self, node):
+        # Once the transaction has more segments than its budget allows,
+        # sibling segments which would generate the same metrics are
+        # aggregated into a single node, so that the memory used by the
+        # transaction no longer grows with every call made.
+
+        root = self.root
+        transaction = root and root.transaction
+        settings = transaction and transaction.settings
+
+        if settings:
+            maximum = settings.agent_limits.segments_per_transaction
+            if maximum is not None and transaction._trace_node_count > maximum:
+                key = aggregate_key(node, transaction)
+                if key is not None:
+                    if self.aggregate_nodes is None:
+                        self.aggregate_nodes = {}
+
+                    aggregate = self.aggregate_nodes.get(key)
+                    if aggregate is None:
+                        self.aggregate_nodes[key] = aggregate = AggregateNode(node)
+                        self.children.append(aggregate)
+                    else:
+                        aggregate.aggregate(node)
+                        self.aggregated_child_count += 1
+                    return
+
+        self.children.append(node)
+
     def increment_child_count(self):
         self.child_count += 1
 
         # if there's more than 1 child node outstanding
         # then the children are async w.r.t each other
-        if (self.child_count - len(self.children)) > 1:
+        if (self.child_count - self.completed_child_count()) > 1:
             self.has_async_children = True
         # else, the current trace that's being scheduled is not going to be
         # async. note that this implies that all previous traces have
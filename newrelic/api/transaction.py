@@ -69,6 +69,7 @@ from newrelic.core.config import (
 )
 from newrelic.core.custom_event import create_custom_event
 from newrelic.core.log_event_node import LogEventNode
+from newrelic.core.log_line_counter import log_line_metrics
 from newrelic.core.stack_trace import exception_stack
 from newrelic.core.stats_engine import CustomMetrics, DimensionalMetrics, SampledDataSet
 from newrelic.core.thread_utilization import utilization_tracker
@@ -294,6 +295,8 @@ class Transaction(object):
         self.tracestate = ""
         self._priority = None
         self._sampled = None
+        self._sampled_up_front = False
+        self._span_intrinsics = None
 
         self._distributed_trace_state = 0
 
@@ -321,6 +324,7 @@ class Transaction(object):
 
         self._custom_metrics = CustomMetrics()
         self._dimensional_metrics = DimensionalMetrics()
+        self._log_line_counts = {}
 
         global_settings = application.global_settings
 
@@ -558,6 +562,9 @@ class Transaction(object):
         for key, value in six.iteritems(self._transaction_metrics):
             self.record_custom_metric(key, {"count": value})
 
+        if self._log_line_counts:
+            self.record_custom_metrics(log_line_metrics(self._log_line_counts))
+
         if self._frameworks:
             for framework, version in self._frameworks:
                 self.record_custom_metric("Python/Framework/%s/%s" % (framework, version), 1)
@@ -1285,9 +1292,18 @@ class Transaction(object):
 
         priority = data.get("pr")
         if priority is not None:
+            if self._sampled_up_front:
+                # Sampling was decided up front for generating span events,
+                # but is decided by the payload instead, so the decision of
+                # the adaptive sampler is handed back.
+                self._sampled_up_front = False
+                self._application.release_sampled(self._sampled)
+
             self._priority = priority
             self._sampled = data.get("sa")
 
+        self._span_intrinsics = None
+
         if "ti" in data:
             transport_start = data["ti"] / 1000.0
 
@@ -1702,15 +1718,17 @@ class Transaction(object):
         for name, value in metrics:
             self._custom_metrics.record_custom_metric(name, value)
 
+    def record_log_line(self, level_name):
+        # Only counted here, with the Logging/lines metrics being recorded
+        # from the counts when the transaction exits.
+        counts = self._log_line_counts
+        counts[level_name] = counts.get(level_name, 0) + 1
+
     def record_dimensional_metric(self, name, value, tags=None):
         self._dimensional_metrics.record_dimensional_metric(name, value, tags)
 
-    def record_dimensional_metrics(self, metrics):
-        for metric in metrics:
-            name, value = metric[:2]
-            tags = metric[2] if len(metric) >= 3 else None
-
-            self._dimensional_metrics.record_dimensional_metric(name, value, tags)
+    def record_dimensional_metrics(self, metrics, tags=None):
+        self._dimensional_metrics.record_dimensional_metrics(metrics, tags)
 
     def record_custom_event(self, event_type, params):
         settings = self._settings
@@ -1741,11 +1759,14 @@ class Transaction(object):
     def _intern_string(self, value):
         return self._string_cache.setdefault(value, value)
 
-    def _process_node(self, node):
+    def _process_node(self, node, parent_guid=None):
         self._trace_node_count += 1
         node.node_count = self._trace_node_count
         self.total_time += node.exclusive
 
+        if parent_guid is not None and self._should_cache_span_events():
+            node.cache_span_event(self._settings, self._shared_span_intrinsics(), parent_guid)
+
         if type(node) is newrelic.core.database_node.DatabaseNode:
             settings = self._settings
             if not settings:
@@ -1758,8 +1779,59 @@ class Transaction(object):
                 return
             if node.duration < settings.transaction_tracer.explain_threshold:
                 return
+
+            # Past the segment budget, database nodes may be folded into an
+            # aggregate node, but are still held onto for the slow SQL data,
+            # so no more are kept than the budget allows.
+            maximum = settings.agent_limits.segments_per_transaction
+            if maximum is not None and len(self._slow_sql) >= maximum:
+                return
+
             self._slow_sql.append(node)
 
+    def _should_cache_span_events(self):
+        settings = self._settings
+        if not settings:
+            return False
+        if not (settings.distributed_tracing.enabled and settings.span_events.enabled and settings.collect_span_events):
+            return False
+        if settings.infinite_tracing.enabled:
+            return False
+
+        # Past the segment budget, nodes may be folded into an aggregate
+        # node and so never produce a span event of their own.
+        maximum = settings.agent_limits.segments_per_transaction
+        if maximum is not None and self._trace_node_count > maximum:
+            return False
+
+        # Span events are only kept for sampled transactions, so sampling
+        # is decided up front, as it would be when creating an outbound
+        # distributed trace payload. Should an inbound payload then be
+        # accepted, the decision is handed back to the adaptive sampler.
+        if self._sampled is None:
+            self._compute_sampled_and_priority()
+            self._sampled_up_front = True
+
+        if not self._sampled:
+            return False
+
+        # Nor is there any point if the reservoir could not keep the spans.
+        return self._application.should_sample_span_events(self._priority)
+
+    def _shared_span_intrinsics(self):
+        # The intrinsics shared by every span event of the transaction are
+        # only worked out once. Cached span events are regenerated should
+        # they have changed by the time the transaction is recorded.
+        intrinsics = self._span_intrinsics
+        if intrinsics is None:
+            intrinsics = self._span_intrinsics = {
+                "transactionId": self.guid,
+                "traceId": self.trace_id,
+                "sampled": self._sampled,
+                "priority": self._priority,
+            }
+        return intrinsics
+
     def stop_recording(self):
         if not self.enabled:
             return
@@ -16,6 +16,7 @@ from __future__ import print_function
 
 import os
 import sys
+import threading
 import time
 import zlib
 from pprint import pprint
@@ -79,6 +80,88 @@ def _urllib3_ssl_recursion_workaround(wrapped, instance, args, kwargs):
         return wrapped(*args, **kwargs)
 
 
+class ManagedConnectionPoolMixin(object):
+
+    """Connection pool which tracks whether each request reused an open
+    connection, and which closes connections that have sat idle in the pool
+    for longer than idle_timeout rather than risk reusing a connection the
+    server may be about to drop. Connections which have already been closed
+    by the other end are detected by urllib3 when taken from the pool.
+
+    """
+
+    idle_timeout = None
+
+    def __init__(self, *args, **kwargs):
+        super(ManagedConnectionPoolMixin, self).__init__(*args, **kwargs)
+        self._local = threading.local()
+
+    @property
+    def connection_reused(self):
+        return getattr(self._local, "connection_reused", None)
+
+    def _get_conn(self, timeout=None):
+        conn = super(ManagedConnectionPoolMixin, self)._get_conn(timeout)
+
+        reused = getattr(conn, "sock", None) is not None
+        if reused and self.idle_timeout is not None:
+            last_used = getattr(conn, "_nr_last_used", None)
+            if last_used is not None and time.time() - last_used > self.idle_timeout:
+                conn.close()
+                reused = False
+
+        self._local.connection_reused = reused
+        return conn
+
+    def _put_conn(self, conn):
+        if conn is not None:
+            conn._nr_last_used = time.time()
+        super(ManagedConnectionPoolMixin, self)._put_conn(conn)
+
+
+class HTTPConnectionPool(ManagedConnectionPoolMixin, urllib3.HTTPConnectionPool):
+    pass
+
+
+class HTTPSConnectionPool(ManagedConnectionPoolMixin, urllib3.HTTPSConnectionPool):
+    pass
+
+
+# Connection pools shared by all clients talking to the same collector host
+# when persistent connections are enabled, so that open connections survive
+# across harvests and reconnects. Pools are never shared with a forked child
+# process, as the sockets would then be in use by both processes.
+
+_persistent_pools = {}
+_persistent_pools_pid = None
+_persistent_pools_lock = threading.Lock()
+
+
+def persistent_connection_pool(key, factory):
+    global _persistent_pools_pid
+
+    with _persistent_pools_lock:
+        pid = os.getpid()
+        if _persistent_pools_pid != pid:
+            _persistent_pools.clear()
+            _persistent_pools_pid = pid
+
+        pool = _persistent_pools.get(key)
+        if pool is None or pool.pool is None:
+            pool = _persistent_pools[key] = factory()
+
+        return pool
+
+
+def close_persistent_connection_pools():
+    with _persistent_pools_lock:
+        pools = list(_persistent_pools.values())
+        _persistent_pools.clear()
+
+    for pool in pools:
+        pool.close()
+
+
 class BaseClient(object):
     AUDIT_LOG_ID = 0
 
@@ -100,6 +183,10 @@ class BaseClient(object):
         max_payload_size_in_bytes=1000000,
         audit_log_fp=None,
         default_content_encoding_header="Identity",
+        connection_pool_size=1,
+        persistent_connections=False,
+        connection_idle_timeout=None,
+        compression_time_budget=None,
     ):
         self._audit_log_fp = audit_log_fp
 
@@ -115,13 +202,23 @@ class BaseClient(object):
     def finalize(self):
         pass
 
+    @property
+    def streaming_payloads(self):
+        return False
+
     @staticmethod
-    def _supportability_request(params, payload, body, compression_time):
+    def _supportability_request(params, payload, body, compression_time, payload_size=None):
+        pass
+
+    @staticmethod
+    def _supportability_connection(reused):
         pass
 
     @classmethod
-    def log_request(cls, fp, method, url, params, payload, headers, body=None, compression_time=None):
-        cls._supportability_request(params, payload, body, compression_time)
+    def log_request(
+        cls, fp, method, url, params, payload, headers, body=None, compression_time=None, payload_size=None
+    ):
+        cls._supportability_request(params, payload, body, compression_time, payload_size)
 
         if not fp:
             return
@@ -230,8 +327,10 @@ class BaseClient(object):
 
 
 class HttpClient(BaseClient):
-    CONNECTION_CLS = urllib3.HTTPSConnectionPool
+    CONNECTION_CLS = HTTPSConnectionPool
     PREFIX_SCHEME = "https://"
+    STREAMING_BUFFER_SIZE = 64 * 1024
+    MAX_TUNED_COMPRESSION_LEVEL = 6
     BASE_HEADERS = urllib3.make_headers(keep_alive=True, accept_encoding=True, user_agent=USER_AGENT)
 
     def __init__(
@@ -252,21 +351,35 @@ class HttpClient(BaseClient):
         max_payload_size_in_bytes=1000000,
         audit_log_fp=None,
         default_content_encoding_header="Identity",
+        connection_pool_size=1,
+        persistent_connections=False,
+        connection_idle_timeout=None,
+        compression_time_budget=None,
     ):
         self._host = host
         port = self._port = port
         self._compression_threshold = compression_threshold
-        self._compression_level = compression_level
         self._compression_method = compression_method
+
+        # The compression level is only tuned when no level is configured.
+        if compression_level is None and compression_time_budget:
+            compression_level = self.MAX_TUNED_COMPRESSION_LEVEL
+        else:
+            compression_time_budget = None
+        self._compression_level = compression_level
+        self._compression_time_budget = compression_time_budget
         self._max_payload_size_in_bytes = max_payload_size_in_bytes
         self._audit_log_fp = audit_log_fp
         self._default_content_encoding_header = default_content_encoding_header
+        self._persistent_connections = persistent_connections
+        self._connection_idle_timeout = connection_idle_timeout
 
         self._prefix = ""
 
         self._headers = dict(self.BASE_HEADERS)
         self._connection_kwargs = connection_kwargs = {
             "timeout": timeout,
+            "maxsize": connection_pool_size,
         }
         self._urlopen_kwargs = urlopen_kwargs = {}
 
@@ -314,6 +427,8 @@ class HttpClient(BaseClient):
         self._proxy = proxy
 
         self._connection_attr = None
+        self._connection_lock = threading.Lock()
+        self._compression_level_lock = threading.Lock()
 
     @staticmethod
     def _parse_proxy(scheme, host, port, username, password):
@@ -348,7 +463,8 @@ class HttpClient(BaseClient):
 
     def __exit__(self, exc, value, tb):
         if self._connection_attr:
-            self._connection_attr.__exit__(exc, value, tb)
+            if not self._persistent_connections:
+                self._connection_attr.__exit__(exc, value, tb)
             self._connection_attr = None
 
     @property
@@ -356,15 +472,29 @@ class HttpClient(BaseClient):
         if self._connection_attr:
             return self._connection_attr
 
-        retries = urllib3.Retry(total=False, connect=None, read=None, redirect=0, status=None)
-        self._connection_attr = self.CONNECTION_CLS(
-            self._host, self._port, strict=True, retries=retries, **self._connection_kwargs
-        )
+        # Harvest payloads may be sent from multiple threads at once, so
+        # make sure only one connection pool is ever created.
+        with self._connection_lock:
+            if not self._connection_attr:
+                if self._persistent_connections:
+                    key = (self.CONNECTION_CLS, self._host, self._port, repr(sorted(self._connection_kwargs.items())))
+                    self._connection_attr = persistent_connection_pool(key, self._create_connection_pool)
+                else:
+                    self._connection_attr = self._create_connection_pool()
         return self._connection_attr
 
+    def _create_connection_pool(self):
+        retries = urllib3.Retry(total=False, connect=None, read=None, redirect=0, status=None)
+        pool = self.CONNECTION_CLS(self._host, self._port, strict=True, retries=retries, **self._connection_kwargs)
+        pool.idle_timeout = self._connection_idle_timeout
+        return pool
+
     def close_connection(self):
+        # A persistent connection pool is left open for use by the next
+        # harvest, or by the next session after a reconnect.
         if self._connection_attr:
-            self._connection_attr.close()
+            if not self._persistent_connections:
+                self._connection_attr.close()
             self._connection_attr = None
 
     def log_request(
@@ -377,19 +507,33 @@ class HttpClient(BaseClient):
         headers,
         body=None,
         compression_time=None,
+        payload_size=None,
     ):
         if not self._prefix:
             url = self.CONNECTION_CLS.scheme + "://" + self._host + url
 
-        return super(HttpClient, self).log_request(fp, method, url, params, payload, headers, body, compression_time)
+        return super(HttpClient, self).log_request(
+            fp, method, url, params, payload, headers, body, compression_time, payload_size
+        )
+
+    @property
+    def streaming_payloads(self):
+        # The audit log records the full uncompressed payload, so payloads
+        # are only streamed when it is disabled.
+        return not self._audit_log_fp
 
     @staticmethod
-    def _compress(data, method="gzip", level=None):
-        compression_start = time.time()
+    def _compressor(method="gzip", level=None):
         level = level or zlib.Z_DEFAULT_COMPRESSION
         wbits = 31 if method == "gzip" else 15
 
-        compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+        return zlib.compressobj(level, zlib.DEFLATED, wbits)
+
+    @classmethod
+    def _compress(cls, data, method="gzip", level=None):
+        compression_start = time.time()
+
+        compressor = cls._compressor(method, level)
         data = compressor.compress(data)
         data += compressor.flush()
 
@@ -397,6 +541,85 @@ class HttpClient(BaseClient):
 
         return data, compression_time
 
+    def _tune_compression_level(self, payload_size, compression_time):
+        # Steps the compression level down while compressing a MiB of
+        # payload takes longer than the time budget, and back up towards
+        # the zlib default while it takes less than half of it. As payloads
+        # are compressed by the threads sending the harvest, this bounds the
+        # CPU time spent on compression in exchange for larger request
+        # bodies. Payloads may be sent concurrently, so each step is taken
+        # under a lock.
+
+        if not self._compression_time_budget or not payload_size:
+            return
+
+        time_per_mb = compression_time * 1024 * 1024 / payload_size
+
+        with self._compression_level_lock:
+            level = self._compression_level
+
+            if time_per_mb > self._compression_time_budget:
+                level = max(level - 1, 1)
+            elif time_per_mb < self._compression_time_budget / 2:
+                level = min(level + 1, self.MAX_TUNED_COMPRESSION_LEVEL)
+
+            self._compression_level = level
+
+    def _compress_chunks(self, chunks):
+        # Encodes and compresses a payload supplied as an iterable of
+        # strings. Chunks are buffered only until the compression threshold
+        # is exceeded, after which they are fed to the compressor as they
+        # are produced. The uncompressed payload is therefore never held in
+        # memory in full. Encoding stops early once the compressed body is
+        # already too large to be sent.
+
+        compressor = None
+        compression_time = None
+        payload_size = 0
+        pending = []
+        pending_size = 0
+        body = []
+        body_size = 0
+
+        for chunk in chunks:
+            chunk = chunk.encode("utf-8")
+            payload_size += len(chunk)
+            pending.append(chunk)
+            pending_size += len(chunk)
+
+            if pending_size < self.STREAMING_BUFFER_SIZE or payload_size <= self._compression_threshold:
+                continue
+
+            if compressor is None:
+                compressor = self._compressor(self._compression_method, self._compression_level)
+                compression_time = 0.0
+
+            compression_start = time.time()
+            data = compressor.compress(b"".join(pending))
+            compression_time += max(time.time(), compression_start) - compression_start
+
+            pending = []
+            pending_size = 0
+            body.append(data)
+            body_size += len(data)
+
+            if body_size > self._max_payload_size_in_bytes:
+                return b"".join(body), payload_size, compression_time
+
+        if compressor is None:
+            if payload_size <= self._compression_threshold:
+                return b"".join(pending), payload_size, None
+
+            compressor = self._compressor(self._compression_method, self._compression_level)
+            compression_time = 0.0
+
+        compression_start = time.time()
+        body.append(compressor.compress(b"".join(pending)))
+        body.append(compressor.flush())
+        compression_time += max(time.time(), compression_start) - compression_start
+
+        return b"".join(body), payload_size, compression_time
+
     def send_request(
         self,
         method="POST",
@@ -417,13 +640,24 @@ class HttpClient(BaseClient):
         path = self._prefix + path
         body = payload
         compression_time = None
+        payload_size = None
         if payload is not None:
-            if len(payload) > self._compression_threshold:
+            if not isinstance(payload, bytes):
+                # Payload is an iterable of string chunks which is encoded
+                # and compressed incrementally.
+                body, payload_size, compression_time = self._compress_chunks(payload)
+                payload = None
+            elif len(payload) > self._compression_threshold:
                 body, compression_time = self._compress(
                     payload,
                     method=self._compression_method,
                     level=self._compression_level,
                 )
+
+            if compression_time is not None:
+                self._tune_compression_level(
+                    len(payload) if payload_size is None else payload_size, compression_time
+                )
                 merged_headers["Content-Encoding"] = self._compression_method
             elif self._default_content_encoding_header:
                 merged_headers["Content-Encoding"] = self._default_content_encoding_header
@@ -437,13 +671,16 @@ class HttpClient(BaseClient):
             merged_headers,
             body,
             compression_time,
+            payload_size,
         )
 
         if body and len(body) > self._max_payload_size_in_bytes:
             return 413, b""
 
+        pool = self._connection
+
         try:
-            response = self._connection.request_encode_url(
+            response = pool.request_encode_url(
                 method, path, fields=params, body=body, headers=merged_headers, **self._urlopen_kwargs
             )
         except urllib3.exceptions.HTTPError as e:
@@ -459,6 +696,9 @@ class HttpClient(BaseClient):
             # interface exception.
             raise NetworkInterfaceException(e)
 
+        if self._persistent_connections:
+            self._supportability_connection(pool.connection_reused)
+
         self.log_response(
             self._audit_log_fp,
             request_id,
@@ -472,7 +712,7 @@ class HttpClient(BaseClient):
 
 
 class InsecureHttpClient(HttpClient):
-    CONNECTION_CLS = urllib3.HTTPConnectionPool
+    CONNECTION_CLS = HTTPConnectionPool
     PREFIX_SCHEME = "http://"
 
     def __init__(
@@ -493,11 +733,15 @@ class InsecureHttpClient(HttpClient):
         max_payload_size_in_bytes=1000000,
         audit_log_fp=None,
         default_content_encoding_header="Identity",
+        connection_pool_size=1,
+        persistent_connections=False,
+        connection_idle_timeout=None,
+        compression_time_budget=None,
     ):
         proxy = self._parse_proxy(proxy_scheme, proxy_host, None, None, None)
         if proxy and proxy.scheme == "https":
             # HTTPS must be used to connect to the proxy
-            self.CONNECTION_CLS = urllib3.HTTPSConnectionPool
+            self.CONNECTION_CLS = HTTPSConnectionPool
         else:
             # Disable any HTTPS specific options
             ca_bundle_path = None
@@ -520,21 +764,29 @@ class InsecureHttpClient(HttpClient):
             max_payload_size_in_bytes,
             audit_log_fp,
             default_content_encoding_header,
+            connection_pool_size,
+            persistent_connections,
+            connection_idle_timeout,
+            compression_time_budget,
         )
 
 
 class SupportabilityMixin(object):
     @staticmethod
-    def _supportability_request(params, payload, body, compression_time):
+    def _supportability_request(params, payload, body, compression_time, payload_size=None):
         # *********
         # Used only for supportability metrics. Do not use to drive business
         # logic!
         # payload: uncompressed
         # body: compressed
+        # payload_size: uncompressed size when the payload was streamed
         agent_method = params and params.get("method")
         # *********
 
-        if agent_method and payload:
+        if payload_size is None:
+            payload_size = len(payload) if payload else 0
+
+        if agent_method and payload_size:
             # Compression was applied
             if compression_time is not None:
                 internal_metric(
@@ -548,10 +800,17 @@ class SupportabilityMixin(object):
                 )
             internal_metric(
                 "Supportability/Python/Collector/%s/Output/Bytes" % agent_method,
-                len(payload),
+                payload_size,
             )
             # Top level metric to aggregate overall bytes being sent
-            internal_metric("Supportability/Python/Collector/Output/Bytes", len(payload))
+            internal_metric("Supportability/Python/Collector/Output/Bytes", payload_size)
+
+    @staticmethod
+    def _supportability_connection(reused):
+        if reused:
+            internal_count_metric("Supportability/Python/Collector/Connection/HandshakesAvoided", 1)
+        elif reused is not None:
+            internal_count_metric("Supportability/Python/Collector/Connection/Handshakes", 1)
 
     @staticmethod
     def _supportability_response(status, exc, connection="direct"):
@@ -137,3 +137,24 @@ def async_wrapper(wrapped):
             return awaitable_generator_wrapper
         else:
             return generator_wrapper
+
+
+def cached_async_wrapper(wrapper=None):
+    # Returns a function for looking up the async wrapper to use when
+    # calling a wrapped function. Working out whether the function is a
+    # coroutine or generator is costly, so is only done on the first
+    # call and the result remembered. This relies on the lookup only
+    # ever being used for the one wrapped function, as is the case for
+    # the trace wrappers, which create one for each function they wrap.
+
+    if wrapper is not None:
+        return lambda wrapped: wrapper
+
+    resolved = []
+
+    def _async_wrapper(wrapped):
+        if not resolved:
+            resolved.append(async_wrapper(wrapped))
+        return resolved[0]
+
+    return _async_wrapper
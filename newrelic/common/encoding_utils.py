@@ -31,6 +31,11 @@ from collections import OrderedDict
 
 from newrelic.packages import six
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 HEXDIGLC_RE = re.compile("^[0-9a-f]+$")
 DELIMITER_FORMAT_RE = re.compile("[ \t]*,[ \t]*")
 PARENT_TYPE = {
@@ -106,6 +111,93 @@ def json_encode(obj, **kwargs):
     return json.dumps(obj, **_kwargs)
 
 
+def _orjson_default(o):
+    if isinstance(o, bytes):
+        return o.decode("latin-1")
+    elif isinstance(o, types.GeneratorType):
+        return list(o)
+    elif hasattr(o, "__iter__"):
+        return list(iter(o))
+    raise TypeError(repr(o) + " is not JSON serializable")
+
+
+def orjson_encode(obj, **kwargs):
+    # Encodes using orjson where possible, with the same handling of byte
+    # strings and iterables as json_encode(). The output is equivalent
+    # JSON, although not byte for byte identical, as orjson does not
+    # escape non ASCII characters and encodes non finite floats as null
+    # rather than the non standard NaN and Infinity. Anything orjson
+    # rejects, such as
+    # integers outside of 64 bits or strings containing lone surrogates,
+    # along with any keyword arguments intended for the json module, is
+    # handed to json_encode() instead.
+
+    if not kwargs:
+        try:
+            return orjson.dumps(obj, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:
+            pass
+
+    return json_encode(obj, **kwargs)
+
+
+JSON_ENCODERS = {"json": json_encode}
+
+if orjson is not None:
+    JSON_ENCODERS["orjson"] = orjson_encode
+
+
+def json_encoder(name="auto"):
+    """Returns the JSON encoding function for the named library. When the
+    name is "auto", or the named library is not installed, the fastest
+    available encoder is used, falling back to the json module.
+
+    """
+
+    encoder = JSON_ENCODERS.get(name)
+    if encoder is None:
+        encoder = JSON_ENCODERS.get("orjson", json_encode)
+    return encoder
+
+
+def json_encode_chunks(obj, depth=2, batch_size=256, encoder=json_encode, **kwargs):
+    """Incrementally JSON encodes the object, yielding string chunks.
+
+    Lists, tuples and generators within the first depth levels of the
+    object are streamed rather than encoded as a whole. The items of the
+    innermost streamed sequences are encoded in batches of batch_size per
+    call to json_encode(), so that the cost of the C encoder is retained
+    while the full JSON string for a large harvest payload never needs to
+    exist in memory. Joining the chunks gives the same result as calling
+    the encoder on the object.
+
+    """
+
+    if depth <= 0 or not isinstance(obj, (list, tuple, types.GeneratorType)):
+        yield encoder(obj, **kwargs)
+        return
+
+    separator = kwargs.get("separators", (",", ":"))[0]
+    items = iter(obj)
+
+    yield "["
+
+    if depth == 1:
+        batch = list(itertools.islice(items, batch_size))
+        while batch:
+            chunk = encoder(batch, **kwargs)[1:-1]
+            batch = list(itertools.islice(items, batch_size))
+            yield chunk + separator if batch else chunk
+    else:
+        for index, item in enumerate(items):
+            if index:
+                yield separator
+            for chunk in json_encode_chunks(item, depth - 1, batch_size, encoder, **kwargs):
+                yield chunk
+
+    yield "]"
+
+
 def json_decode(s, **kwargs):
     # Nothing special to do here at this point but use a wrapper to be
     # consistent with encoding and allow for changes later.
@@ -0,0 +1,112 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module implements a bounded cache for memoizing the results of
+calculations which are repeated for the same inputs, such as SQL
+obfuscation, name normalization and attribute filtering. Lookups are on
+the hot path, so they don't take a lock, with only adding entries doing
+so.
+
+"""
+
+import threading
+from collections import deque
+
+
+class LRUCache(object):
+    """Mapping holding at most maximum entries, evicting those which
+    haven't been used recently when full. Rather than reordering the
+    entries on every lookup, which would need a lock, a lookup only marks
+    the entry as having been used. When an entry must be evicted, entries
+    are visited in the order they were added, and any which have been used
+    since last visited are given a second chance rather than evicted. This
+    approximates discarding the least recently used entry, with each
+    addition only evicting as many entries as it needs to.
+
+    Lookups rely on the operations on the underlying dictionary and lists
+    being atomic. Counts of cache hits and misses are kept for reporting
+    as supportability metrics, but as they are updated without a lock
+    they are only approximate.
+
+    """
+
+    def __init__(self, maximum):
+        self.maximum = maximum
+        self.hits = 0
+        self.misses = 0
+
+        # Each entry is a list of the value and whether it has been used
+        # since last visited for eviction.
+
+        self._entries = {}
+        self._order = deque()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __reduce__(self):
+        # Copies start out empty, as the lock cannot be copied and the
+        # entries can always be calculated again.
+
+        return (self.__class__, (self.maximum,))
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return default
+
+        entry[1] = True
+        self.hits += 1
+
+        return entry[0]
+
+    def put(self, key, value):
+        if self.maximum <= 0:
+            return
+
+        with self._lock:
+            entries = self._entries
+
+            entry = entries.get(key)
+            if entry is not None:
+                entry[0] = value
+                return
+
+            order = self._order
+
+            while len(entries) >= self.maximum:
+                oldest = order.popleft()
+                entry = entries[oldest]
+
+                if entry[1]:
+                    entry[1] = False
+                    order.append(oldest)
+                else:
+                    del entries[oldest]
+
+            entries[key] = [value, False]
+            order.append(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._order.clear()
+
+    def reset_counts(self):
+        hits, misses = self.hits, self.misses
+        self.hits = self.misses = 0
+        return hits, misses
@@ -14,7 +14,9 @@
 
 import collections
 import logging
+import random
 import threading
+import time
 
 try:
     from newrelic.core.infinite_tracing_pb2 import AttributeValue, SpanBatch
@@ -26,12 +28,31 @@ _logger = logging.getLogger(__name__)
 
 
 class StreamBuffer(object):
-    def __init__(self, maxlen, batching=False):
-        self._queue = collections.deque(maxlen=maxlen)
+    """Buffer of spans waiting to be sent over the span stream.
+
+    The buffer is bounded both by the number of spans and, when max_bytes
+    is set, by the serialized size of the spans it holds. The oldest spans
+    are dropped to make room when either limit is reached. With sampling
+    enabled, incoming spans are instead randomly discarded with increasing
+    probability once the buffer is more than half full, so the buffer
+    degrades gradually rather than cycling through its contents.
+
+    """
+
+    def __init__(self, maxlen, batching=False, max_bytes=None, sampling=False):
+        self._queue = collections.deque()
+        self._maxlen = maxlen if maxlen is not None else float("inf")
+        self._max_bytes = max_bytes
+        self._sampling = sampling
+        self._bytes = 0
         self._notify = self.condition()
+        self._waiting = 0
+        self._notified = False
         self._shutdown = False
         self._seen = 0
         self._dropped = 0
+        self._dropped_bytes = 0
+        self._wait_time = [0, 0.0, 0.0, 0.0, 0.0]
         self._settings = None
 
         self.batching = batching
@@ -45,23 +66,96 @@ class StreamBuffer(object):
             self._shutdown = True
             self._notify.notify_all()
 
+    def _pressure(self, size):
+        # Fraction of either limit which would be used after adding an
+        # item of the given size.
+
+        pressure = float(len(self._queue) + 1) / self._maxlen
+        if self._max_bytes:
+            pressure = max(pressure, float(self._bytes + size) / self._max_bytes)
+        return pressure
+
     def put(self, item):
+        size = self._max_bytes and item.ByteSize() or 0
+
         with self._notify:
             if self._shutdown:
                 return
 
             self._seen += 1
 
+            if self._maxlen <= 0 or (self._max_bytes and size > self._max_bytes):
+                self._dropped += 1
+                self._dropped_bytes += size
+                return
+
+            if self._sampling:
+                pressure = self._pressure(size)
+                if pressure > 0.5 and random.random() < 2.0 * pressure - 1.0:
+                    self._dropped += 1
+                    self._dropped_bytes += size
+                    return
+
             # NOTE: dropped can be over-counted as the queue approaches
             # capacity while data is still being transmitted.
             #
             # This is because the length of the queue can be changing as it's
             # being measured.
-            if len(self._queue) >= self._queue.maxlen:
+            while self._queue and (
+                len(self._queue) >= self._maxlen or (self._max_bytes and self._bytes + size > self._max_bytes)
+            ):
+                _, dropped_size, _ = self._queue.popleft()
+                self._bytes -= dropped_size
                 self._dropped += 1
+                self._dropped_bytes += dropped_size
+
+            self._queue.append((item, size, time.time()))
+            self._bytes += size
+
+            # Only wake up the consumer if it is waiting and has not
+            # already been woken. Any further items added before it gets
+            # to run are picked up in the same batch.
+            if self._waiting and not self._notified:
+                self._notified = True
+                self._notify.notify_all()
+
+    def _pop(self, count=None):
+        # Remove up to count items from the front of the queue, recording
+        # how long the oldest of them waited to be sent. Must be called
+        # with the lock held.
+
+        queue = self._queue
+        if count is None or count >= len(queue):
+            entries = list(queue)
+            queue.clear()
+        else:
+            entries = [queue.popleft() for _ in range(count)]
 
-            self._queue.append(item)
-            self._notify.notify_all()
+        if not entries:
+            return entries
+
+        wait_time = time.time() - entries[0][2]
+        stats = self._wait_time
+        if stats[0]:
+            stats[2] = min(stats[2], wait_time)
+            stats[3] = max(stats[3], wait_time)
+        else:
+            stats[2] = stats[3] = wait_time
+        stats[0] += 1
+        stats[1] += wait_time
+        stats[4] += wait_time**2
+
+        self._bytes -= sum(entry[1] for entry in entries)
+
+        return [entry[0] for entry in entries]
+
+    def _wait(self):
+        self._waiting += 1
+        self._notified = False
+        try:
+            self._notify.wait()
+        finally:
+            self._waiting -= 1
 
     def stats(self):
         with self._notify:
@@ -70,6 +164,23 @@ class StreamBuffer(object):
 
         return seen, dropped
 
+    def pressure_stats(self):
+        """Returns and resets the number of bytes dropped from the buffer
+        and the time spans spent waiting in the buffer before being sent,
+        the latter in the form accepted for recording a custom metric.
+
+        """
+
+        with self._notify:
+            dropped_bytes = self._dropped_bytes
+            count, total, minimum, maximum, sum_of_squares = self._wait_time
+            self._dropped_bytes = 0
+            self._wait_time = [0, 0.0, 0.0, 0.0, 0.0]
+
+        wait_time = {"count": count, "total": total, "min": minimum, "max": maximum, "sum_of_squares": sum_of_squares}
+
+        return dropped_bytes, wait_time
+
     def __bool__(self):
         return bool(self._queue)
 
@@ -114,30 +225,21 @@ class StreamBufferIterator(object):
                     raise StopIteration
 
                 if self.batching:
-                    stream_buffer_len = len(self.stream_buffer)
-                    if stream_buffer_len > self.MAX_BATCH_SIZE:
+                    if self.stream_buffer:
                         # Ensure batch size is never more than 100 to prevent issues with serializing large numbers
                         # of spans causing their age to exceed 10 seconds. That would cause them to be rejected
-                        # by the trace observer.
-                        batch = [self.stream_buffer._queue.popleft() for _ in range(self.MAX_BATCH_SIZE)]
-                        return SpanBatch(spans=batch)
-                    elif stream_buffer_len:
-                        # For small span batches empty stream buffer into list and clear queue.
-                        # This is only safe to do under lock which prevents items being added to the queue.
-                        batch = list(self.stream_buffer._queue)
-                        self.stream_buffer._queue.clear()
-                        return SpanBatch(spans=batch)
+                        # by the trace observer. Smaller batches empty the stream buffer, which is only safe to do
+                        # under lock which prevents items being added to the queue.
+                        return SpanBatch(spans=self.stream_buffer._pop(self.MAX_BATCH_SIZE))
 
                 else:
                     # Send items from stream buffer one at a time.
-                    try:
-                        return self.stream_buffer._queue.popleft()
-                    except IndexError:
-                        pass
+                    if self.stream_buffer:
+                        return self.stream_buffer._pop(1)[0]
 
                 # Wait until items are added to the stream buffer.
                 if not self.stream_closed() and not self.stream_buffer:
-                    self._notify.wait()
+                    self.stream_buffer._wait()
 
     next = __next__
 
@@ -160,6 +160,12 @@ _COMPRESSED_CONTENT_ENCODING = {
     "gzip": newrelic.api.settings.COMPRESSED_CONTENT_ENCODING_GZIP,
 }
 
+_JSON_LIBRARY = {
+    "auto": "auto",
+    "json": "json",
+    "orjson": "orjson",
+}
+
 
 def _map_log_level(s):
     return _LOG_LEVEL[s.upper()]
@@ -187,6 +193,10 @@ def _map_compressed_content_encoding(s):
     return _COMPRESSED_CONTENT_ENCODING[s]
 
 
+def _map_json_library(s):
+    return _JSON_LIBRARY[s]
+
+
 def _map_split_strings(s):
     return s.split()
 
@@ -348,6 +358,7 @@ def _process_configuration(section):
     _process_setting(section, "startup_timeout", "getfloat", None)
     _process_setting(section, "shutdown_timeout", "getfloat", None)
     _process_setting(section, "compressed_content_encoding", "get", _map_compressed_content_encoding)
+    _process_setting(section, "json_library", "get", _map_json_library)
     _process_setting(section, "attributes.enabled", "getboolean", None)
     _process_setting(section, "attributes.exclude", "get", _map_inc_excl_attributes)
     _process_setting(section, "attributes.include", "get", _map_inc_excl_attributes)
@@ -468,21 +479,32 @@ def _process_configuration(section):
     _process_setting(section, "local_daemon.socket_path", "get", None)
     _process_setting(section, "local_daemon.synchronous_startup", "getboolean", None)
     _process_setting(section, "agent_limits.transaction_traces_nodes", "getint", None)
+    _process_setting(section, "agent_limits.segments_per_transaction", "getint", None)
     _process_setting(section, "agent_limits.sql_query_length_maximum", "getint", None)
     _process_setting(section, "agent_limits.slow_sql_stack_trace", "getint", None)
     _process_setting(section, "agent_limits.max_sql_connections", "getint", None)
     _process_setting(section, "agent_limits.sql_explain_plans", "getint", None)
     _process_setting(section, "agent_limits.sql_explain_plans_per_harvest", "getint", None)
     _process_setting(section, "agent_limits.slow_sql_data", "getint", None)
+    _process_setting(section, "agent_limits.sql_statement_cache_size", "getint", None)
+    _process_setting(section, "agent_limits.sql_statement_cache_length_maximum", "getint", None)
+    _process_setting(section, "agent_limits.normalization_cache_size", "getint", None)
+    _process_setting(section, "agent_limits.attribute_filter_cache_size", "getint", None)
     _process_setting(section, "agent_limits.merge_stats_maximum", "getint", None)
     _process_setting(section, "agent_limits.errors_per_transaction", "getint", None)
     _process_setting(section, "agent_limits.errors_per_harvest", "getint", None)
+    _process_setting(section, "agent_limits.harvest_send_workers", "getint", None)
+    _process_setting(section, "agent_limits.data_collector_persistent_connections", "getboolean", None)
+    _process_setting(section, "agent_limits.data_collector_streaming_payloads", "getboolean", None)
+    _process_setting(section, "agent_limits.data_collector_pool_size", "getint", None)
+    _process_setting(section, "agent_limits.data_collector_idle_timeout", "getfloat", None)
     _process_setting(section, "agent_limits.slow_transaction_dry_harvests", "getint", None)
     _process_setting(section, "agent_limits.thread_profiler_nodes", "getint", None)
     _process_setting(section, "agent_limits.synthetics_events", "getint", None)
     _process_setting(section, "agent_limits.synthetics_transactions", "getint", None)
     _process_setting(section, "agent_limits.data_compression_threshold", "getint", None)
     _process_setting(section, "agent_limits.data_compression_level", "getint", None)
+    _process_setting(section, "agent_limits.data_compression_time_budget", "getfloat", None)
     _process_setting(section, "console.listener_socket", "get", _map_console_listener_socket)
     _process_setting(section, "console.allow_interpreter_cmd", "getboolean", None)
     _process_setting(section, "debug.disable_api_supportability_metrics", "getboolean", None)
@@ -548,7 +570,10 @@ def _process_configuration(section):
     _process_setting(section, "infinite_tracing.compression", "getboolean", None)
     _process_setting(section, "infinite_tracing.batching", "getboolean", None)
     _process_setting(section, "infinite_tracing.span_queue_size", "getint", None)
+    _process_setting(section, "infinite_tracing.span_queue_byte_size", "getint", None)
+    _process_setting(section, "infinite_tracing.span_queue_sampling", "getboolean", None)
     _process_setting(section, "code_level_metrics.enabled", "getboolean", None)
+    _process_setting(section, "stats_engine.thread_local_workareas", "getboolean", None)
 
     _process_setting(section, "application_logging.enabled", "getboolean", None)
     _process_setting(section, "application_logging.forwarding.max_samples_stored", "getint", None)
@@ -558,9 +583,14 @@ def _process_configuration(section):
     _process_setting(section, "application_logging.forwarding.context_data.exclude", "get", _map_inc_excl_attributes)
     _process_setting(section, "application_logging.metrics.enabled", "getboolean", None)
     _process_setting(section, "application_logging.local_decorating.enabled", "getboolean", None)
+    _process_setting(section, "application_logging.background_processing.enabled", "getboolean", None)
+    _process_setting(section, "application_logging.background_processing.buffer_size", "getint", None)
+    _process_setting(section, "application_logging.background_processing.interval", "getfloat", None)
 
     _process_setting(section, "machine_learning.enabled", "getboolean", None)
     _process_setting(section, "machine_learning.inference_events_value.enabled", "getboolean", None)
+    _process_setting(section, "machine_learning.inference_events_sampling.max_rows", "getint", None)
+    _process_setting(section, "machine_learning.inference_events_sampling.strategy", "get", None)
     _process_setting(section, "ai_monitoring.enabled", "getboolean", None)
     _process_setting(section, "ai_monitoring.record_content.enabled", "getboolean", None)
     _process_setting(section, "ai_monitoring.streaming.enabled", "getboolean", None)
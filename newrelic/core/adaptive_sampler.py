@@ -44,29 +44,71 @@ class AdaptiveSampler(object):
                 self._reset()
 
     def compute_sampled(self):
-        with self._lock:
-            self.reset_if_required()
-            if self.sampled_count >= self.max_sampled:
-                return False
-
-            elif self.sampled_count < self.sampling_target:
-                sampled = random.randrange(
-                        self.computed_count_last) < self.sampling_target
-                if sampled:
-                    self.sampled_count += 1
-            else:
-                sampled = random.randrange(
-                        self.computed_count) < self.adaptive_target
-                if sampled:
-                    self.sampled_count += 1
-
-                    ratio = float(self.sampling_target) / self.sampled_count
-                    self.adaptive_target = (self.sampling_target ** ratio -
-                                            self.sampling_target ** 0.5)
-
-            self.computed_count += 1
+        # The lock is only taken when the sampling period has elapsed or
+        # a transaction is to be sampled. The far more common decision not
+        # to sample is made without it, which keeps transactions in many
+        # threads from contending for the lock. The count of transactions
+        # is then only updated under the global interpreter lock, which
+        # is good enough for estimating the sampling probability.
+
+        if time.time() - self.last_reset >= self.period:
+            with self._lock:
+                self.reset_if_required()
+
+        sampled_count = self.sampled_count
+
+        if sampled_count >= self.max_sampled:
+            return False
+
+        elif sampled_count < self.sampling_target:
+            sampled = random.randrange(
+                    self.computed_count_last) < self.sampling_target
+        else:
+            # The count can have been reset by another thread since the
+            # sampled count was read.
+            sampled = random.randrange(
+                    self.computed_count or 1) < self.adaptive_target
+
+        if sampled:
+            with self._lock:
+                sampled = self._record_sampled()
+
+                if not sampled:
+                    return False
+
+        self.computed_count += 1
         return sampled
 
+    def release_sampled(self, sampled):
+        # Hands back a decision made by compute_sampled() which ended up
+        # not being used. Should the counts have been reset since, those
+        # of the new period are reduced instead, which is good enough for
+        # estimating the sampling probability.
+
+        if sampled:
+            with self._lock:
+                if self.sampled_count > 0:
+                    self.sampled_count -= 1
+
+        if self.computed_count > 0:
+            self.computed_count -= 1
+
+    def _record_sampled(self):
+        # Other threads may have sampled transactions since the decision
+        # to sample was made, so check the maximum has not been reached.
+
+        if self.sampled_count >= self.max_sampled:
+            return False
+
+        self.sampled_count += 1
+
+        if self.sampled_count > self.sampling_target:
+            ratio = float(self.sampling_target) / self.sampled_count
+            self.adaptive_target = (self.sampling_target ** ratio -
+                                    self.sampling_target ** 0.5)
+
+        return True
+
     def _reset(self):
         # For subsequent harvests, collect a max of twice the
         # self.sampling_target value.
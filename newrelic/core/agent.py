@@ -33,6 +33,7 @@ import newrelic
 import newrelic.core.application
 import newrelic.core.config
 import newrelic.packages.six as six
+from newrelic.common.agent_http import close_persistent_connection_pools
 from newrelic.common.log_file import initialize_logging
 from newrelic.core.thread_utilization import thread_utilization_data_source
 from newrelic.samplers.cpu_usage import cpu_usage_data_source
@@ -570,6 +571,13 @@ class Agent(object):
 
         application.record_log_event(message, level, timestamp, attributes=attributes, priority=priority)
 
+    def record_log_events(self, app_name, events):
+        application = self._applications.get(app_name, None)
+        if application is None or not application.active:
+            return
+
+        application.record_log_events(events)
+
     def record_transaction(self, app_name, data):
         """Processes the raw transaction data, generating and recording
         appropriate metrics against the named application. If there has
@@ -599,6 +607,18 @@ class Agent(object):
         application = self._applications.get(app_name, None)
         return application.compute_sampled()
 
+    def release_sampled(self, app_name, sampled):
+        application = self._applications.get(app_name, None)
+        if application is not None:
+            application.release_sampled(sampled)
+
+    def should_sample_span_events(self, app_name, priority):
+        application = self._applications.get(app_name, None)
+        if application is None:
+            return False
+
+        return application.should_sample_span_events(priority)
+
     def _harvest_shutdown_is_set(self):
         try:
             return self._harvest_shutdown.is_set()
@@ -757,6 +777,12 @@ class Agent(object):
         if self._harvest_thread.is_alive():
             self._harvest_thread.join(timeout)
 
+        # Close any persistent connections to the data collector once the
+        # final harvest is done with them.
+
+        if not self._harvest_thread.is_alive():
+            close_persistent_connection_pools()
+
 
 def agent_instance():
     """Returns the agent object. This function should always be used and
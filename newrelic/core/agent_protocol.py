@@ -21,6 +21,8 @@ from newrelic.common.agent_http import ApplicationModeClient, ServerlessModeClie
 from newrelic.common.encoding_utils import (
     json_decode,
     json_encode,
+    json_encode_chunks,
+    json_encoder,
     serverless_payload_encode,
 )
 from newrelic.common.utilization import (
@@ -177,8 +179,14 @@ class AgentProtocol(object):
             compression_threshold=settings.agent_limits.data_compression_threshold,
             compression_level=settings.agent_limits.data_compression_level,
             compression_method=settings.compressed_content_encoding,
+            compression_time_budget=settings.agent_limits.data_compression_time_budget,
             max_payload_size_in_bytes=settings.max_payload_size_in_bytes,
             audit_log_fp=audit_log_fp,
+            connection_pool_size=(
+                settings.agent_limits.data_collector_pool_size or max(settings.agent_limits.harvest_send_workers, 1)
+            ),
+            persistent_connections=settings.agent_limits.data_collector_persistent_connections,
+            connection_idle_timeout=settings.agent_limits.data_collector_idle_timeout,
         )
 
         self._params = {
@@ -200,6 +208,8 @@ class AgentProtocol(object):
 
         self._headers["Content-Type"] = "application/json"
         self._run_token = settings.agent_run_id
+        self._json_encode = json_encoder(settings.json_library)
+        self._streaming_payloads = settings.agent_limits.data_collector_streaming_payloads
 
         # Logging
         self._proxy_host = settings.proxy_host
@@ -270,7 +280,9 @@ class AgentProtocol(object):
         params["method"] = method
         if self._run_token:
             params["run_id"] = self._run_token
-        return params, self._headers, json_encode(payload).encode("utf-8")
+        if self._streaming_payloads and self.client.streaming_payloads:
+            return params, self._headers, json_encode_chunks(payload, encoder=self._json_encode)
+        return params, self._headers, self._json_encode(payload).encode("utf-8")
 
     @staticmethod
     def _connect_payload(app_name, linked_applications, environment, settings):
@@ -550,6 +562,7 @@ class OtlpProtocol(AgentProtocol):
             compression_threshold=settings.agent_limits.data_compression_threshold,
             compression_level=settings.agent_limits.data_compression_level,
             compression_method=settings.compressed_content_encoding,
+            compression_time_budget=settings.agent_limits.data_compression_time_budget,
             max_payload_size_in_bytes=1000000,
             audit_log_fp=audit_log_fp,
             default_content_encoding_header=None,
@@ -117,6 +117,15 @@ class StreamingRpc(object):
     def connect(self):
         self.response_processing_thread.start()
 
+    def record_buffer_metrics(self):
+        dropped_bytes, wait_time = self.stream_buffer.pressure_stats()
+
+        if dropped_bytes:
+            self.record_metric("Supportability/InfiniteTracing/Span/DroppedBytes", {"count": dropped_bytes})
+
+        if wait_time["count"]:
+            self.record_metric("Supportability/InfiniteTracing/Span/QueueTime", wait_time)
+
     def process_responses(self):
         response_iterator = None
 
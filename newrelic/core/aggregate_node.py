@@ -0,0 +1,154 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module implements the node standing in for sibling segments which
+have been aggregated, once a transaction has exceeded its budget for the
+number of segments it keeps.
+
+"""
+
+from collections import namedtuple
+
+from newrelic.core.metric import AggregateTimeMetric
+
+_AggregateRoot = namedtuple('_AggregateRoot', ['path', 'type'])
+_AggregateStats = namedtuple('_AggregateStats', ['settings'])
+
+# Stand in for the transaction path when working out the metrics for a
+# segment, as the path may yet change before the transaction ends.
+
+_PATH = '<path>'
+
+
+def aggregate_key(node, transaction):
+    """Returns the key identifying the segments which can be aggregated
+    with the node, or None if the node cannot be aggregated. This is the
+    type of the node and the metrics it generates, so that the metrics
+    recorded for aggregated segments are the same as if they had been
+    kept. Only leaf segments are aggregated, and only where the duration
+    of the segment is used for all of its metrics.
+
+    """
+
+    if node.children or node.exclusive != node.duration:
+        return None
+
+    root = _AggregateRoot(path=_PATH, type=transaction.type)
+    stats = _AggregateStats(settings=transaction.settings)
+
+    key = [type(node)]
+
+    for metric in node.time_metrics(stats, root, None):
+        if metric.duration != node.duration:
+            return None
+        if metric.exclusive is not None and metric.exclusive != node.duration:
+            return None
+
+        key.append((metric.name, metric.scope))
+
+    return tuple(key)
+
+
+class AggregateNode(object):
+    """Node standing in for sibling segments with the same metrics. The
+    first segment is retained for generating the transaction trace and
+    span event, with the time range of the segment widened to cover all
+    those aggregated. The metrics record the call count and the total,
+    minimum and maximum durations over the aggregated segments.
+
+    """
+
+    children = ()
+
+    def __init__(self, node):
+        self.node = node
+        self.start_time = node.start_time
+        self.end_time = node.end_time
+        self.call_count = 1
+        self.duration = node.duration
+        self.min_duration = node.duration
+        self.max_duration = node.duration
+        self.sum_of_squares = node.duration ** 2
+
+    def __repr__(self):
+        return '<%s object at 0x%x %s>' % (self.__class__.__name__, id(self),
+                dict(node=self.node, call_count=self.call_count))
+
+    @property
+    def name(self):
+        return self.node.name
+
+    @property
+    def guid(self):
+        return self.node.guid
+
+    @property
+    def exclusive(self):
+        # Only leaf segments are aggregated, so all time is exclusive.
+        return self.duration
+
+    def aggregate(self, node):
+        duration = node.duration
+
+        self.start_time = min(self.start_time, node.start_time)
+        self.end_time = max(self.end_time, node.end_time)
+        self.call_count += 1
+        self.duration += duration
+        self.min_duration = min(self.min_duration, duration)
+        self.max_duration = max(self.max_duration, duration)
+        self.sum_of_squares += duration ** 2
+
+    def _standin_node(self):
+        node = self.node._replace(start_time=self.start_time,
+                end_time=self.end_time, duration=self.duration,
+                exclusive=self.duration)
+
+        # Attributes set as the node was created, such as the parsed SQL
+        # statement of a database node, aren't copied by _replace(). Any
+        # span event cached for the first segment is for its time range
+        # alone, so isn't carried over.
+
+        attributes = getattr(self.node, '__dict__', None)
+        if attributes:
+            node.__dict__.update(attributes)
+            node.__dict__.pop('_cached_span_event', None)
+
+        return node
+
+    def time_metrics(self, stats, root, parent):
+        for metric in self.node.time_metrics(stats, root, parent):
+            yield AggregateTimeMetric(name=metric.name, scope=metric.scope,
+                    call_count=self.call_count,
+                    total_call_time=self.duration,
+                    total_exclusive_call_time=self.duration,
+                    min_call_time=self.min_duration,
+                    max_call_time=self.max_duration,
+                    sum_of_squares=self.sum_of_squares)
+
+    def trace_node(self, stats, root, connections):
+        trace_node = self._standin_node().trace_node(stats, root, connections)
+
+        trace_node.params['aggregate_call_count'] = self.call_count
+        trace_node.params['aggregate_min_duration_millis'] = (
+                1000.0 * self.min_duration)
+        trace_node.params['aggregate_max_duration_millis'] = (
+                1000.0 * self.max_duration)
+
+        return trace_node
+
+    def span_event_count(self):
+        return 1
+
+    def span_events(self, *args, **kwargs):
+        return self._standin_node().span_events(*args, **kwargs)
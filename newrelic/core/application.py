@@ -27,12 +27,20 @@ import traceback
 import warnings
 from functools import partial
 
+try:
+    import thread
+except ImportError:
+    import _thread as thread
+
 from newrelic.common.object_names import callable_name
 from newrelic.core.adaptive_sampler import AdaptiveSampler
 from newrelic.core.config import global_settings
 from newrelic.core.custom_event import create_custom_event
 from newrelic.core.data_collector import create_session
-from newrelic.core.database_utils import SQLConnections
+from newrelic.core.database_utils import (
+    SQLConnections,
+    record_sql_statement_cache_metrics,
+)
 from newrelic.core.environment import environment_settings
 from newrelic.core.internal_metrics import (
     InternalTrace,
@@ -40,9 +48,11 @@ from newrelic.core.internal_metrics import (
     internal_count_metric,
     internal_metric,
 )
+from newrelic.core.log_event_buffer import drain_log_event_buffers
+from newrelic.core.log_line_counter import harvest_log_line_metrics
 from newrelic.core.profile_sessions import profile_session_manager
 from newrelic.core.rules_engine import RulesEngine, SegmentCollapseEngine
-from newrelic.core.stats_engine import CustomMetrics, StatsEngine
+from newrelic.core.stats_engine import CustomMetrics, MetricNameCache, StatsEngine
 from newrelic.network.exceptions import (
     DiscardDataForRequest,
     ForceAgentDisconnect,
@@ -51,11 +61,168 @@ from newrelic.network.exceptions import (
     RetryDataForRequest,
 )
 from newrelic.packages import six
+from newrelic.packages.six.moves import queue
 from newrelic.samplers.data_sampler import DataSampler
 
 _logger = logging.getLogger(__name__)
 
 
+class StatsWorkarea(object):
+
+    """Long lived stats engine workarea owned by a single thread. The lock
+    is only ever contended when the harvest thread drains the workarea, so
+    recording a transaction into it does not serialize against other
+    threads recording transactions at the same time.
+
+    """
+
+    def __init__(self, stats):
+        self.lock = threading.Lock()
+        self.stats = stats
+        self.transaction_count = 0
+        self.retired = False
+
+
+class HarvestSendJob(object):
+
+    """A single payload to be sent by a HarvestSendPool, recording any
+    internal metrics or exception from sending it.
+
+    """
+
+    def __init__(self, callback, function, args):
+        self.callback = callback
+        self.function = function
+        self.args = args
+        self.metrics = CustomMetrics()
+        self.exc_info = None
+        self.done = threading.Event()
+
+        if function is None:
+            self.done.set()
+
+    def run(self):
+        with InternalTraceContext(self.metrics):
+            try:
+                self.function(*self.args)
+            except Exception:
+                self.exc_info = sys.exc_info()
+
+        self.done.set()
+
+
+class HarvestSendPool(object):
+
+    """Long lived set of threads owned by an application which send the
+    payloads handed to them by each harvest. Threads are only started as
+    jobs are submitted, up to the maximum number of workers, and are then
+    kept for the harvests which follow.
+
+    """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._queue = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def submit(self, job):
+        with self._lock:
+            if len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._run, name="NR-Harvest-Sender")
+                worker.daemon = True
+                worker.start()
+                self._workers.append(worker)
+
+        self._queue.put(job)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+
+            job.run()
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+
+        for _ in workers:
+            self._queue.put(None)
+
+
+class HarvestSender(object):
+
+    """Sends the payloads for a harvest to the data collector. By default
+    each payload is sent as soon as it is passed to send(). If a pool is
+    given, the payloads are instead handed off to its threads so that they
+    are sent concurrently, while the next payloads are still being
+    prepared. In that case any exception from a send is only raised by
+    wait(), once all payloads have been sent, and it is the exception for
+    the payload which would have been sent first. Callbacks for the
+    payloads which were sent successfully are always run first, so data
+    which did make it to the data collector is not rolled back into the
+    next harvest.
+
+    """
+
+    def __init__(self, internal_metrics, pool=None):
+        self._internal_metrics = internal_metrics
+        self._pool = pool
+        self._jobs = []
+
+    def send(self, callback, function=None, *args):
+        if self._pool is None:
+            if function is not None:
+                function(*args)
+            if callback is not None:
+                callback()
+            return
+
+        job = HarvestSendJob(callback, function, args)
+        self._jobs.append(job)
+
+        if function is not None:
+            self._pool.submit(job)
+
+    def _finish(self):
+        exc_info = None
+
+        jobs, self._jobs = self._jobs, []
+
+        for job in jobs:
+            job.done.wait()
+
+            self._internal_metrics.merge_custom_metrics(job.metrics.metrics())
+
+            if job.exc_info is not None:
+                exc_info = exc_info or job.exc_info
+            elif job.callback is not None:
+                job.callback()
+
+        return exc_info
+
+    def close(self):
+        """Waits for any payloads still being sent when the harvest was
+        aborted before wait() was called. The internal metrics and the
+        callbacks of those which were sent are still processed, but any
+        exception from sending them is not raised.
+
+        """
+
+        try:
+            self._finish()
+        except Exception:
+            _logger.debug("Completing the harvest payloads which were sent failed.", exc_info=True)
+
+    def wait(self):
+        exc_info = self._finish()
+
+        if exc_info is not None:
+            six.reraise(*exc_info)
+
+
 class Application(object):
 
     """Class which maintains recorded data for a single application."""
@@ -106,6 +273,8 @@ class Application(object):
         self._stats_custom_lock = threading.RLock()
         self._stats_custom_engine = StatsEngine()
 
+        self._stats_workareas = {}
+
         self._agent_commands_lock = threading.Lock()
         self._data_samplers_lock = threading.Lock()
         self._data_samplers_started = False
@@ -122,6 +291,12 @@ class Application(object):
             "segment": SegmentCollapseEngine([]),
         }
 
+        # Normalized metric names are remembered across harvests for as
+        # long as the metric rules engine they were derived from is used.
+
+        self._metric_name_cache = None
+        self._metric_name_cache_engine = None
+
         self._data_samplers = []
 
         # Thread profiler and state of whether active or not.
@@ -132,6 +307,8 @@ class Application(object):
 
         self.profile_manager = profile_session_manager()
 
+        self._send_pool = None
+
         self._uninstrumented = []
 
     @property
@@ -156,6 +333,25 @@ class Application(object):
 
         return self.adaptive_sampler.compute_sampled()
 
+    def release_sampled(self, sampled):
+        """Hands back a sampling decision made by compute_sampled() which
+        was not used, as sampling was decided by an inbound distributed
+        trace payload instead.
+
+        """
+
+        if self.adaptive_sampler is not None:
+            self.adaptive_sampler.release_sampled(sampled)
+
+    def should_sample_span_events(self, priority):
+        """Returns whether span events with the given priority could still
+        be kept for the current harvest period. This is checked without
+        taking the stats lock so is only a hint.
+
+        """
+
+        return self._stats_engine.span_events.should_sample(priority)
+
     def dump(self, file):
         """Dumps details about the application to the file object."""
 
@@ -419,9 +615,11 @@ class Application(object):
                             configuration.transaction_name_rules,
                         )
 
-                    self._rules_engine["url"] = RulesEngine(configuration.url_rules)
-                    self._rules_engine["metric"] = RulesEngine(configuration.metric_name_rules)
-                    self._rules_engine["transaction"] = RulesEngine(configuration.transaction_name_rules)
+                    cache_size = configuration.agent_limits.normalization_cache_size
+
+                    self._rules_engine["url"] = RulesEngine(configuration.url_rules, cache_size)
+                    self._rules_engine["metric"] = RulesEngine(configuration.metric_name_rules, cache_size)
+                    self._rules_engine["transaction"] = RulesEngine(configuration.transaction_name_rules, cache_size)
                     self._rules_engine["segment"] = SegmentCollapseEngine(configuration.transaction_segment_terms)
 
                 except Exception:
@@ -956,6 +1154,20 @@ class Application(object):
             if event:
                 self._global_events_account += 1
 
+    def record_log_events(self, events):
+        """Record a batch of log events, each given as a dict of the
+        keyword arguments accepted by record_log_event().
+
+        """
+
+        if not self._active_session:
+            return
+
+        with self._stats_custom_lock:
+            for event in events:
+                if self._stats_engine.record_log_event(**event):
+                    self._global_events_account += 1
+
     def record_transaction(self, data):
         """Record a single transaction against this application."""
 
@@ -988,6 +1200,10 @@ class Application(object):
 
         self.validate_process()
 
+        if settings.stats_engine.thread_local_workareas:
+            self._record_transaction_in_workarea(data, settings)
+            return
+
         internal_metrics = CustomMetrics()
 
         with InternalTraceContext(internal_metrics):
@@ -1040,6 +1256,99 @@ class Application(object):
                     if settings.debug.record_transaction_failure:
                         raise
 
+    def _record_transaction_in_workarea(self, data, settings):
+        """Record a single transaction into the long lived stats workarea
+        of the current thread. The workarea is only merged into the main
+        stats engine when a harvest is performed, so no application wide
+        lock is acquired and no stats engine is created per transaction.
+
+        """
+
+        internal_metrics = CustomMetrics()
+
+        workarea = self._acquire_stats_workarea(settings)
+
+        try:
+            with InternalTraceContext(internal_metrics):
+                with InternalTrace("Supportability/Python/RecordTransaction/Calls/record"):
+                    try:
+                        workarea.stats.record_transaction(data)
+
+                    except Exception:
+                        _logger.exception(
+                            "The generation of transaction data has "
+                            "failed. This would indicate some sort of internal "
+                            "implementation issue with the agent. Please report "
+                            "this problem to New Relic support for further "
+                            "investigation."
+                        )
+
+                        if settings.debug.record_transaction_failure:
+                            raise
+
+            workarea.transaction_count += 1
+            self._last_transaction = data.end_time
+
+            workarea.stats.merge_custom_metrics(internal_metrics.metrics())
+
+        finally:
+            workarea.lock.release()
+
+    def _acquire_stats_workarea(self, settings):
+        """Returns the stats workarea for the current thread with its lock
+        held. A new workarea is created if the thread does not have one,
+        if it was created against a prior agent run, or if it has been
+        retired by the harvest thread.
+
+        """
+
+        thread_id = thread.get_ident()
+
+        while True:
+            workarea = self._stats_workareas.get(thread_id)
+
+            if workarea is None or workarea.stats.settings is not settings:
+                workarea = StatsWorkarea(self._stats_engine.create_workarea())
+
+                with self._stats_lock:
+                    self._stats_workareas[thread_id] = workarea
+
+            workarea.lock.acquire()
+
+            if not workarea.retired:
+                return workarea
+
+            workarea.lock.release()
+
+    def _merge_stats_workareas(self):
+        """Merges the data accumulated in the per thread stats workareas
+        into the main stats engine and returns the number of transactions
+        merged. Workareas which have not recorded a transaction since the
+        prior harvest are retired so they are not retained for threads
+        which have since exited. The caller must hold the stats lock.
+
+        """
+
+        settings = self._stats_engine.settings
+        transaction_count = 0
+
+        for thread_id, workarea in list(six.iteritems(self._stats_workareas)):
+            with workarea.lock:
+                if workarea.transaction_count and workarea.stats.settings is settings:
+                    transaction_count += workarea.transaction_count
+                    workarea.transaction_count = 0
+
+                    self._stats_engine.merge_workarea(workarea.stats)
+                    workarea.stats.reset_stats(settings)
+
+                else:
+                    workarea.retired = True
+
+                    if self._stats_workareas.get(thread_id) is workarea:
+                        del self._stats_workareas[thread_id]
+
+        return transaction_count
+
     def cmd_start_profiler(self, command_id=0, **kwargs):
         """Triggered by the start_profiler agent command to start a
         thread profiling session.
@@ -1181,6 +1490,11 @@ class Application(object):
 
                 _logger.debug("Snapshotting for harvest[%s] of %r.", call_metric, self._app_name)
 
+                # Process any log records still waiting to be turned
+                # into log events so they are included in this harvest.
+
+                drain_log_event_buffers()
+
                 configuration = self._active_session.configuration
                 transaction_count = self._transaction_count
 
@@ -1189,9 +1503,31 @@ class Application(object):
 
                     self._last_transaction = 0.0
 
+                    # When transactions are being recorded into per thread
+                    # workareas, they need to be merged in before taking
+                    # the snapshot.
+
+                    if self._stats_workareas:
+                        transaction_count += self._merge_stats_workareas()
+
                     stats = self._stats_engine.harvest_snapshot(flexible)
 
                 if not flexible:
+                    # Span stream buffer metrics are recorded as custom
+                    # metrics so need to be captured before the snapshot.
+
+                    if configuration.infinite_tracing.enabled:
+                        self._active_session.record_span_stream_metrics()
+
+                    # Log lines counted outside of transactions belong to
+                    # the default application, as the hooks record them
+                    # without looking the application up.
+
+                    if self._app_name == global_settings().app_name:
+                        log_line_metrics = harvest_log_line_metrics()
+                        if log_line_metrics:
+                            self.record_custom_metrics(log_line_metrics)
+
                     with self._stats_custom_lock:
                         global_events_account = self._global_events_account
                         self._global_events_account = 0
@@ -1265,6 +1601,11 @@ class Application(object):
                             internal_count_metric("Supportability/Python/Uninstrumented", 1)
                             internal_count_metric("Supportability/Uninstrumented/%s" % uninstrumented, 1)
 
+                    # Report on the cache of SQL statements, which is shared
+                    # by all applications in the process.
+
+                    record_sql_statement_cache_metrics()
+
                 # Create our time stamp as to when this reporting period
                 # ends and start reporting the data.
 
@@ -1286,6 +1627,18 @@ class Application(object):
                         _logger.debug("Stretching harvest duration for forced harvest on shutdown.")
                         period_end = self._period_start + 1.001
 
+                # Unless disabled, the payloads other than the metric data
+                # are sent concurrently. The audit log is not thread safe
+                # and serverless mode collects the payloads to be written
+                # out at the end, so both of those always send in turn.
+
+                if configuration.audit_log_file or configuration.serverless_mode.enabled:
+                    sender = HarvestSender(internal_metrics)
+                else:
+                    sender = HarvestSender(
+                        internal_metrics, self._harvest_send_pool(configuration.agent_limits.harvest_send_workers)
+                    )
+
                 try:
                     # Send the transaction and custom metric data.
 
@@ -1298,11 +1651,14 @@ class Application(object):
                         if synthetics_events.num_samples:
                             _logger.debug("Sending synthetics event data for harvest of %r.", self._app_name)
 
-                            self._active_session.send_transaction_events(
-                                synthetics_events.sampling_info, synthetics_events
+                            sender.send(
+                                stats.reset_synthetics_events,
+                                self._active_session.send_transaction_events,
+                                synthetics_events.sampling_info,
+                                synthetics_events,
                             )
-
-                        stats.reset_synthetics_events()
+                        else:
+                            stats.reset_synthetics_events()
 
                     if configuration.collect_analytics_events and configuration.transaction_events.enabled:
                         transaction_events = stats.transaction_events
@@ -1319,11 +1675,14 @@ class Application(object):
                             if transaction_events.num_samples:
                                 _logger.debug("Sending analytics event data for harvest of %r.", self._app_name)
 
-                                self._active_session.send_transaction_events(
-                                    transaction_events.sampling_info, transaction_events
+                                sender.send(
+                                    stats.reset_transaction_events,
+                                    self._active_session.send_transaction_events,
+                                    transaction_events.sampling_info,
+                                    transaction_events,
                                 )
-
-                            stats.reset_transaction_events()
+                            else:
+                                stats.reset_transaction_events()
 
                     # Send span events
 
@@ -1344,21 +1703,30 @@ class Application(object):
                         else:
                             spans = stats.span_events
                             if spans:
+
+                                def span_events_sent(spans=spans):
+                                    # As per spec
+                                    spans_seen = spans.num_seen
+                                    spans_sampled = spans.num_samples
+                                    internal_count_metric("Supportability/SpanEvent/TotalEventsSeen", spans_seen)
+                                    internal_count_metric("Supportability/SpanEvent/TotalEventsSent", spans_sampled)
+
+                                    stats.reset_span_events()
+
                                 if spans.num_samples > 0:
                                     span_samples = list(spans)
 
                                     _logger.debug("Sending span event data for harvest of %r.", self._app_name)
 
-                                    self._active_session.send_span_events(spans.sampling_info, span_samples)
+                                    sender.send(
+                                        span_events_sent,
+                                        self._active_session.send_span_events,
+                                        spans.sampling_info,
+                                        span_samples,
+                                    )
                                     span_samples = None
-
-                                # As per spec
-                                spans_seen = spans.num_seen
-                                spans_sampled = spans.num_samples
-                                internal_count_metric("Supportability/SpanEvent/TotalEventsSeen", spans_seen)
-                                internal_count_metric("Supportability/SpanEvent/TotalEventsSent", spans_sampled)
-
-                                stats.reset_span_events()
+                                else:
+                                    sender.send(span_events_sent)
 
                     # Send error events
 
@@ -1369,6 +1737,18 @@ class Application(object):
                     ):
                         error_events = stats.error_events
                         if error_events:
+
+                            def error_events_sent(error_events=error_events):
+                                # As per spec
+                                internal_count_metric(
+                                    "Supportability/Events/TransactionError/Seen", error_events.num_seen
+                                )
+                                internal_count_metric(
+                                    "Supportability/Events/TransactionError/Sent", error_events.num_samples
+                                )
+
+                                stats.reset_error_events()
+
                             num_error_samples = error_events.num_samples
                             if num_error_samples > 0:
                                 error_event_samples = list(error_events)
@@ -1376,14 +1756,15 @@ class Application(object):
                                 _logger.debug("Sending error event data for harvest of %r.", self._app_name)
 
                                 samp_info = error_events.sampling_info
-                                self._active_session.send_error_events(samp_info, error_event_samples)
+                                sender.send(
+                                    error_events_sent,
+                                    self._active_session.send_error_events,
+                                    samp_info,
+                                    error_event_samples,
+                                )
                                 error_event_samples = None
-
-                            # As per spec
-                            internal_count_metric("Supportability/Events/TransactionError/Seen", error_events.num_seen)
-                            internal_count_metric("Supportability/Events/TransactionError/Sent", num_error_samples)
-
-                            stats.reset_error_events()
+                            else:
+                                sender.send(error_events_sent)
 
                     # Send custom events
 
@@ -1391,19 +1772,28 @@ class Application(object):
                         customs = stats.custom_events
 
                         if customs:
+
+                            def custom_events_sent(customs=customs):
+                                # As per spec
+                                internal_count_metric("Supportability/Events/Customer/Seen", customs.num_seen)
+                                internal_count_metric("Supportability/Events/Customer/Sent", customs.num_samples)
+
+                                stats.reset_custom_events()
+
                             if customs.num_samples > 0:
                                 custom_samples = list(customs)
 
                                 _logger.debug("Sending custom event data for harvest of %r.", self._app_name)
 
-                                self._active_session.send_custom_events(customs.sampling_info, custom_samples)
+                                sender.send(
+                                    custom_events_sent,
+                                    self._active_session.send_custom_events,
+                                    customs.sampling_info,
+                                    custom_samples,
+                                )
                                 custom_samples = None
-
-                            # As per spec
-                            internal_count_metric("Supportability/Events/Customer/Seen", customs.num_seen)
-                            internal_count_metric("Supportability/Events/Customer/Sent", customs.num_samples)
-
-                            stats.reset_custom_events()
+                            else:
+                                sender.send(custom_events_sent)
 
                     # Send machine learning events
 
@@ -1411,19 +1801,28 @@ class Application(object):
                         ml_events = stats.ml_events
 
                         if ml_events:
+
+                            def ml_events_sent(ml_events=ml_events):
+                                # As per spec
+                                internal_count_metric("Supportability/Events/Customer/Seen", ml_events.num_seen)
+                                internal_count_metric("Supportability/Events/Customer/Sent", ml_events.num_samples)
+
+                                stats.reset_ml_events()
+
                             if ml_events.num_samples > 0:
                                 ml_event_samples = list(ml_events)
 
                                 _logger.debug("Sending machine learning event data for harvest of %r.", self._app_name)
 
-                                self._active_session.send_ml_events(ml_events.sampling_info, ml_event_samples)
+                                sender.send(
+                                    ml_events_sent,
+                                    self._active_session.send_ml_events,
+                                    ml_events.sampling_info,
+                                    ml_event_samples,
+                                )
                                 ml_event_samples = None
-
-                            # As per spec
-                            internal_count_metric("Supportability/Events/Customer/Seen", ml_events.num_seen)
-                            internal_count_metric("Supportability/Events/Customer/Sent", ml_events.num_samples)
-
-                            stats.reset_ml_events()
+                            else:
+                                sender.send(ml_events_sent)
 
                     # Send log events
 
@@ -1437,20 +1836,29 @@ class Application(object):
                         logs = stats.log_events
 
                         if logs:
+
+                            def log_events_sent(logs=logs):
+                                # As per spec
+                                internal_count_metric("Supportability/Logging/Forwarding/Seen", logs.num_seen)
+                                internal_count_metric("Supportability/Logging/Forwarding/Sent", logs.num_samples)
+                                internal_count_metric("Logging/Forwarding/Dropped", logs.num_seen - logs.num_samples)
+
+                                stats.reset_log_events()
+
                             if logs.num_samples > 0:
                                 log_samples = list(logs)
 
                                 _logger.debug("Sending log event data for harvest of %r.", self._app_name)
 
-                                self._active_session.send_log_events(logs.sampling_info, log_samples)
+                                sender.send(
+                                    log_events_sent,
+                                    self._active_session.send_log_events,
+                                    logs.sampling_info,
+                                    log_samples,
+                                )
                                 log_samples = None
-
-                            # As per spec
-                            internal_count_metric("Supportability/Logging/Forwarding/Seen", logs.num_seen)
-                            internal_count_metric("Supportability/Logging/Forwarding/Sent", logs.num_samples)
-                            internal_count_metric("Logging/Forwarding/Dropped", logs.num_seen - logs.num_samples)
-
-                            stats.reset_log_events()
+                            else:
+                                sender.send(log_events_sent)
 
                     # Send the accumulated error data.
 
@@ -1460,7 +1868,7 @@ class Application(object):
                         if error_data:
                             _logger.debug("Sending error data for harvest of %r.", self._app_name)
 
-                            self._active_session.send_errors(error_data)
+                            sender.send(None, self._active_session.send_errors, error_data)
 
                     if not flexible:
                         if configuration.collect_traces:
@@ -1475,24 +1883,49 @@ class Application(object):
                                     if slow_sql_data:
                                         _logger.debug("Sending slow SQL data for harvest of %r.", self._app_name)
 
-                                        self._active_session.send_sql_traces(slow_sql_data)
+                                        sender.send(None, self._active_session.send_sql_traces, slow_sql_data)
 
                                 slow_transaction_data = stats.transaction_trace_data(connections)
 
                                 if slow_transaction_data:
                                     _logger.debug("Sending slow transaction data for harvest of %r.", self._app_name)
 
-                                    self._active_session.send_transaction_traces(slow_transaction_data)
+                                    sender.send(
+                                        None, self._active_session.send_transaction_traces, slow_transaction_data
+                                    )
 
+                    # The metric data must be sent last, so wait for all the
+                    # other payloads to have been sent. This raises any
+                    # exception from sending them, as if they had been sent
+                    # one after the other.
+
+                    sender.wait()
+
+                    if not flexible:
                         # Create a metric_normalizer based on normalize_name
                         # If metric rename rules are empty, set normalizer
                         # to None and the stats engine will skip steps as
-                        # appropriate.
+                        # appropriate. The metric name cache holds the same
+                        # normalizer, remembering its results across harvests,
+                        # and is replaced whenever the rules engine changes.
 
-                        if self._rules_engine["metric"].rules:
-                            metric_normalizer = partial(self.normalize_name, rule_type="metric")
-                        else:
-                            metric_normalizer = None
+                        metric_rules_engine = self._rules_engine["metric"]
+                        metric_name_cache = self._metric_name_cache
+
+                        if metric_name_cache is None or self._metric_name_cache_engine is not metric_rules_engine:
+                            if metric_rules_engine.rules:
+                                metric_normalizer = partial(self.normalize_name, rule_type="metric")
+                            else:
+                                metric_normalizer = None
+
+                            metric_name_cache = MetricNameCache(
+                                metric_normalizer, configuration.agent_limits.normalization_cache_size
+                            )
+
+                            self._metric_name_cache = metric_name_cache
+                            self._metric_name_cache_engine = metric_rules_engine
+
+                        metric_normalizer = metric_name_cache.normalizer
 
                         # Merge all ready internal metrics
                         stats.merge_custom_metrics(internal_metrics.metrics())
@@ -1505,7 +1938,7 @@ class Application(object):
 
                         _logger.debug("Normalizing metrics for harvest of %r.", self._app_name)
 
-                        metric_data = stats.metric_data(metric_normalizer)
+                        metric_data = stats.metric_data(name_cache=metric_name_cache)
                         dimensional_metric_data = stats.dimensional_metric_data(metric_normalizer)
 
                         _logger.debug("Sending metric data for harvest of %r.", self._app_name)
@@ -1564,7 +1997,10 @@ class Application(object):
                     # The data collector has indicated that we need to
                     # perform an internal agent restart. We attempt to
                     # properly shutdown the session and then initiate a
-                    # new session.
+                    # new session. Any payloads still being sent using the
+                    # session must have been sent before it is shut down.
+
+                    sender.close()
 
                     self.internal_agent_shutdown(restart=True)
 
@@ -1580,6 +2016,8 @@ class Application(object):
                     # again and if the server side kill switch is still
                     # enabled it would be told to disconnect once more.
 
+                    sender.close()
+
                     self.internal_agent_shutdown(restart=False)
 
                 except RetryDataForRequest:
@@ -1603,6 +2041,11 @@ class Application(object):
 
                     internal_metric("Supportability/Python/Harvest/Exception/%s" % callable_name(exc_type), 1)
 
+                    # Payloads already sent must not be rolled back, so
+                    # their callbacks are run first.
+
+                    sender.close()
+
                     if self._period_start != period_end:
                         self._stats_engine.rollback(stats)
 
@@ -1633,6 +2076,11 @@ class Application(object):
                         "New Relic support for further investigation."
                     )
 
+                # Make sure no payloads are still being sent if the harvest
+                # was aborted before waiting on them.
+
+                sender.close()
+
                 duration = time.time() - start
 
                 _logger.debug("Completed harvest[%s] for %r in %.2f seconds.", call_metric, self._app_name, duration)
@@ -1640,7 +2088,8 @@ class Application(object):
                 # Force close the socket connection which has been
                 # created for this harvest if session still exists.
                 # New connection will be create automatically on the
-                # next harvest.
+                # next harvest. When persistent connections are enabled
+                # the connections are instead kept open for reuse.
 
                 if self._active_session:
                     self._active_session.close_connection()
@@ -1652,6 +2101,24 @@ class Application(object):
         with self._stats_lock:
             self._stats_engine.merge_custom_metrics(internal_metrics.metrics())
 
+    def _harvest_send_pool(self, max_workers):
+        """Returns the pool of threads for sending harvest payloads, or
+        None if they are to be sent in turn. The pool is replaced if the
+        number of workers has changed.
+
+        """
+
+        pool = self._send_pool
+
+        if pool is not None and pool.max_workers != max_workers:
+            pool.shutdown()
+            pool = self._send_pool = None
+
+        if pool is None and max_workers > 1:
+            pool = self._send_pool = HarvestSendPool(max_workers)
+
+        return pool
+
     def report_profile_data(self):
         """Report back any profile data."""
 
@@ -1671,6 +2138,12 @@ class Application(object):
 
         self.profile_manager.shutdown(self._app_name)
 
+        # Stop the threads used for sending harvest payloads.
+
+        if self._send_pool is not None:
+            self._send_pool.shutdown()
+            self._send_pool = None
+
         # Attempt to report back any profile data which was left when
         # all profiling was shutdown due to the agent shutdown for this
         # application.
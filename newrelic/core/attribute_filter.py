@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from newrelic.common.lru_cache import LRUCache
+
 # Attribute "destinations" represented as bitfields.
 
 DST_NONE = 0x0
@@ -58,11 +60,17 @@ class AttributeFilter(object):
     #      the bitfield.
     #
     #   4. Return the resulting bitfield after all rules have been applied.
+    #
+    # Rather than testing every rule against the attribute name, the rules
+    # are indexed by name in a prefix tree, so that only the rules which
+    # match are visited. Results are then remembered in a bounded cache, as
+    # the names of attributes can be of high cardinality.
 
     def __init__(self, flattened_settings):
         self.enabled_destinations = self._set_enabled_destinations(flattened_settings)
         self.rules = self._build_rules(flattened_settings)
-        self.cache = {}
+        self.index = self._build_index(self.rules)
+        self.cache = LRUCache(flattened_settings.get("agent_limits.attribute_filter_cache_size", 10000))
 
     def __repr__(self):
         return "<AttributeFilter: destinations: %s, rules: %s>" % (bin(self.enabled_destinations), self.rules)
@@ -136,29 +144,77 @@ class AttributeFilter(object):
 
         return tuple(rules)
 
+    def _build_index(self, rules):
+        # Each node of the prefix tree holds the wildcard rules whose name
+        # is the prefix leading to it, and the non wildcard rules with
+        # exactly that name. As the rules are added in sorted order, the
+        # rules collected while walking down the tree for an attribute
+        # name are also in sorted order.
+
+        root = AttributeFilterIndexNode()
+
+        for rule in rules:
+            node = root
+            for char in rule.name:
+                node = node.children.setdefault(char, AttributeFilterIndexNode())
+
+            if rule.is_wildcard:
+                node.wildcard_rules.append(rule)
+            else:
+                node.exact_rules.append(rule)
+
+        return root
+
+    def _matching_rules(self, name):
+        # Returns the rules matching the attribute name, in the order in
+        # which they are to be applied.
+
+        node = self.index
+        rules = list(node.wildcard_rules)
+
+        for char in name:
+            node = node.children.get(char)
+            if node is None:
+                return rules
+            rules.extend(node.wildcard_rules)
+
+        rules.extend(node.exact_rules)
+
+        return rules
+
     def apply(self, name, default_destinations):
         if self.enabled_destinations == DST_NONE:
             return DST_NONE
 
         cache_index = (name, default_destinations)
 
-        if cache_index in self.cache:
-            return self.cache[cache_index]
+        destinations = self.cache.get(cache_index)
+
+        if destinations is not None:
+            return destinations
 
         destinations = self.enabled_destinations & default_destinations
 
-        for rule in self.rules:
-            if rule.name_match(name):
-                if rule.is_include:
-                    inc_dest = rule.destinations & self.enabled_destinations
-                    destinations |= inc_dest
-                else:
-                    destinations &= ~rule.destinations
+        for rule in self._matching_rules(name):
+            if rule.is_include:
+                inc_dest = rule.destinations & self.enabled_destinations
+                destinations |= inc_dest
+            else:
+                destinations &= ~rule.destinations
 
-        self.cache[cache_index] = destinations
+        self.cache.put(cache_index, destinations)
         return destinations
 
 
+class AttributeFilterIndexNode(object):
+    __slots__ = ("children", "wildcard_rules", "exact_rules")
+
+    def __init__(self):
+        self.children = {}
+        self.wildcard_rules = []
+        self.exact_rules = []
+
+
 class AttributeFilterRule(object):
     def __init__(self, name, destinations, is_include):
         self.name = name.rstrip("*")
@@ -148,6 +148,10 @@ class MachineLearningInferenceEventsValueSettings(Settings):
     pass
 
 
+class MachineLearningInferenceEventsSamplingSettings(Settings):
+    pass
+
+
 class AIMonitoringSettings(Settings):
     @property
     def llm_token_count_callback(self):
@@ -220,6 +224,10 @@ class SlowSqlSettings(Settings):
     pass
 
 
+class StatsEngineSettings(Settings):
+    pass
+
+
 class AgentLimitsSettings(Settings):
     pass
 
@@ -336,6 +344,10 @@ class ApplicationLoggingLocalDecoratingSettings(Settings):
     pass
 
 
+class ApplicationLoggingBackgroundProcessingSettings(Settings):
+    pass
+
+
 class InfiniteTracingSettings(Settings):
     _trace_observer_host = None
 
@@ -428,9 +440,11 @@ _settings.application_logging.forwarding = ApplicationLoggingForwardingSettings(
 _settings.application_logging.forwarding.context_data = ApplicationLoggingForwardingContextDataSettings()
 _settings.application_logging.metrics = ApplicationLoggingMetricsSettings()
 _settings.application_logging.local_decorating = ApplicationLoggingLocalDecoratingSettings()
+_settings.application_logging.background_processing = ApplicationLoggingBackgroundProcessingSettings()
 _settings.application_logging.metrics = ApplicationLoggingMetricsSettings()
 _settings.machine_learning = MachineLearningSettings()
 _settings.machine_learning.inference_events_value = MachineLearningInferenceEventsValueSettings()
+_settings.machine_learning.inference_events_sampling = MachineLearningInferenceEventsSamplingSettings()
 _settings.ai_monitoring = AIMonitoringSettings()
 _settings.ai_monitoring.streaming = AIMonitoringStreamingSettings()
 _settings.ai_monitoring.record_content = AIMonitoringRecordContentSettings()
@@ -467,6 +481,7 @@ _settings.serverless_mode = ServerlessModeSettings()
 _settings.slow_sql = SlowSqlSettings()
 _settings.span_events = SpanEventSettings()
 _settings.span_events.attributes = SpanEventAttributesSettings()
+_settings.stats_engine = StatsEngineSettings()
 _settings.strip_exception_messages = StripExceptionMessageSettings()
 _settings.synthetics = SyntheticsSettings()
 _settings.thread_profiler = ThreadProfilerSettings()
@@ -738,6 +753,7 @@ _settings.sampling_target = 10
 _settings.sampling_target_period_in_seconds = 60
 
 _settings.compressed_content_encoding = "gzip"
+_settings.json_library = "json"
 _settings.max_payload_size_in_bytes = 1000000
 
 _settings.attributes.enabled = True
@@ -820,14 +836,27 @@ _settings.slow_sql.enabled = True
 
 _settings.synthetics.enabled = True
 
+_settings.stats_engine.thread_local_workareas = _environ_as_bool(
+    "NEW_RELIC_STATS_ENGINE_THREAD_LOCAL_WORKAREAS", default=False
+)
+
 _settings.agent_limits.data_collector_timeout = 30.0
+_settings.agent_limits.data_collector_persistent_connections = False
+_settings.agent_limits.data_collector_streaming_payloads = False
+_settings.agent_limits.data_collector_pool_size = None
+_settings.agent_limits.data_collector_idle_timeout = 30.0
 _settings.agent_limits.transaction_traces_nodes = 2000
+_settings.agent_limits.segments_per_transaction = None
 _settings.agent_limits.sql_query_length_maximum = 16384
 _settings.agent_limits.slow_sql_stack_trace = 30
 _settings.agent_limits.max_sql_connections = 4
 _settings.agent_limits.sql_explain_plans = 30
 _settings.agent_limits.sql_explain_plans_per_harvest = 60
 _settings.agent_limits.slow_sql_data = 10
+_settings.agent_limits.sql_statement_cache_size = 1000
+_settings.agent_limits.sql_statement_cache_length_maximum = 4096
+_settings.agent_limits.normalization_cache_size = 10000
+_settings.agent_limits.attribute_filter_cache_size = 10000
 _settings.agent_limits.merge_stats_maximum = None
 _settings.agent_limits.errors_per_transaction = 5
 _settings.agent_limits.errors_per_harvest = 20
@@ -837,6 +866,8 @@ _settings.agent_limits.synthetics_events = 200
 _settings.agent_limits.synthetics_transactions = 20
 _settings.agent_limits.data_compression_threshold = 64 * 1024
 _settings.agent_limits.data_compression_level = None
+_settings.agent_limits.data_compression_time_budget = None
+_settings.agent_limits.harvest_send_workers = 0
 
 _settings.infinite_tracing.trace_observer_host = os.environ.get("NEW_RELIC_INFINITE_TRACING_TRACE_OBSERVER_HOST", None)
 _settings.infinite_tracing.trace_observer_port = _environ_as_int("NEW_RELIC_INFINITE_TRACING_TRACE_OBSERVER_PORT", 443)
@@ -844,6 +875,10 @@ _settings.infinite_tracing.compression = _environ_as_bool("NEW_RELIC_INFINITE_TR
 _settings.infinite_tracing.batching = _environ_as_bool("NEW_RELIC_INFINITE_TRACING_BATCHING", default=True)
 _settings.infinite_tracing.ssl = True
 _settings.infinite_tracing.span_queue_size = _environ_as_int("NEW_RELIC_INFINITE_TRACING_SPAN_QUEUE_SIZE", 10000)
+_settings.infinite_tracing.span_queue_byte_size = _environ_as_int("NEW_RELIC_INFINITE_TRACING_SPAN_QUEUE_BYTE_SIZE", 0)
+_settings.infinite_tracing.span_queue_sampling = _environ_as_bool(
+    "NEW_RELIC_INFINITE_TRACING_SPAN_QUEUE_SAMPLING", default=False
+)
 
 _settings.instrumentation.graphql.capture_introspection_queries = os.environ.get(
     "NEW_RELIC_INSTRUMENTATION_GRAPHQL_CAPTURE_INTROSPECTION_QUERIES", False
@@ -950,10 +985,25 @@ _settings.application_logging.metrics.enabled = _environ_as_bool(
 _settings.application_logging.local_decorating.enabled = _environ_as_bool(
     "NEW_RELIC_APPLICATION_LOGGING_LOCAL_DECORATING_ENABLED", default=False
 )
+_settings.application_logging.background_processing.enabled = _environ_as_bool(
+    "NEW_RELIC_APPLICATION_LOGGING_BACKGROUND_PROCESSING_ENABLED", default=False
+)
+_settings.application_logging.background_processing.buffer_size = _environ_as_int(
+    "NEW_RELIC_APPLICATION_LOGGING_BACKGROUND_PROCESSING_BUFFER_SIZE", 10000
+)
+_settings.application_logging.background_processing.interval = _environ_as_float(
+    "NEW_RELIC_APPLICATION_LOGGING_BACKGROUND_PROCESSING_INTERVAL", 1.0
+)
 _settings.machine_learning.enabled = _environ_as_bool("NEW_RELIC_MACHINE_LEARNING_ENABLED", default=False)
 _settings.machine_learning.inference_events_value.enabled = _environ_as_bool(
     "NEW_RELIC_MACHINE_LEARNING_INFERENCE_EVENT_VALUE_ENABLED", default=False
 )
+_settings.machine_learning.inference_events_sampling.max_rows = _environ_as_int(
+    "NEW_RELIC_MACHINE_LEARNING_INFERENCE_EVENTS_SAMPLING_MAX_ROWS", 0
+)
+_settings.machine_learning.inference_events_sampling.strategy = os.environ.get(
+    "NEW_RELIC_MACHINE_LEARNING_INFERENCE_EVENTS_SAMPLING_STRATEGY", None
+)
 _settings.ai_monitoring.enabled = _environ_as_bool("NEW_RELIC_AI_MONITORING_ENABLED", default=False)
 _settings.ai_monitoring.streaming.enabled = _environ_as_bool("NEW_RELIC_AI_MONITORING_STREAMING_ENABLED", default=True)
 _settings.ai_monitoring.record_content.enabled = _environ_as_bool(
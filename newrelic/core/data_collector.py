@@ -93,6 +93,10 @@ class Session(object):
         if self._rpc:
             self._rpc.close()
 
+    def record_span_stream_metrics(self):
+        if self._rpc:
+            self._rpc.record_buffer_metrics()
+
     def send_transaction_traces(self, transaction_traces):
         """Called to submit transaction traces. The transaction traces
         should be an iterable of individual traces.
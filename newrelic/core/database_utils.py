@@ -23,7 +23,8 @@ import weakref
 
 import newrelic.packages.six as six
 
-from newrelic.core.internal_metrics import internal_metric
+from newrelic.common.lru_cache import LRUCache
+from newrelic.core.internal_metrics import internal_count_metric, internal_metric
 from newrelic.core.config import global_settings
 
 _logger = logging.getLogger(__name__)
@@ -42,18 +43,13 @@ _logger = logging.getLogger(__name__)
 
 _single_quotes_p = r"'(?:[^']|'')*?(?:\\'.*|'(?!'))"
 _double_quotes_p = r'"(?:[^"]|"")*?(?:\\".*|"(?!"))'
-_dollar_quotes_p = r'(\$(?!\d)[^$]*?\$).*?(?:\1|$)'
+_dollar_quotes_p = r'(?P<dollar>\$(?!\d)[^$]*?\$).*?(?:(?P=dollar)|$)'
 _oracle_quotes_p = (r"q'\[.*?(?:\]'|$)|q'\{.*?(?:\}'|$)|"
         r"q'\<.*?(?:\>'|$)|q'\(.*?(?:\)'|$)")
 _any_quotes_p = _single_quotes_p + '|' + _double_quotes_p
 _single_dollar_p = _single_quotes_p + '|' + _dollar_quotes_p
 _single_oracle_p = _single_quotes_p + '|' + _oracle_quotes_p
 
-_single_quotes_re = re.compile(_single_quotes_p)
-_any_quotes_re = re.compile(_any_quotes_p)
-_single_dollar_re = re.compile(_single_dollar_p)
-_single_oracle_re = re.compile(_single_oracle_p)
-
 # Cleanup regexes. Presence of a quote will indicate that the now obfuscated
 # sql was actually malformed.
 
@@ -76,18 +72,48 @@ _single_dollar_cleanup_re = re.compile(_single_dollar_cleanup_p)
 # We add one variation here in that don't want to replace a number that
 # follows on from a ':'. This is because ':1' can be used as positional
 # parameter with database adapters where 'paramstyle' is 'numeric'.
+#
+# Upper and lower case are spelt out rather than using IGNORECASE, as the
+# literals are matched in the same regular expression as the quoted
+# strings, where the oracle q'' quoting is case sensitive.
+
+_uuid_p = r'\{?(?:[0-9a-fA-F]\-?){32}\}?'
+_int_p = r'(?<!:)-?\b(?:[0-9]+\.)?[0-9]+(?:[eE][+-]?[0-9]+)?'
+_hex_p = r'0[xX][0-9a-fA-F]+'
+_bool_p = r'\b(?:[tT][rR][uU][eE]|[fF][aA][lL][sS][eE]|[nN][uU][lL][lL])'
+
+# Quoted strings and all other literals are replaced in a single pass
+# over the SQL, using one regular expression per quoting style. Quoted
+# strings come first in the alternation, so digits and keywords within a
+# string are never matched on their own. As no literal can contain a
+# character which starts a quoted string, this gives the same result as
+# substituting quoted strings first and literals second. The exception
+# is a keyword directly followed by a q'' quoted string, which would
+# have been followed by a '?' and so by a word boundary. The leading
+# lookahead on the characters which can start a match lets the regular
+# expression engine skip over all other positions quickly.
+
+_all_literals_start_p = r'\-{0-9a-fA-FtTnN'
+
+
+def _obfuscate_re(quotes_p, quotes_start_p, word_quotes_p=None):
+    bool_end_p = r'\b'
+    if word_quotes_p:
+        bool_end_p = r'(?:\b|(?=%s))' % word_quotes_p
 
-_uuid_p = r'\{?(?:[0-9a-f]\-?){32}\}?'
-_int_p = r'(?<!:)-?\b(?:[0-9]+\.)?[0-9]+(e[+-]?[0-9]+)?'
-_hex_p = r'0x[0-9a-f]+'
-_bool_p = r'\b(?:true|false|null)\b'
+    # Longest expressions first to avoid the situation of partial matches
+    # on shorter expressions. UUIDs might be an example.
 
-# Join all literals into one compiled regular expression. Longest expressions
-# first to avoid the situation of partial matches on shorter expressions. UUIDs
-# might be an example.
+    literals_p = '|'.join([_uuid_p, _hex_p, _int_p, _bool_p + bool_end_p])
 
-_all_literals_p = '(' + ')|('.join([_uuid_p, _hex_p, _int_p, _bool_p]) + ')'
-_all_literals_re = re.compile(_all_literals_p, re.IGNORECASE)
+    return re.compile(r'(?=[%s%s])(?:%s|%s)' % (quotes_start_p,
+            _all_literals_start_p, quotes_p, literals_p))
+
+
+_single_quotes_re = _obfuscate_re(_single_quotes_p, "'")
+_any_quotes_re = _obfuscate_re(_any_quotes_p, '\'"')
+_single_dollar_re = _obfuscate_re(_single_dollar_p, "'$")
+_single_oracle_re = _obfuscate_re(_single_oracle_p, "'q", _oracle_quotes_p)
 
 _quotes_table = {
     'single': (_single_quotes_re, _single_quotes_cleanup_re),
@@ -101,14 +127,10 @@ def _obfuscate_sql(sql, database):
     quotes_re, quotes_cleanup_re = _quotes_table.get(database.quoting_style,
             (_single_quotes_re, _single_quotes_cleanup_re))
 
-    # Substitute quoted strings first.
+    # Substitute quoted strings and all other sensitive fields.
 
     sql = quotes_re.sub('?', sql)
 
-    # Replace all other sensitive fields
-
-    sql = _all_literals_re.sub('?', sql)
-
     # Determine if the obfuscated query was malformed by searching for
     # remaining quote characters
 
@@ -146,12 +168,8 @@ _normalize_params_3_re = re.compile(_normalize_params_3_p)
 _normalize_values_p = r'\([^)]+\)'
 _normalize_values_re = re.compile(_normalize_values_p)
 
-_normalize_whitespace_1_p = r'\s+'
-_normalize_whitespace_1_re = re.compile(_normalize_whitespace_1_p)
-_normalize_whitespace_2_p = r'\s+(?!\w)'
-_normalize_whitespace_2_re = re.compile(_normalize_whitespace_2_p)
-_normalize_whitespace_3_p = r'(?<!\w)\s+'
-_normalize_whitespace_3_re = re.compile(_normalize_whitespace_3_p)
+_normalize_whitespace_p = r' (?:(?!\w)|(?<!\w ))'
+_normalize_whitespace_re = re.compile(_normalize_whitespace_p)
 
 
 def _normalize_sql(sql):
@@ -173,19 +191,16 @@ def _normalize_sql(sql):
     sql = _normalize_params_2_re.sub('?', sql)
     sql = _normalize_params_3_re.sub('?', sql)
 
-    # Strip leading and trailing white space.
-
-    sql = sql.strip()
-
-    # Collapse multiple white space to single white space.
+    # Strip leading and trailing white space and collapse multiple
+    # white space to single white space.
 
-    sql = _normalize_whitespace_1_re.sub(' ', sql)
+    sql = ' '.join(sql.split())
 
     # Drop spaces adjacent to identifier except for case where
-    # identifiers follow each other.
+    # identifiers follow each other. The lookbehind includes the space
+    # itself so that the pattern starts with a literal character.
 
-    sql = _normalize_whitespace_2_re.sub('', sql)
-    sql = _normalize_whitespace_3_re.sub('', sql)
+    sql = _normalize_whitespace_re.sub('', sql)
 
     return sql
 
@@ -208,7 +223,7 @@ def _extract_identifier(token):
 
 _uncomment_sql_p = r'(?:#|--).*?(?=\r|\n|$)'
 _uncomment_sql_q = r'\/\*(?:[^\/]|\/[^*])*?(?:\*\/|\/\*.*)'
-_uncomment_sql_x = r'(%s)|(%s)' % (_uncomment_sql_p, _uncomment_sql_q)
+_uncomment_sql_x = r'(?=[#/-])(?:(%s)|(%s))' % (_uncomment_sql_p, _uncomment_sql_q)
 _uncomment_sql_re = re.compile(_uncomment_sql_x, re.DOTALL)
 
 
@@ -888,13 +903,27 @@ class SQLStatement(object):
             return self.obfuscated
 
 
-_sql_statements = weakref.WeakValueDictionary()
+# Statements are held onto across transactions so that the same query text
+# isn't parsed, obfuscated and normalized again each time it is executed.
+# Only statements up to a maximum length without any literal values in them
+# are held onto, so that the memory held by the cache stays bounded and the
+# values passed in queries aren't kept beyond their use. Any other
+# statements are only shared for as long as they are still in use. These
+# vary with the values in them, so would rarely be used again anyway.
+
+_sql_statements = LRUCache(0)
+_sql_statements_in_use = weakref.WeakValueDictionary()
 
 
 def sql_statement(sql, dbapi2_module):
     key = (sql, dbapi2_module)
 
-    result = _sql_statements.get(key, None)
+    result = _sql_statements.get(key)
+
+    if result is not None:
+        return result
+
+    result = _sql_statements_in_use.get(key)
 
     if result is not None:
         return result
@@ -902,6 +931,29 @@ def sql_statement(sql, dbapi2_module):
     database = SQLDatabase(dbapi2_module)
     result = SQLStatement(sql, database)
 
-    _sql_statements[key] = result
+    limits = global_settings().agent_limits
+
+    # The statement would be obfuscated when recorded in any case, and if
+    # doing so leaves it unchanged, it has no literal values in it.
+
+    _sql_statements.maximum = limits.sql_statement_cache_size
+
+    if (_sql_statements.maximum > 0 and
+            len(sql) <= limits.sql_statement_cache_length_maximum and
+            result.obfuscated == result.uncommented):
+        _sql_statements.put(key, result)
+    else:
+        _sql_statements_in_use[key] = result
 
     return result
+
+
+def record_sql_statement_cache_metrics():
+    hits, misses = _sql_statements.reset_counts()
+
+    if hits:
+        internal_count_metric('Supportability/Python/DatabaseUtils/Counts/'
+                'sql_statement_cache_hit', hits)
+    if misses:
+        internal_count_metric('Supportability/Python/DatabaseUtils/Counts/'
+                'sql_statement_cache_miss', misses)
@@ -105,16 +105,15 @@ class ExternalNode(_ExternalNode, GenericNodeMixin):
 
         netloc = self.netloc
 
-        try:
-
-            # Remove cross_process_id from the params dict otherwise it shows
-            # up in the UI.
+        # Remove cross_process_id from the params dict otherwise it shows
+        # up in the UI. The values are kept on the node, so that the same
+        # metrics result when they are generated again, as is done when
+        # working out whether segments can be aggregated.
 
+        if 'cross_process_id' in self.params:
             self.cross_process_id = self.params.pop('cross_process_id')
-            self.external_txn_name = self.params.pop('external_txn_name')
-        except KeyError:
-            self.cross_process_id = None
-            self.external_txn_name = None
+            self.external_txn_name = self.params.pop('external_txn_name',
+                    None)
 
         name = 'External/%s/all' % netloc
 
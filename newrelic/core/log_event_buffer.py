@@ -0,0 +1,115 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module implements the buffering of log records for processing in
+the background, so that the thread doing the logging only has to capture
+the record rather than turn it into a log event and metrics.
+
+"""
+
+import collections
+import logging
+import threading
+import time
+import weakref
+
+from newrelic.core.config import global_settings
+
+_logger = logging.getLogger(__name__)
+
+_log_event_buffers = weakref.WeakSet()
+
+
+class LogEventBuffer(object):
+    """Collects entries into a ring buffer per thread. Appending to the
+    buffer of the current thread takes no lock, with the oldest entries
+    being dropped if the buffer is full. The buffers are drained in
+    batches, passing the entries from all threads to the process
+    callable, by a background thread and at the start of each harvest.
+
+    """
+
+    def __init__(self, process):
+        self.process = process
+        self._local = threading.local()
+        self._thread_buffers = []
+        self._lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+        self._drain_thread = None
+
+        _log_event_buffers.add(self)
+
+    def append(self, entry):
+        try:
+            buffer = self._local.buffer
+        except AttributeError:
+            buffer = self._register_thread()
+
+        buffer.append(entry)
+
+    def _register_thread(self):
+        settings = global_settings().application_logging.background_processing
+        buffer = self._local.buffer = collections.deque(maxlen=settings.buffer_size)
+
+        with self._lock:
+            self._thread_buffers.append((threading.current_thread(), buffer))
+
+            if self._drain_thread is None or not self._drain_thread.is_alive():
+                self._drain_thread = threading.Thread(target=self._run, name="NR-Log-Event-Drain")
+                self._drain_thread.daemon = True
+                self._drain_thread.start()
+
+        return buffer
+
+    def _run(self):
+        while True:
+            time.sleep(global_settings().application_logging.background_processing.interval)
+
+            try:
+                self.drain()
+            except Exception:
+                _logger.debug("Processing of buffered log records failed.", exc_info=True)
+
+    def drain(self):
+        with self._drain_lock:
+            with self._lock:
+                thread_buffers = list(self._thread_buffers)
+
+            entries = []
+            finished = set()
+
+            for thread, buffer in thread_buffers:
+                # Entries appended or dropped while the buffer is being
+                # emptied cannot reduce its length below the count taken
+                # here, so it is always safe to pop that many entries.
+                for _ in range(len(buffer)):
+                    entries.append(buffer.popleft())
+
+                if not buffer and not thread.is_alive():
+                    finished.add(id(buffer))
+
+            if finished:
+                with self._lock:
+                    self._thread_buffers = [item for item in self._thread_buffers if id(item[1]) not in finished]
+
+            if entries:
+                self.process(entries)
+
+
+def drain_log_event_buffers():
+    for buffer in list(_log_event_buffers):
+        try:
+            buffer.drain()
+        except Exception:
+            _logger.debug("Processing of buffered log records failed.", exc_info=True)
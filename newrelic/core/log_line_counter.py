@@ -0,0 +1,89 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module implements the counting of log lines recorded outside of
+a transaction for the Logging/lines metrics. Each thread increments its
+own counts by level name without taking any lock, with the counts only
+being turned into custom metrics at the time of a harvest.
+
+"""
+
+import threading
+
+_local = threading.local()
+_thread_counts = []
+_lock = threading.Lock()
+
+
+def log_line_metrics(counts):
+    """Returns the Logging/lines custom metrics for a dictionary of log
+    line counts keyed by level name.
+
+    """
+
+    metrics = [("Logging/lines", {"count": sum(counts.values())})]
+    for level_name, count in counts.items():
+        metrics.append(("Logging/lines/%s" % level_name, {"count": count}))
+    return metrics
+
+
+def _register_thread():
+    counts = _local.counts = {}
+
+    with _lock:
+        _thread_counts.append((threading.current_thread(), counts, {}))
+
+    return counts
+
+
+def record_log_line(level_name):
+    try:
+        counts = _local.counts
+    except AttributeError:
+        counts = _register_thread()
+
+    counts[level_name] = counts.get(level_name, 0) + 1
+
+
+def harvest_log_line_metrics():
+    """Returns the Logging/lines custom metrics for the log lines counted
+    since the last harvest. The counts of each thread only ever increase,
+    so what was already reported is remembered and subtracted instead of
+    the counts being reset underneath the thread incrementing them.
+
+    """
+
+    totals = {}
+
+    with _lock:
+        finished = set()
+
+        for thread, counts, reported in _thread_counts:
+            # Checked before the counts are read so that the final lines
+            # logged by a thread which has since exited are not missed.
+            alive = thread.is_alive()
+
+            for level_name, count in list(counts.items()):
+                delta = count - reported.get(level_name, 0)
+                if delta:
+                    reported[level_name] = count
+                    totals[level_name] = totals.get(level_name, 0) + delta
+
+            if not alive:
+                finished.add(id(counts))
+
+        if finished:
+            _thread_counts[:] = [item for item in _thread_counts if id(item[1]) not in finished]
+
+    return totals and log_line_metrics(totals) or []
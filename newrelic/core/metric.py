@@ -21,3 +21,11 @@ ApdexMetric = namedtuple('ApdexMetric',
 
 TimeMetric = namedtuple('TimeMetric',
         ['name', 'scope', 'duration', 'exclusive'])
+
+# Time metric standing in for a number of calls, as recorded by segments
+# which have been aggregated. The values follow the layout of TimeStats.
+
+AggregateTimeMetric = namedtuple('AggregateTimeMetric',
+        ['name', 'scope', 'call_count', 'total_call_time',
+        'total_exclusive_call_time', 'min_call_time', 'max_call_time',
+        'sum_of_squares'])
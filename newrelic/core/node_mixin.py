@@ -72,8 +72,46 @@ class GenericNodeMixin(object):
         # intrinsics, user attrs, agent attrs
         return [i_attrs, u_attrs, a_attrs]
 
+    def cache_span_event(self, settings, base_attrs, parent_guid=None):
+        # Generate the span event as the node is completed rather than when
+        # the transaction is recorded. The intrinsics shared by every span
+        # in the transaction and the attributes of the node are remembered
+        # as they were, so the event can be regenerated if either changes.
+        event = self.span_event(settings, base_attrs=base_attrs, parent_guid=parent_guid)
+        agent_attributes, user_attributes = self._span_attributes()
+        self._cached_span_event = (settings, base_attrs, (dict(agent_attributes), dict(user_attributes)), event)
+
+    def _pop_cached_span_event(self, settings, base_attrs):
+        cached = self.__dict__.pop("_cached_span_event", None)
+        if not cached or cached[0] is not settings or cached[1] != base_attrs:
+            return None
+
+        # Some hooks only add or change attributes once the call has
+        # returned, after the trace has already completed, such as the
+        # response status of an external call. Any event cached before
+        # then is regenerated.
+        if cached[2] != self._span_attributes():
+            self.__dict__.pop("_processed_user_attributes", None)
+            return None
+
+        return cached[3]
+
+    def _span_attributes(self):
+        return self.agent_attributes, getattr(self, "user_attributes", None) or {}
+
+    def span_event_count(self):
+        count = 1
+        for child in self.children:
+            count += child.span_event_count()
+        return count
+
     def span_events(self, settings, base_attrs=None, parent_guid=None, attr_class=dict):
-        yield self.span_event(settings, base_attrs=base_attrs, parent_guid=parent_guid, attr_class=attr_class)
+        event = attr_class is dict and self._pop_cached_span_event(settings, base_attrs)
+
+        if event:
+            yield event
+        else:
+            yield self.span_event(settings, base_attrs=base_attrs, parent_guid=parent_guid, attr_class=attr_class)
 
         for child in self.children:
             for event in child.span_events(
@@ -166,43 +166,47 @@ def stats_to_otlp_metrics(metric_data, start_time, end_time):
     separate the types and report multiple metrics, one for each type.
     """
     for name, metric_container in metric_data:
+        # Partition the data points for the metric by type in a single pass.
         # Types are checked here using type() instead of isinstance, as CountStats is a subclass of TimeStats.
         # Imporperly checking with isinstance will lead to count metrics being encoded and reported twice.
-        if any(type(metric) is CountStats for metric in metric_container.values()):  # pylint: disable=C0123
+        count_data_points = []
+        time_data_points = []
+        for tags, value in metric_container.items():
+            value_type = type(value)
+            if value_type is CountStats:
+                count_data_points.append(
+                    CountStats_to_otlp_data_point(
+                        value,
+                        start_time=start_time,
+                        end_time=end_time,
+                        attributes=create_key_values_from_iterable(tags),
+                    )
+                )
+            elif value_type is TimeStats:
+                time_data_points.append(
+                    TimeStats_to_otlp_data_point(
+                        value,
+                        start_time=start_time,
+                        end_time=end_time,
+                        attributes=create_key_values_from_iterable(tags),
+                    )
+                )
+
+        if count_data_points:
             # Metric contains Sum metric data points.
             yield Metric(
                 name=name,
                 sum=Sum(
                     aggregation_temporality=AGGREGATION_TEMPORALITY_DELTA,
                     is_monotonic=True,
-                    data_points=[
-                        CountStats_to_otlp_data_point(
-                            value,
-                            start_time=start_time,
-                            end_time=end_time,
-                            attributes=create_key_values_from_iterable(tags),
-                        )
-                        for tags, value in metric_container.items()
-                        if type(value) is CountStats  # pylint: disable=C0123
-                    ],
+                    data_points=count_data_points,
                 ),
             )
-        if any(type(metric) is TimeStats for metric in metric_container.values()):  # pylint: disable=C0123
+        if time_data_points:
             # Metric contains Summary metric data points.
             yield Metric(
                 name=name,
-                summary=Summary(
-                    data_points=[
-                        TimeStats_to_otlp_data_point(
-                            value,
-                            start_time=start_time,
-                            end_time=end_time,
-                            attributes=create_key_values_from_iterable(tags),
-                        )
-                        for tags, value in metric_container.items()
-                        if type(value) is TimeStats  # pylint: disable=C0123
-                    ]
-                ),
+                summary=Summary(data_points=time_data_points),
             )
 
 
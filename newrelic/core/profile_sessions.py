@@ -18,7 +18,7 @@ import os
 import threading
 import time
 import zlib
-from collections import defaultdict, deque
+from collections import defaultdict
 
 import newrelic
 import newrelic.packages.six as six
@@ -41,59 +41,120 @@ class SessionState(object):
     FINISHED = 2
 
 
-def format_stack_trace(frame, thread_category):
-    """Formats the frame obj into a list of stack trace tuples."""
+class MethodTable(object):
+    """Interns the methods seen in stack samples as integer ids. The
+    details of a code object are only looked up the first time it is
+    seen in a sample, after which a frame is mapped to the id of its
+    method by the code object and the offset of the instruction being
+    executed, without having to work out the line number again.
 
-    stack_trace = deque()
+    """
+
+    def __init__(self):
+        # The details of each method, indexed by its id. These are tuples
+        # of the filename, function name, first line and executing line,
+        # as the call tree nodes are reported.
 
-    while frame:
-        # The value frame.f_code.co_firstlineno is the first line of
-        # code in the file for the specified function. The value
-        # frame.f_lineno is the actual line which is being executed
-        # at the time the stack frame was being viewed.
+        self.methods = []
+        self._method_ids = {}
 
-        code = frame.f_code
+        # For each code object, whether it is for agent code along with
+        # the ids of its methods for the instructions being executed,
+        # split by whether they are for a leaf node or an actual call.
 
+        self._code_entries = {}
+
+    def _code_entry(self, code):
         filename = intern(code.co_filename)
         func_name = intern(code.co_name)
-        first_line = code.co_firstlineno
+        is_agent_code = filename.startswith(AGENT_PACKAGE_DIRECTORY)
 
-        real_line = frame.f_lineno
+        entry = self._code_entries[code] = (is_agent_code, filename, func_name, {}, {})
+        return entry
 
-        # Set ourselves up to process next frame back up the stack.
+    def _add_method(self, method_ids, instruction, method):
+        # Instructions on the same line map to the same method, so the
+        # call tree is still merged by line as it is reported.
 
-        frame = frame.f_back
+        method_id = self._method_ids.get(method)
+        if method_id is None:
+            method_id = self._method_ids[method] = len(self.methods)
+            self.methods.append(method)
 
-        # So as to make it more obvious to the user as to what their
-        # code is doing, we drop out stack frames related to the
-        # agent instrumentation. Don't do this for the agent threads
-        # though as we still need to seem them in that case so can
-        # debug what the agent itself is doing.
+        method_ids[instruction] = method_id
+        return method_id
 
-        if thread_category != "AGENT" and filename.startswith(AGENT_PACKAGE_DIRECTORY):
-            continue
+    def stack_ids(self, frame, thread_category):
+        """Returns the list of method ids for the stack of the frame obj,
+        starting from the outermost frame.
 
-        if not stack_trace:
-            # Add the fake leaf node with line number of where the
-            # code was executing at the point of the sample. This
-            # could be actual Python code within the function, or
-            # more likely showing the point where a call is being
-            # made into a C function wrapped as Python object. The
-            # latter can occur because we will not see stack frames
-            # when calling into C functions.
+        """
+
+        code_entries = self._code_entries
+        stack_ids = []
+
+        while frame:
+            code = frame.f_code
+            instruction = frame.f_lasti
+
+            entry = code_entries.get(code)
+            if entry is None:
+                entry = self._code_entry(code)
 
-            stack_trace.appendleft((filename, func_name, real_line, real_line))
+            is_agent_code, filename, func_name, leaf_ids, call_ids = entry
 
-        # Add the actual node for the function being called at this
-        # level in the stack frames.
+            # So as to make it more obvious to the user as to what their
+            # code is doing, we drop out stack frames related to the
+            # agent instrumentation. Don't do this for the agent threads
+            # though as we still need to seem them in that case so can
+            # debug what the agent itself is doing.
 
-        stack_trace.appendleft((filename, func_name, first_line, real_line))
+            if is_agent_code and thread_category != "AGENT":
+                frame = frame.f_back
+                continue
 
-    return stack_trace
+            # The value code.co_firstlineno is the first line of code in
+            # the file for the specified function. The value
+            # frame.f_lineno is the actual line which is being executed
+            # at the time the stack frame was being viewed. It is only
+            # needed the first time an instruction is seen.
 
+            if not stack_ids:
+                # Add the fake leaf node with line number of where the
+                # code was executing at the point of the sample. This
+                # could be actual Python code within the function, or
+                # more likely showing the point where a call is being
+                # made into a C function wrapped as Python object. The
+                # latter can occur because we will not see stack frames
+                # when calling into C functions.
 
-def collect_stack_traces(include_nr_threads=False):
-    """Generator that yields the (thread category, stack trace) of all the
+                method_id = leaf_ids.get(instruction)
+                if method_id is None:
+                    real_line = frame.f_lineno
+                    method = (filename, func_name, real_line, real_line)
+                    method_id = self._add_method(leaf_ids, instruction, method)
+                stack_ids.append(method_id)
+
+            # Add the actual node for the function being called at this
+            # level in the stack frames.
+
+            method_id = call_ids.get(instruction)
+            if method_id is None:
+                method = (filename, func_name, code.co_firstlineno, frame.f_lineno)
+                method_id = self._add_method(call_ids, instruction, method)
+            stack_ids.append(method_id)
+
+            # Set ourselves up to process next frame back up the stack.
+
+            frame = frame.f_back
+
+        stack_ids.reverse()
+
+        return stack_ids
+
+
+def collect_stack_frames(include_nr_threads=False):
+    """Generator that yields the (thread category, frame) of all the
     python threads.
 
     """
@@ -104,17 +165,7 @@ def collect_stack_traces(include_nr_threads=False):
         if (thread_category == "AGENT") and (not include_nr_threads):
             continue
 
-        stack_trace = format_stack_trace(frame, thread_category)
-
-        # Skip over empty stack traces. This is merely for optimization.
-        #
-        # It saves us from adding an empty deque to the txn obj, which will be
-        # discarded later on during call tree merge.
-
-        if not stack_trace:
-            continue
-
-        yield thread_category, stack_trace
+        yield thread_category, frame
 
 
 class ProfileSessionManager(object):
@@ -156,21 +207,18 @@ class ProfileSessionManager(object):
 
         """
 
-        # XXX Only one instance of this at the moment. Also only one harvest
-        # thread so do not need thread locking. If we move to multiple harvest
-        # threads, would need locking.
-
-        # Only one full profile session can run at any given time.
+        # Acquire thread lock before checking and updating the data
+        # structures. This method is invoked from the harvest thread and
+        # this ensures the variables are not being updated concurrently by
+        # the profiler thread.
 
-        if self.full_profile_session:
-            # log an error message
-            return False
+        with self._lock:
 
-        # Acquire thread lock before updating the data structures. This method
-        # is invoked from the harvest thread and this ensures the variables are
-        # not being updated concurrently by the profiler thread.
+            # Only one full profile session can run at any given time.
 
-        with self._lock:
+            if self.full_profile_session:
+                # log an error message
+                return False
 
             self.profile_agent_code = profile_agent_code
             self.sample_period_s = sample_period_s
@@ -245,21 +293,26 @@ class ProfileSessionManager(object):
 
         while True:
 
-            for category, stack in collect_stack_traces(self.profile_agent_code):
+            for category, frame in collect_stack_frames(self.profile_agent_code):
 
-                # Merge the stack_trace to the call tree only for
+                # Merge the stack trace to the call tree only for
                 # full_profile_session.
 
-                if self.full_profile_session:
-                    self.full_profile_session.update_call_tree(category, stack)
+                session = self.full_profile_session
+                if session:
+                    session.add_stack_sample(category, frame)
 
             self.update_profile_sessions()
 
             # Stop the profiler thread if there are no profile sessions.
+            # This is checked with the lock held so that a session being
+            # started at the same time always sees whether the thread is
+            # still running.
 
-            if self.full_profile_session is None:
-                self._profiler_thread_running = False
-                return
+            with self._lock:
+                if self.full_profile_session is None:
+                    self._profiler_thread_running = False
+                    return
 
             self._profiler_shutdown.wait(self.sample_period_s)
 
@@ -298,13 +351,27 @@ class ProfileSession(object):
     def reset_profile_data(self):
         self.call_buckets = {"REQUEST": {}, "AGENT": {}, "BACKGROUND": {}, "OTHER": {}}
         self._node_list = []
+        self._method_table = MethodTable()
         self.start_time_s = time.time()
         self.sample_count = 0
         self.transaction_count = 0
 
+    def add_stack_sample(self, bucket_type, frame):
+        """Merge the stack of the frame obj into a call tree bucket,
+        skipping over empty stack traces.
+
+        """
+
+        stack_trace = self._method_table.stack_ids(frame, bucket_type)
+        if not stack_trace:
+            return False
+
+        return self.update_call_tree(bucket_type, stack_trace)
+
     def update_call_tree(self, bucket_type, stack_trace):
-        """Merge a single call stack trace into a call tree bucket. If
-        no appropriate call tree is found then create a new call tree.
+        """Merge a single call stack trace, as method ids from the
+        method table of the session, into a call tree bucket. If no
+        appropriate call tree is found then create a new call tree.
         An appropriate call tree will have the same root node as the
         last method in the stack trace.
 
@@ -318,13 +385,13 @@ class ProfileSession(object):
         except KeyError:
             return False
 
-        for method in stack_trace:
-            call_tree = bucket.get(method)
+        for method_id in stack_trace:
+            call_tree = bucket.get(method_id)
 
             if call_tree is None:
-                call_tree = CallTree(method, depth=depth)
+                call_tree = CallTree(method_id, depth=depth)
                 self._node_list.append(call_tree)
-                bucket[method] = call_tree
+                bucket[method_id] = call_tree
 
             call_tree.call_count += 1
 
@@ -393,13 +460,15 @@ class ProfileSession(object):
         flat_tree = {}
         thread_count = 0
 
+        methods = self._method_table.methods
+
         for category, bucket in six.iteritems(self.call_buckets):
 
             # Only flatten buckets that have data in them. No need to send
             # empty buckets.
 
             if bucket:
-                flat_tree[category] = [x.flatten() for x in bucket.values()]
+                flat_tree[category] = [x.flatten(methods) for x in bucket.values()]
                 thread_count += len(bucket)
 
         # Construct the actual final data for sending. The actual call
@@ -439,16 +508,16 @@ class ProfileSession(object):
 
 
 class CallTree(object):
-    def __init__(self, method_data, call_count=0, depth=1):
-        self.method_data = method_data
+    def __init__(self, method_id, call_count=0, depth=1):
+        self.method_id = method_id
         self.call_count = call_count
         self.children = {}
 
         self.depth = depth
         self.ignore = False
 
-    def flatten(self):
-        filename, func_name, func_line, exec_line = self.method_data
+    def flatten(self, methods):
+        filename, func_name, func_line, exec_line = methods[self.method_id]
 
         # func_line is the first line of a function and exec_line is the line
         # inside that function that is currently being executed.  On the leaf
@@ -460,7 +529,9 @@ class CallTree(object):
         else:
             method_data = (filename, "%s#%s" % (func_name, func_line), exec_line)
 
-        return [method_data, self.call_count, 0, [x.flatten() for x in self.children.values() if not x.ignore]]
+        children = [x.flatten(methods) for x in self.children.values() if not x.ignore]
+
+        return [method_data, self.call_count, 0, children]
 
 
 def profile_session_manager():
@@ -15,6 +15,14 @@
 import re
 from collections import namedtuple
 
+from newrelic.common.lru_cache import LRUCache
+
+# Patterns which cannot safely be combined with others into one regular
+# expression, as they refer to groups by number or name, or set flags
+# which would then apply to the other patterns as well.
+
+_UNCOMBINABLE_RE = re.compile(r"\\[1-9]|\(\?P=|\(\?[aiLmsux]+\)")
+
 _NormalizationRule = namedtuple(
     "_NormalizationRule",
     ["match_expression", "replacement", "ignore", "eval_order", "terminate_chain", "each_segment", "replace_all"],
@@ -55,7 +63,7 @@ class NormalizationRule(_NormalizationRule):
 
 
 class RulesEngine(object):
-    def __init__(self, rules):
+    def __init__(self, rules, cache_size=10000):
         self.__rules = []
 
         for rule in rules:
@@ -67,11 +75,70 @@ class RulesEngine(object):
 
         self.__rules = sorted(self.__rules, key=lambda rule: rule.eval_order)
 
+        # The match expressions of all rules are combined into a single
+        # regular expression for whole names and one for segments. Where
+        # neither matches, no rule can apply and the name is returned
+        # unchanged without evaluating each rule in turn.
+
+        self.__match_re = self.__combine(rule for rule in self.__rules if not rule.each_segment)
+        self.__segment_match_re = self.__combine(rule for rule in self.__rules if rule.each_segment)
+
+        self.__cache = LRUCache(cache_size)
+
+    @staticmethod
+    def __combine(rules):
+        patterns = [rule.match_expression for rule in rules]
+
+        if not patterns:
+            return None
+
+        if any(_UNCOMBINABLE_RE.search(pattern) for pattern in patterns):
+            return False
+
+        try:
+            return re.compile("|".join("(?:%s)" % pattern for pattern in patterns), re.IGNORECASE)
+        except re.error:
+            return False
+
     @property
     def rules(self):
         return self.__rules
 
+    def __may_match(self, string):
+        if self.__match_re is False or self.__segment_match_re is False:
+            return True
+
+        if self.__match_re is not None and self.__match_re.search(string):
+            return True
+
+        if self.__segment_match_re is not None:
+            segments = string.split("/")
+
+            if segments and not segments[0]:
+                segments = segments[1:]
+
+            for segment in segments:
+                if self.__segment_match_re.search(segment):
+                    return True
+
+        return False
+
     def normalize(self, string):
+        # Results are remembered, as the same names are normalized for
+        # every transaction and again for every metric at each harvest.
+
+        if not self.__rules:
+            return self.__normalize(string)
+
+        result = self.__cache.get(string)
+
+        if result is None:
+            result = self.__normalize(string)
+            self.__cache.put(string, result)
+
+        return result
+
+    def __normalize(self, string):
         # URLs are supposed to be ASCII but can get a
         # URL with illegal non ASCII characters. As the
         # rule patterns and replacements are Unicode
@@ -84,6 +151,9 @@ class RulesEngine(object):
         if isinstance(string, bytes):
             string = string.decode("Latin-1")
 
+        if not self.__may_match(string):
+            return (string, False)
+
         final_string = string
         ignore = False
         for rule in self.__rules:
@@ -22,6 +22,7 @@ data whereby it is sent to the core application.
 import base64
 import copy
 import logging
+import math
 import operator
 import random
 import sys
@@ -29,9 +30,11 @@ import time
 import traceback
 import warnings
 import zlib
-from heapq import heapify, heapreplace
+from array import array
+from heapq import heapify, heapreplace, nlargest
 
 import newrelic.packages.six as six
+from newrelic.packages.six.moves import intern
 from newrelic.api.settings import STRIP_EXCEPTION_MESSAGE
 from newrelic.api.time_trace import get_linking_metadata
 from newrelic.common.encoding_utils import json_encode
@@ -52,7 +55,7 @@ from newrelic.core.config import is_expected_error, should_ignore_error
 from newrelic.core.database_utils import explain_plan
 from newrelic.core.error_collector import TracedError
 from newrelic.core.log_event_node import LogEventNode
-from newrelic.core.metric import TimeMetric
+from newrelic.core.metric import AggregateTimeMetric, TimeMetric
 from newrelic.core.stack_trace import exception_stack
 
 _logger = logging.getLogger(__name__)
@@ -196,6 +199,358 @@ class CountStats(TimeStats):
         pass
 
 
+# Kinds of stats which can be held in a row of the metric table. These
+# correspond to the stats classes above and determine how data merged
+# into an existing row is accumulated.
+
+_TIME_STATS = 0
+_COUNT_STATS = 1
+_APDEX_STATS = 2
+
+
+def _stats_kind(stats):
+    if isinstance(stats, ApdexStats):
+        return _APDEX_STATS
+    elif isinstance(stats, CountStats):
+        return _COUNT_STATS
+    return _TIME_STATS
+
+
+def _intern(value):
+    try:
+        return intern(value)
+    except TypeError:
+        return value
+
+
+def _count(value):
+    # Counts are held as floats in the table but should be reported as
+    # integers where they started out as such.
+
+    return int(value) if value.is_integer() else value
+
+
+class MetricTable(object):
+
+    """Columnar table for accumulating apdex, time and value metrics.
+
+    Rather than holding a list based stats object per metric, the interned
+    (name, scope) key for each metric is mapped to a row index into a set
+    of typed arrays, one for each of the 6 fields making up the metric
+    data sent to the data collector. This avoids the per object overhead
+    where there are a large number of unique metrics and allows whole
+    tables to be merged a column at a time.
+
+    The table supports the read only parts of the dictionary interface,
+    with stats objects only being created when a row is looked up.
+
+    """
+
+    def __init__(self):
+        self._index = {}
+        self._keys = []
+        self._kinds = array("b")
+        self._columns = tuple(array("d") for _ in range(6))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __getitem__(self, key):
+        return self._stats(self._index[key])
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, dict(self.items()))
+
+    def get(self, key, default=None):
+        row = self._index.get(key)
+        if row is None:
+            return default
+        return self._stats(row)
+
+    def keys(self):
+        return list(self._keys)
+
+    def values(self):
+        return [self._stats(row) for row in range(len(self._keys))]
+
+    def items(self):
+        return list(self.iteritems())
+
+    def iteritems(self):
+        for row, key in enumerate(self._keys):
+            yield key, self._stats(row)
+
+    def _stats(self, row):
+        count, total, exclusive, minimum, maximum, sum_of_squares = (column[row] for column in self._columns)
+        kind = self._kinds[row]
+
+        if kind == _APDEX_STATS:
+            stats = ApdexStats(_count(count), _count(total), _count(exclusive))
+            stats[3] = minimum
+            stats[4] = maximum
+        elif kind == _COUNT_STATS:
+            stats = CountStats(_count(count), total, exclusive, minimum, maximum, sum_of_squares)
+        else:
+            stats = TimeStats(_count(count), total, exclusive, minimum, maximum, sum_of_squares)
+
+        return stats
+
+    def _add_row(self, key, kind, values):
+        row = len(self._keys)
+        key = (_intern(key[0]), _intern(key[1]))
+
+        self._index[key] = row
+        self._keys.append(key)
+        self._kinds.append(kind)
+
+        for column, value in zip(self._columns, values):
+            column.append(value)
+
+        return row
+
+    def record_time_metric(self, key, duration, exclusive=None):
+        """Merge a single time value into the row for the key."""
+
+        if exclusive is None:
+            exclusive = duration
+
+        row = self._index.get(key)
+        if row is None:
+            self._add_row(key, _TIME_STATS, (1, duration, exclusive, duration, duration, duration**2))
+            return
+
+        # Only time stats accumulate raw time values.
+
+        if self._kinds[row] != _TIME_STATS:
+            return
+
+        c0, c1, c2, c3, c4, c5 = self._columns
+
+        c1[row] += duration
+        c2[row] += exclusive
+        c3[row] = c0[row] and min(c3[row], duration) or duration
+        c4[row] = max(c4[row], duration)
+        c5[row] += duration**2
+
+        # Must update the call count last as update of the
+        # minimum call time is dependent on initial value.
+
+        c0[row] += 1
+
+    def record_time_metrics(self, metrics):
+        """Merge the time metrics supplied by the iterable. The metrics
+        are first aggregated by (name, scope) in a single pass, so that
+        where many nodes generate the same metric, such as for repeated
+        datastore or external calls, it is only merged into the table
+        once. Aggregate time metrics, each standing in for a number of
+        calls, are merged in the same way.
+
+        """
+
+        aggregated = {}
+
+        for metric in metrics:
+            key = (metric.name, metric.scope or "")
+
+            if type(metric) is AggregateTimeMetric:
+                self._aggregate_values(aggregated, key, metric[2:])
+                continue
+
+            duration = metric.duration
+            exclusive = metric.exclusive
+
+            if exclusive is None:
+                exclusive = duration
+
+            stats = aggregated.get(key)
+            if stats is None:
+                aggregated[key] = [1, duration, exclusive, duration, duration, duration**2]
+            else:
+                stats[1] += duration
+                stats[2] += exclusive
+                stats[3] = stats[0] and min(stats[3], duration) or duration
+                stats[4] = max(stats[4], duration)
+                stats[5] += duration**2
+                stats[0] += 1
+
+        index = self._index
+
+        for key, stats in six.iteritems(aggregated):
+            row = index.get(key)
+            if row is None:
+                self._add_row(key, _TIME_STATS, stats)
+            elif self._kinds[row] == _TIME_STATS:
+                self._merge_values(row, stats)
+
+    @staticmethod
+    def _aggregate_values(aggregated, key, values):
+        stats = aggregated.get(key)
+        if stats is None:
+            aggregated[key] = list(values)
+            return
+
+        stats[1] += values[1]
+        stats[2] += values[2]
+        stats[3] = stats[0] and min(stats[3], values[3]) or values[3]
+        stats[4] = max(stats[4], values[4])
+        stats[5] += values[5]
+        stats[0] += values[0]
+
+    def record_apdex_metric(self, key, satisfying, tolerating, frustrating, apdex_t):
+        """Merge a single apdex result into the row for the key."""
+
+        row = self._index.get(key)
+        if row is None:
+            self._add_row(key, _APDEX_STATS, (satisfying, tolerating, frustrating, apdex_t, apdex_t, 0))
+            return
+
+        self._merge_values(row, (satisfying, tolerating, frustrating, apdex_t, apdex_t, 0))
+
+    def merge_stats(self, key, stats):
+        """Merge a stats object into the row for the key, adding a new
+        row of the same kind as the stats object if there is none.
+
+        """
+
+        row = self._index.get(key)
+        if row is None:
+            self._add_row(key, _stats_kind(stats), stats)
+        else:
+            self._merge_values(row, stats)
+
+    def merge_table(self, other, normalizer=None):
+        """Merge all rows from another table. Where a normalizer is
+        supplied it is applied to the metric names of the other table
+        first, and metrics which it flags as ignored are dropped.
+
+        """
+
+        index = self._index
+        other_columns = other._columns
+
+        if normalizer is None and not any(key in index for key in other._keys):
+            # None of the keys overlap so the columns of the other table
+            # can be appended as is.
+
+            offset = len(self._keys)
+            for row, key in enumerate(other._keys):
+                index[key] = offset + row
+
+            self._keys.extend(other._keys)
+            self._kinds.extend(other._kinds)
+
+            for column, other_column in zip(self._columns, other_columns):
+                column.extend(other_column)
+
+            return
+
+        for other_row, key in enumerate(other._keys):
+            if normalizer is not None:
+                name, ignored = normalizer(key[0])
+                if ignored:
+                    continue
+                key = (name, key[1])
+
+            values = [column[other_row] for column in other_columns]
+
+            row = index.get(key)
+            if row is None:
+                self._add_row(key, other._kinds[other_row], values)
+            else:
+                self._merge_values(row, values)
+
+    def _merge_values(self, row, values):
+        # Accumulates values into an existing row, with the accumulation
+        # dependent on the kind of stats the row was created with. This
+        # mirrors the merge_stats() method of the stats classes.
+
+        o0, o1, o2, o3, o4, o5 = values
+        c0, c1, c2, c3, c4, c5 = self._columns
+        kind = self._kinds[row]
+
+        if kind == _TIME_STATS:
+            c1[row] += o1
+            c2[row] += o2
+            c3[row] = c0[row] and min(c3[row], o3) or o3
+            c4[row] = max(c4[row], o4)
+            c5[row] += o5
+
+            # Must update the call count last as update of the
+            # minimum call time is dependent on initial value.
+
+            c0[row] += o0
+
+        elif kind == _COUNT_STATS:
+            c0[row] += o0
+
+        else:
+            c0[row] += o0
+            c1[row] += o1
+            c2[row] += o2
+
+            c3[row] = (c0[row] or c1[row] or c2[row]) and min(c3[row], o3) or o3
+            c4[row] = max(c4[row], o3)
+
+
+class MetricNameCache(object):
+
+    """Remembers the normalized name of each metric, and the key used for
+    it in the data collector payload, across harvests. The set of metrics
+    reported changes little from one harvest to the next, so this avoids
+    applying the metric normalization rules to every metric each time.
+
+    The cache is tied to the normalizer it was created with, so a new one
+    must be created when the metric normalization rules change. Should it
+    grow beyond the maximum number of entries it is simply cleared.
+
+    """
+
+    def __init__(self, normalizer=None, maximum=10000):
+        self.normalizer = normalizer
+        self.maximum = maximum
+        self._names = {}
+        self._payload_keys = {}
+
+    def normalize(self, name):
+        try:
+            return self._names[name]
+        except KeyError:
+            pass
+
+        result = self.normalizer(name)
+
+        if len(self._names) >= self.maximum:
+            self._names.clear()
+
+        self._names[name] = result
+
+        return result
+
+    def payload_key(self, key):
+        try:
+            return self._payload_keys[key]
+        except KeyError:
+            pass
+
+        # The payload key is shared between harvests so must never be
+        # modified once handed out.
+
+        payload_key = dict(name=key[0], scope=key[1])
+
+        if len(self._payload_keys) >= self.maximum:
+            self._payload_keys.clear()
+
+        self._payload_keys[key] = payload_key
+
+        return payload_key
+
+
 class CustomMetrics(object):
 
     """Table for collection a set of value metrics."""
@@ -234,6 +589,19 @@ class CustomMetrics(object):
 
         return six.iteritems(self.__stats_table)
 
+    def merge_custom_metrics(self, metrics):
+        """Merges in the value metrics returned by metrics() of another
+        instance.
+
+        """
+
+        for name, other in metrics:
+            stats = self.__stats_table.get(name)
+            if stats is None:
+                self.__stats_table[name] = copy.copy(other)
+            else:
+                stats.merge_stats(other)
+
     def reset_metric_stats(self):
         """Resets the accumulated statistics back to initial state for
         metric data.
@@ -270,6 +638,25 @@ class DimensionalMetrics(object):
         """
         name, tags = create_metric_identity(name, tags)
 
+        return self._record_dimensional_metric(name, value, tags)
+
+    def record_dimensional_metrics(self, metrics, tags=None):
+        """Record the value metrics supplied by the iterable. Any tags
+        supplied apply to each metric which does not have its own, and
+        are only sanitized once for the whole set of metrics.
+        """
+        _, tags = create_metric_identity(None, tags)
+
+        for metric in metrics:
+            name, value = metric[:2]
+
+            if len(metric) >= 3:
+                name, metric_tags = create_metric_identity(name, metric[2])
+                self._record_dimensional_metric(name, value, metric_tags)
+            else:
+                self._record_dimensional_metric(name, value, tags)
+
+    def _record_dimensional_metric(self, name, value, tags):
         if isinstance(value, dict):
             if len(value) == 1 and "count" in value:
                 new_stats = CountStats(call_count=value["count"])
@@ -421,7 +808,7 @@ class SampledDataSet(object):
             return False
 
         # Always sample if under capacity
-        return True
+        return self.capacity > 0
 
     def add(self, sample, priority=None):  # pylint: disable=E0202
         self.num_seen += 1
@@ -429,12 +816,19 @@ class SampledDataSet(object):
         if priority is None:
             priority = random.random()  # nosec
 
-        entry = (priority, self.num_seen, sample)
-        if self.num_seen == self.capacity:
-            self.pq.append(entry)
-            self.heap = self.heap or heapify(self.pq) or True
-        elif not self.heap:
+        # Samples are ordered by priority and then by when they were seen,
+        # negated so that between samples of equal priority the samples
+        # seen first are kept.
+        entry = (priority, -self.num_seen, sample)
+        if not self.heap:
             self.pq.append(entry)
+
+            # The queue only becomes a heap once full. This is based on
+            # the number of samples rather than num_seen, as merges
+            # account for samples which were never added here.
+            if len(self.pq) >= self.capacity:
+                heapify(self.pq)
+                self.heap = True
         else:
             sampled = self.should_sample(priority)
             if not sampled:
@@ -445,13 +839,49 @@ class SampledDataSet(object):
         if priority is None:
             priority = -1
 
-        for original_priority, seen_at, sample in other_data_set.pq:
-            self.add(sample, max(priority, original_priority))
+        num_seen = self.num_seen
+        self.num_seen += other_data_set.num_seen
 
-        # Merge the num_seen from the other_data_set, but take care not to
-        # double-count the actual samples of other_data_set since the .add
-        # call above will add one to self.num_seen each time
-        self.num_seen += other_data_set.num_seen - other_data_set.num_samples
+        if self.capacity <= 0 or not other_data_set.pq:
+            return
+
+        # Samples are numbered in the order they would have been seen had
+        # they been added one at a time, which is used to break ties
+        # between samples of equal priority.
+        entries = [
+            (max(priority, original_priority), order - num_seen, sample)
+            for original_priority, order, sample in other_data_set.pq
+        ]
+
+        pq = self.pq
+
+        # Where only a few samples are being merged into a full queue, as
+        # when merging those from a single transaction, each is pushed
+        # through the heap as add() would do.
+        if self.heap and len(entries) * 2 < self.capacity:
+            for entry in entries:
+                if entry > pq[0]:
+                    heapreplace(pq, entry)
+            return
+
+        pq.extend(entries)
+
+        # While under capacity everything is kept, and there is no need to
+        # maintain the heap.
+        if len(pq) < self.capacity:
+            return
+
+        # Otherwise select the samples to keep in one pass rather than
+        # pushing each through the heap, which keeps the same samples.
+        if len(pq) > self.capacity:
+            # Capacities derived from harvest limits can be fractional, in
+            # which case add() retains the next whole number of samples.
+            pq = nlargest(int(math.ceil(self.capacity)), pq)
+            self.pq = pq
+
+        heapify(pq)
+
+        self.heap = True
 
 
 class LimitedDataSet(list):
@@ -532,7 +962,7 @@ class StatsEngine(object):
 
     def __init__(self):
         self.__settings = None
-        self.__stats_table = {}
+        self.__stats_table = MetricTable()
         self.__dimensional_stats_table = DimensionalMetrics()
         self._transaction_events = SampledDataSet()
         self._error_events = SampledDataSet()
@@ -541,6 +971,7 @@ class StatsEngine(object):
         self._span_events = SampledDataSet()
         self._log_events = SampledDataSet()
         self._span_stream = None
+        self._parent = None
         self.__sql_stats_table = {}
         self.__slow_transaction = None
         self.__slow_transaction_map = {}
@@ -622,11 +1053,9 @@ class StatsEngine(object):
         # as an empty string anyway.
 
         key = (metric.name, "")
-        stats = self.__stats_table.get(key)
-        if stats is None:
-            stats = ApdexStats(apdex_t=metric.apdex_t)
-            self.__stats_table[key] = stats
-        stats.merge_apdex_metric(metric)
+        self.__stats_table.record_apdex_metric(
+            key, metric.satisfying, metric.tolerating, metric.frustrating, metric.apdex_t
+        )
 
         return key
 
@@ -656,19 +1085,7 @@ class StatsEngine(object):
         # scope of None is reserved for apdex metrics.
 
         key = (metric.name, metric.scope or "")
-        stats = self.__stats_table.get(key)
-        if stats is None:
-            stats = TimeStats(
-                call_count=1,
-                total_call_time=metric.duration,
-                total_exclusive_call_time=metric.exclusive,
-                min_call_time=metric.duration,
-                max_call_time=metric.duration,
-                sum_of_squares=metric.duration**2,
-            )
-            self.__stats_table[key] = stats
-        else:
-            stats.merge_time_metric(metric)
+        self.__stats_table.record_time_metric(key, metric.duration, metric.exclusive)
 
         return key
 
@@ -682,8 +1099,7 @@ class StatsEngine(object):
         if not self.__settings:
             return
 
-        for metric in metrics:
-            self.record_time_metric(metric)
+        self.__stats_table.record_time_metrics(metrics)
 
     def record_exception(self, exc=None, value=None, tb=None, params=None, ignore_errors=None):
         # Deprecation Warning
@@ -980,11 +1396,7 @@ class StatsEngine(object):
         else:
             new_stats = TimeStats(1, value, value, value, value, value**2)
 
-        stats = self.__stats_table.get(key)
-        if stats is None:
-            self.__stats_table[key] = new_stats
-        else:
-            stats.merge_stats(new_stats)
+        self.__stats_table.merge_stats(key, new_stats)
 
         return key
 
@@ -1214,8 +1626,7 @@ class StatsEngine(object):
                 for event in transaction.span_protos(settings):
                     self._span_stream.put(event)
             elif transaction.sampled:
-                for event in transaction.span_events(self.__settings):
-                    self._span_events.add(event, priority=transaction.priority)
+                self._record_span_events(transaction)
 
         # Merge in log events
 
@@ -1228,7 +1639,33 @@ class StatsEngine(object):
         ):
             self._log_events.merge(transaction.log_events, priority=transaction.priority)
 
-    def record_log_event(self, message, level=None, timestamp=None, attributes=None, priority=None):
+    def _record_span_events(self, transaction):
+        span_events = self._span_events
+        priority = transaction.priority
+
+        # Check the reservoirs before the span events are generated. Once a
+        # reservoir is full and the minimum priority held is not below that
+        # of the transaction, no further spans from it can be kept, so the
+        # remaining ones are only counted as seen. For a workarea, the spans
+        # will end up being merged into the reservoir of the stats engine it
+        # was created from, so that is checked as well.
+
+        parent = self._parent
+        count = 0
+
+        if (parent is None or parent.span_events.should_sample(priority)) and span_events.should_sample(priority):
+            for event in transaction.span_events(self.__settings):
+                span_events.add(event, priority=priority)
+                count += 1
+
+                if not span_events.should_sample(priority):
+                    break
+
+        span_events.num_seen += transaction.span_event_count() - count
+
+    def record_log_event(
+        self, message, level=None, timestamp=None, attributes=None, priority=None, linking_metadata=None
+    ):
         settings = self.__settings
         if not (
             settings
@@ -1289,8 +1726,9 @@ class StatsEngine(object):
                 )
                 return
 
-        # Finally, add in linking attributes after checking that there is a valid message or at least 1 attribute
-        collected_attributes.update(get_linking_metadata())
+        # Finally, add in linking attributes after checking that there is a valid message or at least 1 attribute.
+        # Log records processed in the background supply the linking metadata captured when they were logged.
+        collected_attributes.update(linking_metadata or get_linking_metadata())
 
         event = LogEventNode(
             timestamp=timestamp,
@@ -1307,7 +1745,7 @@ class StatsEngine(object):
 
         return event
 
-    def metric_data(self, normalizer=None):
+    def metric_data(self, normalizer=None, name_cache=None):
         """Returns a list containing the low level metric data for
         sending to the core application pertaining to the reporting
         period. This consists of tuple pairs where first is dictionary
@@ -1317,13 +1755,16 @@ class StatsEngine(object):
         the list of accumulated metric data, the list always being of
         length 6.
 
+        Where a MetricNameCache is supplied, it is used in place of the
+        normalizer, and the payload keys it holds are reused rather
+        than being created anew for every harvest.
+
         """
 
         if not self.__settings:
             return []
 
         result = []
-        normalized_stats = {}
 
         # Metric Renaming and Re-Aggregation. After applying the metric
         # renaming rules, the metrics are re-aggregated to collapse the
@@ -1336,18 +1777,12 @@ class StatsEngine(object):
                 list(six.iteritems(self.__stats_table)),
             )
 
-        if normalizer is not None:
-            for key, value in six.iteritems(self.__stats_table):
-                normalized_name, ignored = normalizer(key[0])
-                if ignored:
-                    continue
+        if name_cache is not None:
+            normalizer = name_cache.normalizer and name_cache.normalize
 
-                key = (normalized_name, key[1])
-                stats = normalized_stats.get(key)
-                if stats is None:
-                    normalized_stats[key] = copy.copy(value)
-                else:
-                    stats.merge_stats(value)
+        if normalizer is not None:
+            normalized_stats = MetricTable()
+            normalized_stats.merge_table(self.__stats_table, normalizer)
         else:
             normalized_stats = self.__stats_table
 
@@ -1358,9 +1793,15 @@ class StatsEngine(object):
                 list(six.iteritems(normalized_stats)),
             )
 
-        for key, value in six.iteritems(normalized_stats):
-            key = dict(name=key[0], scope=key[1])
-            result.append((key, value))
+        if name_cache is not None:
+            payload_key = name_cache.payload_key
+            for key, value in six.iteritems(normalized_stats):
+                result.append((payload_key(key), value))
+
+        else:
+            for key, value in six.iteritems(normalized_stats):
+                key = dict(name=key[0], scope=key[1])
+                result.append((key, value))
 
         return result
 
@@ -1727,7 +2168,10 @@ class StatsEngine(object):
         # streams are never reset after instantiation
         if reset_stream:
             self._span_stream = StreamBuffer(
-                settings.infinite_tracing.span_queue_size, batching=settings.infinite_tracing.batching
+                settings.infinite_tracing.span_queue_size,
+                batching=settings.infinite_tracing.batching,
+                max_bytes=settings.infinite_tracing.span_queue_byte_size,
+                sampling=settings.infinite_tracing.span_queue_sampling,
             )
 
     def reset_metric_stats(self):
@@ -1736,7 +2180,7 @@ class StatsEngine(object):
 
         """
 
-        self.__stats_table = {}
+        self.__stats_table = MetricTable()
         self.__dimensional_stats_table.reset_metric_stats()
 
     def reset_transaction_events(self):
@@ -1828,7 +2272,7 @@ class StatsEngine(object):
         self.__slow_transaction = None
         self.__synthetics_transactions = []
         self.__sql_stats_table = {}
-        self.__stats_table = {}
+        self.__stats_table = MetricTable()
         self.__transaction_errors = []
 
     def harvest_snapshot(self, flexible=False):
@@ -1886,6 +2330,7 @@ class StatsEngine(object):
 
         stats = copy.copy(self)
         stats.reset_stats(self.__settings)
+        stats._parent = self
 
         return stats
 
@@ -1909,6 +2354,28 @@ class StatsEngine(object):
         self._merge_sql(snapshot)
         self._merge_traces(snapshot)
 
+    def merge_workarea(self, workarea):
+        """Merges data from a long lived workarea. Workarea is an instance
+        of StatsEngine which, unlike the snapshot passed to merge(), can
+        hold data for many transactions. All of the transaction events it
+        holds are therefore merged in using the reservoir sampling.
+        """
+
+        if not self.__settings:
+            return
+
+        self.merge_metric_stats(workarea)
+        self._merge_transaction_events(workarea, rollback=True)
+        self._merge_synthetics_events(workarea)
+        self._merge_error_events(workarea)
+        self._merge_error_traces(workarea)
+        self._merge_custom_events(workarea)
+        self._merge_ml_events(workarea)
+        self._merge_span_events(workarea)
+        self._merge_log_events(workarea)
+        self._merge_sql(workarea)
+        self._merge_traces(workarea)
+
     def rollback(self, snapshot):
         """Performs a "rollback" merge after a failed harvest. Snapshot is a
         copy of the main StatsEngine data that we attempted to harvest, but
@@ -1943,12 +2410,7 @@ class StatsEngine(object):
         if not self.__settings:
             return
 
-        for key, other in six.iteritems(snapshot.__stats_table):
-            stats = self.__stats_table.get(key)
-            if not stats:
-                self.__stats_table[key] = other
-            else:
-                stats.merge_stats(other)
+        self.__stats_table.merge_table(snapshot.__stats_table)
 
     def _merge_transaction_events(self, snapshot, rollback=False):
         # Merge in transaction events. In the normal case snapshot is a
@@ -2067,12 +2529,7 @@ class StatsEngine(object):
             return
 
         for name, other in metrics:
-            key = (name, "")
-            stats = self.__stats_table.get(key)
-            if not stats:
-                self.__stats_table[key] = other
-            else:
-                stats.merge_stats(other)
+            self.__stats_table.merge_stats((name, ""), other)
 
     def merge_dimensional_metrics(self, metrics):
         """
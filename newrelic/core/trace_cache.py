@@ -43,6 +43,14 @@ def current_task(asyncio):
     if not asyncio:
         return
 
+    # Where there is no running event loop there can be no current task.
+    # Checking for this first avoids the cost of the exception raised by
+    # current_task() in synchronous code, which is the common case.
+
+    get_running_loop = getattr(asyncio, "_get_running_loop", None)
+    if get_running_loop is not None and get_running_loop() is None:
+        return
+
     current_task = getattr(asyncio, "current_task", None)
     if current_task is None:
         current_task = getattr(asyncio.Task, "current_task", None)
@@ -391,7 +399,7 @@ class TraceCache(MutableMapping):
                 guid=guid,
             )
             transaction = root.transaction
-            transaction._process_node(node)
+            transaction._process_node(node, root.guid)
             root.increment_child_count()
             root.add_child(node)
 
@@ -433,6 +441,18 @@ class TraceCache(MutableMapping):
             ):  # weakref is None means weakref has been garbage collected and is no longer live. Ignore.
                 yield value
 
+    def get(self, key, default=None):
+        # Looks up the weak reference directly, as the trace for the
+        # current thread is fetched on every traced call and a missing
+        # key would otherwise be reported by raising KeyError twice.
+
+        ref = self._cache.data.get(key)
+        if ref is not None:
+            value = ref()
+            if value is not None:
+                return value
+        return default
+
     def __getitem__(self, key):
         return self._cache.__getitem__(key)
 
@@ -641,6 +641,9 @@ class TransactionNode(_TransactionNode):
         for i_attrs, u_attrs, a_attrs in self.span_events(settings, attr_class=SpanProtoAttrs):
             yield Span(trace_id=self.trace_id, intrinsics=i_attrs, user_attributes=u_attrs, agent_attributes=a_attrs)
 
+    def span_event_count(self):
+        return self.root.span_event_count()
+
     def span_events(self, settings, attr_class=dict):
         base_attrs = attr_class(
             (
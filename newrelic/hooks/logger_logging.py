@@ -12,11 +12,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import random
+
 from newrelic.api.application import application_instance
-from newrelic.api.time_trace import get_linking_metadata
+from newrelic.api.time_trace import (
+    current_trace,
+    get_linking_metadata,
+    get_service_linking_metadata,
+)
 from newrelic.api.transaction import current_transaction, record_log_event
 from newrelic.common.object_wrapper import function_wrapper, wrap_function_wrapper
 from newrelic.core.config import global_settings
+from newrelic.core.log_event_buffer import LogEventBuffer
+from newrelic.core.log_line_counter import record_log_line
 
 try:
     from urllib import quote
@@ -49,6 +57,112 @@ def bind_callHandlers(record):
     return record
 
 
+def _process_log_records(entries):
+    # Called with batches of the entries captured by _buffer_log_record()
+    # to turn them into log events and metrics off the logging thread.
+    application = application_instance(activate=False)
+    if not application or not application.enabled:
+        return
+
+    settings = application.settings
+    if not settings:
+        return
+
+    forwarding = settings.application_logging.forwarding.enabled
+    service_linking_metadata = get_service_linking_metadata(settings=settings)
+
+    level_counts = {}
+    events = []
+
+    for level_name, record, trace_id, span_id, priority in entries:
+        level_counts[level_name] = level_counts.get(level_name, 0) + 1
+
+        if record is None or not forwarding:
+            continue
+
+        try:
+            event = _log_event(level_name, record, priority)
+        except Exception:
+            continue
+
+        linking_metadata = service_linking_metadata
+        if trace_id is not None:
+            linking_metadata = dict(service_linking_metadata)
+            linking_metadata["span.id"] = span_id
+            linking_metadata["trace.id"] = trace_id
+
+        event["linking_metadata"] = linking_metadata
+        events.append(event)
+
+    if settings.application_logging.metrics.enabled:
+        metrics = [("Logging/lines", {"count": len(entries)})]
+        for level_name, count in level_counts.items():
+            metrics.append(("Logging/lines/%s" % level_name, {"count": count}))
+        application.record_custom_metrics(metrics)
+
+    if events:
+        application.record_log_events(events)
+
+
+_log_event_buffer = LogEventBuffer(_process_log_records)
+
+
+def _log_event(level_name, record, priority):
+    # The record is a copy of the attributes of the logged record, taken
+    # before anything else was added to it, such as the decorating of the
+    # message. The message is formatted by an instance of the same class,
+    # so that records overriding getMessage() are formatted as they would
+    # be when logged.
+    record_class, record_attrs = record
+
+    message = record_attrs.get("msg")
+    if not isinstance(message, dict):
+        record = record_class.__new__(record_class)
+        record.__dict__.update(record_attrs)
+        message = record.getMessage()
+
+    context_attrs = {k: record_attrs[k] for k in record_attrs if k not in IGNORED_LOG_RECORD_KEYS}
+
+    return {
+        "message": message,
+        "level": level_name,
+        "timestamp": int(record_attrs["created"] * 1000),
+        "attributes": context_attrs,
+        "priority": priority,
+    }
+
+
+def _buffer_log_record(record, transaction, settings):
+    # Only what is cheap to capture is read on the logging thread, being a
+    # shallow copy of the attributes of the record along with the ids and
+    # priority linking it to the current trace. The transaction itself is
+    # not kept alive. Formatting the message and attributes is left to
+    # _process_log_records().
+    level_name = str(getattr(record, "levelname", "UNKNOWN"))
+
+    trace_id = span_id = None
+    priority = None
+    if transaction:
+        trace = current_trace()
+        if trace:
+            trace_id, span_id = transaction.trace_id, trace.guid
+
+            # Log events from transactions rank above those outside of
+            # them, as when they are merged in with the transaction.
+            priority = transaction.priority
+            if priority is None:
+                priority = random.random()  # nosec
+
+    snapshot = None
+    if settings.application_logging.forwarding and settings.application_logging.forwarding.enabled:
+        try:
+            snapshot = (type(record), dict(vars(record)))
+        except Exception:
+            pass
+
+    _log_event_buffer.append((level_name, snapshot, trace_id, span_id, priority))
+
+
 def wrap_callHandlers(wrapped, instance, args, kwargs):
     transaction = current_transaction()
     record = bind_callHandlers(*args, **kwargs)
@@ -64,33 +178,35 @@ def wrap_callHandlers(wrapped, instance, args, kwargs):
 
     # Return early if application logging not enabled
     if settings and settings.application_logging and settings.application_logging.enabled:
-        level_name = str(getattr(record, "levelname", "UNKNOWN"))
-        if settings.application_logging.metrics and settings.application_logging.metrics.enabled:
-            if transaction:
-                transaction.record_custom_metric("Logging/lines", {"count": 1})
-                transaction.record_custom_metric("Logging/lines/%s" % level_name, {"count": 1})
-            else:
-                application = application_instance(activate=False)
-                if application and application.enabled:
-                    application.record_custom_metric("Logging/lines", {"count": 1})
-                    application.record_custom_metric("Logging/lines/%s" % level_name, {"count": 1})
-
-        if settings.application_logging.forwarding and settings.application_logging.forwarding.enabled:
-            try:
-                message = record.msg
-                if not isinstance(message, dict):
-                    # Allow python to convert the message to a string and template it with args.
-                    message = record.getMessage()
-
-                # Grab and filter context attributes from log record
-                record_attrs = vars(record)
-                context_attrs = {k: record_attrs[k] for k in record_attrs if k not in IGNORED_LOG_RECORD_KEYS}
-
-                record_log_event(
-                    message=message, level=level_name, timestamp=int(record.created * 1000), attributes=context_attrs
-                )
-            except Exception:
-                pass
+        if settings.application_logging.background_processing.enabled:
+            _buffer_log_record(record, transaction, settings)
+        else:
+            level_name = str(getattr(record, "levelname", "UNKNOWN"))
+            if settings.application_logging.metrics and settings.application_logging.metrics.enabled:
+                if transaction:
+                    transaction.record_log_line(level_name)
+                else:
+                    record_log_line(level_name)
+
+            if settings.application_logging.forwarding and settings.application_logging.forwarding.enabled:
+                try:
+                    message = record.msg
+                    if not isinstance(message, dict):
+                        # Allow python to convert the message to a string and template it with args.
+                        message = record.getMessage()
+
+                    # Grab and filter context attributes from log record
+                    record_attrs = vars(record)
+                    context_attrs = {k: record_attrs[k] for k in record_attrs if k not in IGNORED_LOG_RECORD_KEYS}
+
+                    record_log_event(
+                        message=message,
+                        level=level_name,
+                        timestamp=int(record.created * 1000),
+                        attributes=context_attrs,
+                    )
+                except Exception:
+                    pass
 
         if settings.application_logging.local_decorating and settings.application_logging.local_decorating.enabled:
             record._nr_original_message = record.getMessage
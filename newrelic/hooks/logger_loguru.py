@@ -15,12 +15,12 @@
 import logging
 import sys
 
-from newrelic.api.application import application_instance
 from newrelic.api.transaction import current_transaction, record_log_event
 from newrelic.common.object_wrapper import wrap_function_wrapper
 from newrelic.common.package_version_utils import get_package_version_tuple
 from newrelic.common.signature import bind_args
 from newrelic.core.config import global_settings
+from newrelic.core.log_line_counter import record_log_line
 from newrelic.hooks.logger_logging import add_nr_linking_metadata
 
 _logger = logging.getLogger(__name__)
@@ -55,13 +55,9 @@ def _nr_log_forwarder(message_instance):
 
         if settings.application_logging.metrics and settings.application_logging.metrics.enabled:
             if transaction:
-                transaction.record_custom_metric("Logging/lines", {"count": 1})
-                transaction.record_custom_metric("Logging/lines/%s" % level_name, {"count": 1})
+                transaction.record_log_line(level_name)
             else:
-                application = application_instance(activate=False)
-                if application and application.enabled:
-                    application.record_custom_metric("Logging/lines", {"count": 1})
-                    application.record_custom_metric("Logging/lines/%s" % level_name, {"count": 1})
+                record_log_line(level_name)
 
         if settings.application_logging.forwarding and settings.application_logging.forwarding.enabled:
             attrs = _filter_record_attributes(record)
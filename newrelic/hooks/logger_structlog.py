@@ -14,11 +14,11 @@
 
 import functools
 
-from newrelic.api.application import application_instance
 from newrelic.api.transaction import current_transaction, record_log_event
 from newrelic.common.object_wrapper import wrap_function_wrapper
 from newrelic.common.signature import bind_args
 from newrelic.core.config import global_settings
+from newrelic.core.log_line_counter import record_log_line
 from newrelic.hooks.logger_logging import add_nr_linking_metadata
 
 
@@ -69,13 +69,9 @@ def new_relic_event_consumer(logger, level, event):
 
         if settings.application_logging.metrics.enabled:
             if transaction:
-                transaction.record_custom_metric("Logging/lines", {"count": 1})
-                transaction.record_custom_metric("Logging/lines/%s" % level_name, {"count": 1})
+                transaction.record_log_line(level_name)
             else:
-                application = application_instance(activate=False)
-                if application and application.enabled:
-                    application.record_custom_metric("Logging/lines", {"count": 1})
-                    application.record_custom_metric("Logging/lines/%s" % level_name, {"count": 1})
+                record_log_line(level_name)
 
         if settings.application_logging.forwarding.enabled:
             try:
@@ -13,6 +13,8 @@
 # limitations under the License.
 
 import logging
+import math
+import random
 import sys
 import uuid
 
@@ -32,7 +34,10 @@ METRIC_SCORERS = (
     "roc_auc_score",
     "r2_score",
 )
+STATS = ("Mean", "Percentile25", "Percentile50", "Percentile75", "StandardDeviation", "Min", "Max", "Count")
+MAX_STATS_METRIC_NAMES = 10000
 PY2 = sys.version_info[0] == 2
+_STATS_METRIC_NAMES = {}
 _logger = logging.getLogger(__name__)
 
 
@@ -127,16 +132,30 @@ def _calc_prediction_feature_stats(prediction_input, class_, feature_column_name
         _record_stats(features, feature_column_names, class_, "Feature", tags)
 
 
+def _stats_metric_names(class_, column_type, col_name):
+    key = (class_, column_type, col_name)
+    metric_names = _STATS_METRIC_NAMES.get(key)
+
+    if metric_names is None:
+        # Discard all cached names rather than growing without bound
+        # when predictions are made against very many columns.
+        if len(_STATS_METRIC_NAMES) >= MAX_STATS_METRIC_NAMES:
+            _STATS_METRIC_NAMES.clear()
+
+        metric_name = "MLModel/Sklearn/Named/%s/Predict/%s/%s" % key
+        metric_names = _STATS_METRIC_NAMES[key] = tuple("%s/%s" % (metric_name, stat) for stat in STATS)
+
+    return metric_names
+
+
 def _record_stats(data, column_names, class_, column_type, tags):
     import numpy as np
 
-    mean = np.mean(data, axis=0)
-    percentile25 = np.percentile(data, q=0.25, axis=0)
-    percentile50 = np.percentile(data, q=0.50, axis=0)
-    percentile75 = np.percentile(data, q=0.75, axis=0)
-    standard_deviation = np.std(data, axis=0)
-    _min = np.min(data, axis=0)
-    _max = np.max(data, axis=0)
+    mean = np.mean(data, axis=0).tolist()
+    standard_deviation = np.std(data, axis=0).tolist()
+    # The min and max are the 0th and 100th percentiles, so are calculated
+    # along with the quartiles in a single partitioning of each column.
+    percentiles = np.percentile(data, q=(0, 0.25, 0.50, 0.75, 100), axis=0).T.tolist()
     _count = data.shape[0]
 
     transaction = current_transaction()
@@ -144,21 +163,22 @@ def _record_stats(data, column_names, class_, column_type, tags):
     # Currently record_metric only supports a subset of these stats so we have
     # to upload them one at a time instead of as a dictionary of stats per
     # feature column.
+    metrics = []
     for index, col_name in enumerate(column_names):
-        metric_name = "MLModel/Sklearn/Named/%s/Predict/%s/%s" % (class_, column_type, col_name)
-
-        transaction.record_dimensional_metrics(
-            [
-                ("%s/%s" % (metric_name, "Mean"), float(mean[index]), tags),
-                ("%s/%s" % (metric_name, "Percentile25"), float(percentile25[index]), tags),
-                ("%s/%s" % (metric_name, "Percentile50"), float(percentile50[index]), tags),
-                ("%s/%s" % (metric_name, "Percentile75"), float(percentile75[index]), tags),
-                ("%s/%s" % (metric_name, "StandardDeviation"), float(standard_deviation[index]), tags),
-                ("%s/%s" % (metric_name, "Min"), float(_min[index]), tags),
-                ("%s/%s" % (metric_name, "Max"), float(_max[index]), tags),
-                ("%s/%s" % (metric_name, "Count"), _count, tags),
-            ]
+        _min, percentile25, percentile50, percentile75, _max = percentiles[index]
+        values = (
+            mean[index],
+            percentile25,
+            percentile50,
+            percentile75,
+            standard_deviation[index],
+            _min,
+            _max,
+            _count,
         )
+        metrics.extend(zip(_stats_metric_names(class_, column_type, col_name), values))
+
+    transaction.record_dimensional_metrics(metrics, tags=tags)
 
 
 def _calc_prediction_label_stats(labels, class_, label_column_names, tags):
@@ -236,6 +256,38 @@ def bind_predict(X, *args, **kwargs):
     return X
 
 
+def _sample_prediction_rows(transaction, settings, num_rows):
+    # Every inference event recorded in a transaction has the same
+    # priority, so once the transaction's ML event reservoir is full any
+    # further events are discarded. Rows which cannot be kept, or which
+    # exceed the configured number of rows per prediction, are counted as
+    # seen without ever building an event for them.
+    ml_events = transaction._ml_events
+    limit = max(int(math.ceil(ml_events.capacity)) - ml_events.num_samples, 0)
+
+    sampling = settings.machine_learning.inference_events_sampling
+    if sampling.max_rows and sampling.max_rows > 0:
+        limit = min(limit, sampling.max_rows)
+
+    if num_rows <= limit:
+        return range(num_rows)
+
+    ml_events.num_seen += num_rows - limit
+
+    # Where no strategy is configured, the rows kept are those the event
+    # reservoir would have kept had every row been added to it. Until the
+    # transaction has a priority each event is given a random priority,
+    # so a uniform random subset of the rows is kept, otherwise the first.
+    strategy = sampling.strategy
+    if strategy is None:
+        strategy = "reservoir" if transaction.priority is None else "first"
+
+    if strategy == "reservoir":
+        return sorted(random.sample(range(num_rows), limit))
+
+    return range(limit)
+
+
 def create_prediction_event(transaction, class_, instance, args, kwargs, return_val):
     import numpy as np
 
@@ -284,8 +336,11 @@ def create_prediction_event(transaction, class_, instance, args, kwargs, return_
             "modelName": model_name,
         },
     )
-    features, predictions = np_casted_data_set.shape
-    for prediction_index, prediction in enumerate(np_casted_data_set):
+    if not settings.ml_insights_events.enabled:
+        return
+
+    for prediction_index in _sample_prediction_rows(transaction, settings, len(np_casted_data_set)):
+        prediction = np_casted_data_set[prediction_index]
         inference_id = uuid.uuid4()
 
         event = {
@@ -26,6 +26,7 @@ from newrelic.api.graphql_trace import graphql_operation_trace, graphql_resolver
 from newrelic.api.memcache_trace import memcache_trace
 from newrelic.api.message_trace import message_trace
 
+import newrelic.common.async_wrapper
 from newrelic.common.async_wrapper import generator_wrapper
 
 from testing_support.fixtures import capture_transaction_metrics
@@ -100,3 +101,24 @@ def test_manual_generator_trace_wrapper(trace, metric):
     # Check that generators time the total call time (including pauses)
     metric_key = (metric, "")
     assert full_metrics[metric_key].total_call_time >= 0.2
+
+
+@pytest.mark.parametrize("trace,metric", trace_metric_cases)
+def test_async_wrapper_detected_once(trace, metric, monkeypatch):
+    detected = []
+    async_wrapper = newrelic.common.async_wrapper.async_wrapper
+
+    def _async_wrapper(wrapped):
+        detected.append(wrapped)
+        return async_wrapper(wrapped)
+
+    monkeypatch.setattr(newrelic.common.async_wrapper, "async_wrapper", _async_wrapper)
+
+    @trace()
+    def func(value):
+        return value
+
+    # Outside of a transaction the call goes straight through, with
+    # whether the function is async only being worked out the once.
+    assert [func(value) for value in range(3)] == [0, 1, 2]
+    assert len(detected) == 1
@@ -28,6 +28,7 @@ import newrelic.core.otlp_utils
 from newrelic.api.application import application_instance
 from newrelic.api.background_task import background_task
 from newrelic.api.transaction import (
+    current_transaction,
     record_dimensional_metric,
     record_dimensional_metrics,
 )
@@ -136,6 +137,28 @@ def test_record_dimensional_metrics_outside_transaction(tags, expected):
     _test()
 
 
+@pytest.mark.parametrize("tags,expected", _test_tags_examples)
+@reset_core_stats_engine()
+def test_record_dimensional_metrics_shared_tags(tags, expected):
+    @validate_transaction_metrics(
+        "test_record_dimensional_metrics_shared_tags",
+        background_task=True,
+        dimensional_metrics=[
+            ("Metric.1", expected, 1),
+            ("Metric.2", expected, 1),
+            ("Metric.3", frozenset({("own", 1)}), 1),
+        ],
+    )
+    @background_task(name="test_record_dimensional_metrics_shared_tags")
+    def _test():
+        # Tags supplied for the whole set apply to metrics without their own.
+        current_transaction().record_dimensional_metrics(
+            [("Metric.1", 1), ("Metric.2", 1), ("Metric.3", 1, {"own": 1})], tags=tags
+        )
+
+    _test()
+
+
 @reset_core_stats_engine()
 def test_dimensional_metrics_different_tags():
     @validate_transaction_metrics(
@@ -0,0 +1,196 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from testing_support.fixtures import override_application_settings
+
+from newrelic.api.background_task import background_task
+from newrelic.api.database_trace import DatabaseTrace
+from newrelic.api.datastore_trace import DatastoreTrace
+from newrelic.api.external_trace import ExternalTrace
+from newrelic.api.function_trace import FunctionTrace
+from newrelic.common.object_wrapper import transient_function_wrapper
+from newrelic.core.aggregate_node import AggregateNode
+from newrelic.core.function_node import FunctionNode
+from newrelic.core.stats_engine import MetricTable
+
+
+def capture_transaction(captured):
+    @transient_function_wrapper("newrelic.core.stats_engine", "StatsEngine.record_transaction")
+    def _capture_transaction(wrapped, instance, args, kwargs):
+        result = wrapped(*args, **kwargs)
+        captured.append((args[0], instance, dict(instance.stats_table)))
+        return result
+
+    return _capture_transaction
+
+
+@background_task(name="test_segment_aggregation")
+def _exercise():
+    with FunctionTrace("outer"):
+        for _ in range(10):
+            with FunctionTrace("inner"):
+                pass
+
+        for host in ("a", "b"):
+            for _ in range(5):
+                with DatastoreTrace("Redis", None, "get", host=host, port_path_or_id=6379):
+                    pass
+
+
+def _record(segments_per_transaction):
+    captured = []
+
+    @override_application_settings(
+        {
+            "agent_limits.segments_per_transaction": segments_per_transaction,
+            "datastore_tracer.instance_reporting.enabled": True,
+        }
+    )
+    @capture_transaction(captured)
+    def _test():
+        _exercise()
+
+    _test()
+
+    return captured[0]
+
+
+def _function_node(name, start_time, duration):
+    return FunctionNode(
+        group="Function",
+        name=name,
+        children=[],
+        start_time=start_time,
+        end_time=start_time + duration,
+        duration=duration,
+        exclusive=duration,
+        label=None,
+        params=None,
+        rollup=["Custom/all", "Custom/rollup"],
+        guid="0000000000000000",
+        agent_attributes={},
+        user_attributes={},
+    )
+
+
+@pytest.mark.parametrize("transaction_type", ("WebTransaction", "OtherTransaction"))
+def test_segment_aggregation_metrics_exact(transaction_type):
+    class Root(object):
+        path = "%s/Function/test" % transaction_type
+        type = transaction_type
+
+    durations = [0.5, 0.125, 2.0, 0.25, 1.0]
+    nodes = [_function_node("inner", 10.0 + i, duration) for i, duration in enumerate(durations)]
+
+    aggregate = AggregateNode(nodes[0])
+    for node in nodes[1:]:
+        aggregate.aggregate(node)
+
+    assert aggregate.call_count == len(nodes)
+    assert aggregate.start_time == 10.0
+    assert aggregate.end_time == 15.0
+
+    expected = MetricTable()
+    for node in nodes:
+        expected.record_time_metrics(node.time_metrics(None, Root, None))
+
+    metrics = MetricTable()
+    metrics.record_time_metrics(aggregate.time_metrics(None, Root, None))
+
+    assert dict(metrics.items()) == dict(expected.items())
+
+
+def test_segment_aggregation_call_counts():
+    _, _, expected = _record(None)
+    _, _, metrics = _record(3)
+
+    assert sorted(metrics) == sorted(expected)
+
+    for key, stats in expected.items():
+        assert metrics[key].call_count == stats.call_count, key
+
+
+def test_segment_aggregation_nodes():
+    node, stats, _ = _record(3)
+
+    (outer,) = node.root.children
+    aggregates = [child for child in outer.children if isinstance(child, AggregateNode)]
+
+    # The first three inner segments are kept as is, the remainder being
+    # aggregated by name, with each datastore instance aggregated apart.
+    assert len(outer.children) == 6
+    assert sorted(aggregate.call_count for aggregate in aggregates) == [5, 5, 7]
+    assert node.span_event_count() == 8
+    assert len(list(node.span_events(stats.settings))) == 8
+
+    # The transaction trace shows the aggregated segments as one segment.
+    trace = node.transaction_trace(stats, 2000, None)
+    (outer_trace,) = trace.root.children[0].children
+    call_counts = [child.params.get("aggregate_call_count") for child in outer_trace.children]
+    assert sorted(filter(None, call_counts)) == [5, 5, 7]
+
+
+def test_segment_aggregation_disabled():
+    node, _, _ = _record(None)
+
+    (outer,) = node.root.children
+    assert len(outer.children) == 20
+    assert node.span_event_count() == 22
+
+
+@pytest.mark.parametrize("segments_per_transaction,expected", ((None, 10), (3, 3)))
+def test_segment_aggregation_slow_sql(segments_per_transaction, expected):
+    captured = []
+
+    @override_application_settings(
+        {
+            "agent_limits.segments_per_transaction": segments_per_transaction,
+            "transaction_tracer.explain_threshold": 0.0,
+        }
+    )
+    @capture_transaction(captured)
+    @background_task(name="test_segment_aggregation_slow_sql")
+    def _test():
+        for _ in range(10):
+            with DatabaseTrace("SELECT * FROM t"):
+                pass
+
+    _test()
+
+    node, _, _ = captured[0]
+    assert len(node.slow_sql) == expected
+
+
+def test_segment_aggregation_cross_application_externals():
+    captured = []
+
+    @override_application_settings({"agent_limits.segments_per_transaction": 1})
+    @capture_transaction(captured)
+    @background_task(name="test_segment_aggregation_cross_application_externals")
+    def _test():
+        for _ in range(5):
+            with ExternalTrace("requests", "http://h/", "GET") as trace:
+                trace.params["cross_process_id"] = "1#2"
+                trace.params["external_txn_name"] = "name"
+
+    _test()
+
+    _, _, metrics = captured[0]
+
+    # The metrics of aggregated segments still identify the application
+    # and transaction called, which are only carried in the params.
+    assert metrics[("ExternalTransaction/h/1#2/name", "")].call_count == 5
+    assert metrics[("ExternalApp/h/1#2/all", "")].call_count == 5
+    assert ("External/h/requests/GET", "") not in metrics
@@ -46,6 +46,7 @@ from newrelic.api.time_trace import (
 )
 from newrelic.api.transaction import current_transaction
 from newrelic.common.object_names import callable_name
+from newrelic.common.object_wrapper import transient_function_wrapper
 
 ERROR = ValueError("whoops")
 ERROR_NAME = callable_name(ERROR)
@@ -565,6 +566,118 @@ def test_span_agent_attribute_overrides_transaction_attribute():
     transaction._add_agent_attribute("foo", "c")
 
 
+@override_application_settings({"attributes.include": "*"})
+@validate_span_events(count=1, exact_intrinsics={"name": "Function/child"}, exact_agents={"foo": "bar"})
+@dt_enabled
+@background_task(name="test_span_agent_attribute_added_after_trace_completed")
+def test_span_agent_attribute_added_after_trace_completed():
+    transaction = current_transaction()
+    transaction._sampled = True
+    transaction._priority = 1.5
+
+    # The span event is generated as the trace completes, so attributes added
+    # once it has exited must still be picked up.
+    with FunctionTrace("child") as trace:
+        pass
+
+    trace._add_agent_attribute("foo", "bar")
+
+
+@override_application_settings({"attributes.include": "*"})
+@validate_span_events(count=1, exact_intrinsics={"name": "Function/child"}, exact_agents={"foo": "baz"})
+@dt_enabled
+@background_task(name="test_span_agent_attribute_changed_after_trace_completed")
+def test_span_agent_attribute_changed_after_trace_completed():
+    transaction = current_transaction()
+    transaction._sampled = True
+    transaction._priority = 1.5
+
+    with FunctionTrace("child") as trace:
+        trace._add_agent_attribute("foo", "bar")
+
+    trace._add_agent_attribute("foo", "baz")
+
+
+@dt_enabled
+@background_task(name="test_span_event_caching_decides_sampling_up_front")
+def test_span_event_caching_decides_sampling_up_front():
+    transaction = current_transaction()
+
+    with FunctionTrace("child"):
+        pass
+
+    assert transaction._sampled is not None
+    assert transaction._priority is not None
+
+
+def test_span_event_caching_hands_back_sampling_decision():
+    released = []
+
+    @transient_function_wrapper("newrelic.api.application", "Application.release_sampled")
+    def _record_release_sampled(wrapped, instance, args, kwargs):
+        released.extend(args)
+        return wrapped(*args, **kwargs)
+
+    @_record_release_sampled
+    @validate_span_events(
+        count=2, exact_intrinsics={"traceId": "0af7651916cd43dd8448eb211c80319c", "priority": 1.5, "sampled": True}
+    )
+    @dt_enabled
+    @background_task(name="test_span_event_caching_hands_back_sampling_decision")
+    def _test():
+        transaction = current_transaction()
+
+        with FunctionTrace("child"):
+            pass
+
+        sampled = transaction._sampled
+
+        transaction._accept_distributed_trace_data(
+            {"ty": "App", "tr": "0af7651916cd43dd8448eb211c80319c", "pr": 1.5, "sa": True}, "HTTP"
+        )
+
+        assert released == [sampled]
+
+    _test()
+
+
+@pytest.mark.parametrize(
+    "sampled,segments_per_transaction,expected",
+    (
+        (True, None, [True, True, True]),
+        (False, None, [False, False, False]),
+        # Past the segment budget, nodes may be aggregated so are not cached.
+        (True, 1, [True, False, False]),
+    ),
+)
+def test_span_event_caching(sampled, segments_per_transaction, expected):
+    cached = []
+
+    @override_application_settings({"agent_limits.segments_per_transaction": segments_per_transaction})
+    @dt_enabled
+    @background_task(name="test_span_event_caching")
+    def _test():
+        transaction = current_transaction()
+        transaction._sampled = sampled
+        transaction._priority = 1.5
+
+        process_node = transaction._process_node
+
+        def _process_node(node, parent_guid=None):
+            process_node(node, parent_guid)
+            cached.append("_cached_span_event" in node.__dict__)
+
+        transaction._process_node = _process_node
+
+        for _ in range(3):
+            with FunctionTrace("child"):
+                pass
+
+    _test()
+
+    assert cached == expected
+
+
 def test_span_custom_attribute_limit():
     """
     This test validates that span attributes take precedence when
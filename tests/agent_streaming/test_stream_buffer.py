@@ -12,11 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import random
+
 import pytest
 from conftest import CONDITION_CLS
 
 from newrelic.common.streaming_utils import StreamBuffer, StreamBufferIterator
-from newrelic.core.infinite_tracing_pb2 import Span, SpanBatch
+from newrelic.core.infinite_tracing_pb2 import AttributeValue, Span, SpanBatch
 
 
 class StopIterationOnWait(CONDITION_CLS):
@@ -85,3 +87,83 @@ def test_stream_buffer_queue_size():
     assert len(stream_buffer) == 1
     assert stream_buffer._dropped == 1
     assert stream_buffer._seen == 2
+
+
+def test_stream_buffer_byte_size():
+    span = Span(intrinsics={}, agent_attributes={}, user_attributes={"key": AttributeValue(string_value="value")})
+    span_size = span.ByteSize()
+    stream_buffer = StreamBuffer(10, max_bytes=2 * span_size)
+
+    # Add more spans than the byte budget can hold
+    for _ in range(3):
+        stream_buffer.put(span)
+
+    # Ensure the oldest span is dropped to make room
+    assert len(stream_buffer) == 2
+    assert stream_buffer._bytes == 2 * span_size
+    assert stream_buffer._dropped == 1
+
+    # Spans larger than the whole budget are never stored
+    large_span = Span(
+        intrinsics={}, agent_attributes={}, user_attributes={"key": AttributeValue(string_value="v" * 100)}
+    )
+    stream_buffer.put(large_span)
+    assert len(stream_buffer) == 2
+    assert stream_buffer.stats() == (4, 2)
+
+    dropped_bytes, _ = stream_buffer.pressure_stats()
+    assert dropped_bytes == span_size + large_span.ByteSize()
+
+
+def test_stream_buffer_sampling(monkeypatch):
+    monkeypatch.setattr(random, "random", lambda: 0.5)
+    stream_buffer = StreamBuffer(8, sampling=True)
+
+    for _ in range(8):
+        span = Span(intrinsics={}, agent_attributes={}, user_attributes={})
+        stream_buffer.put(span)
+
+    # Spans are accepted until the buffer is three quarters full, after which
+    # the chance of keeping a span drops below the random value.
+    assert len(stream_buffer) == 6
+    assert stream_buffer.stats() == (8, 2)
+
+
+def test_stream_buffer_wait_time(stop_iteration_on_wait, batching):
+    stream_buffer = StreamBuffer(5, batching=batching)
+
+    for _ in range(3):
+        span = Span(intrinsics={}, agent_attributes={}, user_attributes={})
+        stream_buffer.put(span)
+
+    buffer_contents = list(stream_buffer)
+    _, wait_time = stream_buffer.pressure_stats()
+
+    # One wait time is recorded for each batch or span sent
+    assert wait_time["count"] == len(buffer_contents)
+    assert 0.0 <= wait_time["min"] <= wait_time["max"] <= wait_time["total"]
+
+    _, wait_time = stream_buffer.pressure_stats()
+    assert wait_time["count"] == 0
+
+
+def test_stream_buffer_notifies_waiting_consumer_once(monkeypatch):
+    notified = []
+
+    class CountNotify(CONDITION_CLS):
+        def notify_all(self):
+            notified.append(True)
+            return super(CountNotify, self).notify_all()
+
+    monkeypatch.setattr(StreamBuffer, "condition", staticmethod(CountNotify))
+    stream_buffer = StreamBuffer(5)
+
+    # Nothing is waiting so there is no one to wake up
+    stream_buffer.put(Span(intrinsics={}, agent_attributes={}, user_attributes={}))
+    assert not notified
+
+    # A waiting consumer is woken up once for any number of spans
+    stream_buffer._waiting = 1
+    for _ in range(3):
+        stream_buffer.put(Span(intrinsics={}, agent_attributes={}, user_attributes={}))
+    assert len(notified) == 1
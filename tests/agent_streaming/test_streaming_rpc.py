@@ -183,3 +183,33 @@ def test_rpc_serialization_and_deserialization(
     else:
         assert not span_batches_received, "Span batches incorrectly received."
         assert spans_received, "No spans received."
+
+
+def test_record_buffer_metrics(mock_grpc_server, buffer_empty_event, batching):
+    metrics = {}
+
+    def record_metric(name, value):
+        metrics[name] = value
+
+    endpoint = "localhost:%s" % mock_grpc_server
+    span = Span(intrinsics={}, agent_attributes={}, user_attributes={"key": AttributeValue(string_value="value")})
+    stream_buffer = StreamBuffer(2, batching=batching, max_bytes=span.ByteSize() + 1)
+
+    rpc = StreamingRpc(endpoint, stream_buffer, DEFAULT_METADATA, record_metric, ssl=False)
+
+    # The second span overflows the byte budget and pushes out the first
+    stream_buffer.put(span)
+    stream_buffer.put(span)
+
+    rpc.connect()
+    assert buffer_empty_event.wait(5)
+    rpc.close()
+
+    rpc.record_buffer_metrics()
+    assert metrics["Supportability/InfiniteTracing/Span/DroppedBytes"] == {"count": span.ByteSize()}
+    assert metrics["Supportability/InfiniteTracing/Span/QueueTime"]["count"] == 1
+
+    # Nothing is recorded when there has been no activity
+    metrics.clear()
+    rpc.record_buffer_metrics()
+    assert not metrics
@@ -0,0 +1,113 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import threading
+
+import pytest
+
+from newrelic.core.adaptive_sampler import AdaptiveSampler
+
+SAMPLING_TARGET = 10
+SAMPLING_PERIOD = 60.0
+
+
+def _next_period(sampler):
+    # Move the last reset back so the next call starts a new period.
+    sampler.last_reset -= SAMPLING_PERIOD
+
+
+@pytest.fixture
+def seeded_random():
+    state = random.getstate()
+    random.seed(0)
+    yield
+    random.setstate(state)
+
+
+@pytest.mark.parametrize("transactions_per_period", (100, 1000, 10000))
+def test_sampled_rate_converges_to_target(seeded_random, transactions_per_period):
+    sampler = AdaptiveSampler(SAMPLING_TARGET, SAMPLING_PERIOD)
+    periods = 100
+    counts = []
+
+    for _ in range(periods):
+        counts.append(sum(sampler.compute_sampled() for _ in range(transactions_per_period)))
+        _next_period(sampler)
+
+    # Only the sampling target can be sampled in the first period, after
+    # which up to twice the target may be sampled in any one period.
+    assert counts[0] == SAMPLING_TARGET
+    assert max(counts) <= 2 * SAMPLING_TARGET
+
+    mean = float(sum(counts[1:])) / (periods - 1)
+    assert SAMPLING_TARGET * 0.85 <= mean <= SAMPLING_TARGET * 1.15
+
+
+def test_sampled_rate_below_target(seeded_random):
+    sampler = AdaptiveSampler(SAMPLING_TARGET, SAMPLING_PERIOD)
+
+    # When there are fewer transactions than the target all are sampled.
+    for _ in range(5):
+        assert all(sampler.compute_sampled() for _ in range(SAMPLING_TARGET // 2))
+        _next_period(sampler)
+
+
+def test_sampled_rate_converges_across_threads(seeded_random):
+    sampler = AdaptiveSampler(SAMPLING_TARGET, SAMPLING_PERIOD)
+    num_threads = 8
+    transactions_per_thread = 250
+    periods = 40
+    counts = []
+
+    for _ in range(periods):
+        sampled = []
+
+        def compute_sampled():
+            results = [sampler.compute_sampled() for _ in range(transactions_per_thread)]
+            sampled.append(sum(results))
+
+        threads = [threading.Thread(target=compute_sampled) for _ in range(num_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        counts.append(sum(sampled))
+        _next_period(sampler)
+
+    # The maximum number sampled in a period must hold exactly, even
+    # though the decision not to sample is made without the lock.
+    assert counts[0] == SAMPLING_TARGET
+    assert max(counts) <= 2 * SAMPLING_TARGET
+
+    mean = float(sum(counts[1:])) / (periods - 1)
+    assert SAMPLING_TARGET * 0.8 <= mean <= SAMPLING_TARGET * 1.2
+
+
+def test_release_sampled(seeded_random):
+    sampler = AdaptiveSampler(SAMPLING_TARGET, SAMPLING_PERIOD)
+
+    # Handing back the decisions frees up the slots they used.
+    for _ in range(SAMPLING_TARGET):
+        assert sampler.compute_sampled()
+        sampler.release_sampled(True)
+
+    assert sampler.computed_count == 0
+    assert sampler.sampled_count == 0
+
+    # Nor do the counts go negative once they have been reset.
+    sampler.release_sampled(True)
+    assert sampler.computed_count == 0
+    assert sampler.sampled_count == 0
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import pytest
+from newrelic.common.agent_http import persistent_connection_pool
 from newrelic.core.agent import Agent
 from newrelic.core.config import finalize_application_settings
 from testing_support.fixtures import override_generic_settings
@@ -73,3 +74,22 @@ def test_agent_final_harvest(agent):
 
     assert agent._applications['fake'].harvest_flexible == 1
     assert agent._applications['fake'].harvest_default == 1
+
+
+class FakeConnectionPool(object):
+    def __init__(self):
+        self.pool = []
+
+    def close(self):
+        self.pool = None
+
+
+def test_agent_shutdown_closes_persistent_connections(agent):
+    pool = persistent_connection_pool(("fake", 443), FakeConnectionPool)
+    assert pool.pool is not None
+
+    agent.activate_agent()
+    agent.shutdown_agent(timeout=5)
+
+    assert pool.pool is None
+    assert persistent_connection_pool(("fake", 443), FakeConnectionPool) is not pool
@@ -165,6 +165,28 @@ def override_system_info(monkeypatch):
     monkeypatch.setattr(os, "getpid", lambda *args, **kwargs: PID)
 
 
+class StreamingHttpClientRecorder(HttpClientRecorder):
+    streaming_payloads = True
+
+
+@pytest.mark.parametrize("streaming_payloads", (True, False))
+def test_send_streaming_payloads(streaming_payloads):
+    HttpClientRecorder.STATUS_CODE = 202
+    settings = finalize_application_settings({"agent_limits.data_collector_streaming_payloads": streaming_payloads})
+    protocol = AgentProtocol(settings, client_cls=StreamingHttpClientRecorder)
+    protocol.send("metric_data", (1, 2, 3))
+
+    # Payloads are only handed to the client as chunks to be encoded as
+    # they are sent when enabled.
+    payload = HttpClientRecorder.SENT[0].payload
+    if streaming_payloads:
+        payload = b"".join(chunk.encode("utf-8") for chunk in payload)
+    else:
+        assert isinstance(payload, bytes)
+
+    assert payload == b"[1,2,3]"
+
+
 @pytest.mark.parametrize("status_code", (None, 202))
 def test_send(status_code):
     HttpClientRecorder.STATUS_CODE = status_code
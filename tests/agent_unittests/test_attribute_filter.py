@@ -0,0 +1,89 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+
+import pytest
+
+from newrelic.core.attribute_filter import (
+    DST_ALL,
+    DST_ERROR_COLLECTOR,
+    DST_SPAN_EVENTS,
+    DST_TRANSACTION_EVENTS,
+    AttributeFilter,
+)
+
+SETTINGS = {
+    "attributes.enabled": True,
+    "transaction_events.attributes.enabled": True,
+    "error_collector.attributes.enabled": True,
+    "span_events.attributes.enabled": True,
+}
+
+
+def _linear_apply(attribute_filter, name, default_destinations):
+    # Reference implementation testing every rule against the name.
+
+    destinations = attribute_filter.enabled_destinations & default_destinations
+
+    for rule in attribute_filter.rules:
+        if rule.name_match(name):
+            if rule.is_include:
+                destinations |= rule.destinations & attribute_filter.enabled_destinations
+            else:
+                destinations &= ~rule.destinations
+
+    return destinations
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_attribute_filter_index(seed):
+    rng = random.Random(seed)
+    alphabet = "ab."
+
+    def random_name():
+        return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 4)))
+
+    def random_rules():
+        return [random_name() + rng.choice(("", "*")) for _ in range(rng.randint(0, 6))]
+
+    settings = dict(SETTINGS)
+    settings["attributes.include"] = random_rules()
+    settings["attributes.exclude"] = random_rules()
+    settings["transaction_events.attributes.exclude"] = random_rules()
+    settings["error_collector.attributes.include"] = random_rules()
+    settings["span_events.attributes.exclude"] = random_rules()
+
+    attribute_filter = AttributeFilter(settings)
+
+    for _ in range(200):
+        name = random_name()
+        default_destinations = rng.choice((DST_ALL, DST_TRANSACTION_EVENTS | DST_SPAN_EVENTS, DST_ERROR_COLLECTOR))
+        expected = _linear_apply(attribute_filter, name, default_destinations)
+        assert attribute_filter.apply(name, default_destinations) == expected
+
+
+def test_attribute_filter_cache_size():
+    settings = dict(SETTINGS)
+    settings["attributes.exclude"] = ["request.parameters.*"]
+    settings["agent_limits.attribute_filter_cache_size"] = 2
+
+    attribute_filter = AttributeFilter(settings)
+
+    for name in ("request.parameters.a", "request.parameters.b", "request.parameters.c", "custom"):
+        expected = _linear_apply(attribute_filter, name, DST_ALL)
+        assert attribute_filter.apply(name, DST_ALL) == expected
+
+    assert len(attribute_filter.cache) == 2
+    assert attribute_filter.apply("request.parameters.a", DST_ALL) == DST_ALL & ~DST_ALL
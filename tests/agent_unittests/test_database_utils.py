@@ -0,0 +1,154 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sqlite3
+import weakref
+
+import pytest
+from testing_support.fixtures import override_generic_settings
+
+from newrelic.core.config import global_settings
+from newrelic.core.database_utils import (
+    _normalize_sql,
+    _obfuscate_sql,
+    _sql_statements,
+    record_sql_statement_cache_metrics,
+    sql_statement,
+)
+from newrelic.core.internal_metrics import InternalTraceContext
+from newrelic.core.stats_engine import CustomMetrics
+
+settings = global_settings()
+
+
+@pytest.fixture(autouse=True)
+def clear_sql_statements():
+    _sql_statements.clear()
+    _sql_statements.reset_counts()
+    yield
+    _sql_statements.clear()
+    _sql_statements.reset_counts()
+
+
+@override_generic_settings(settings, {"agent_limits.sql_statement_cache_size": 2})
+def test_sql_statement_cache():
+    first = sql_statement("SELECT * FROM a WHERE b = %s", sqlite3)
+
+    # Statements are retained once nothing else references them.
+    first_id = id(first)
+    del first
+    first = sql_statement("SELECT * FROM a WHERE b = %s", sqlite3)
+    assert id(first) == first_id
+
+    # Statements used since being added are kept when one is evicted.
+    second = sql_statement("SELECT * FROM c", sqlite3)
+    assert sql_statement("SELECT * FROM a WHERE b = %s", sqlite3) is first
+    sql_statement("SELECT * FROM d", sqlite3)
+
+    assert len(_sql_statements) == 2
+    assert sql_statement("SELECT * FROM a WHERE b = %s", sqlite3) is first
+    assert sql_statement("SELECT * FROM c", sqlite3) is not second
+
+    # The database module forms part of the key.
+    assert sql_statement("SELECT * FROM a WHERE b = %s", None) is not first
+
+    internal_metrics = CustomMetrics()
+    with InternalTraceContext(internal_metrics):
+        record_sql_statement_cache_metrics()
+        record_sql_statement_cache_metrics()
+
+    internal_metrics = dict(internal_metrics.metrics())
+    assert internal_metrics["Supportability/Python/DatabaseUtils/Counts/sql_statement_cache_hit"][0] == 3
+    assert internal_metrics["Supportability/Python/DatabaseUtils/Counts/sql_statement_cache_miss"][0] == 5
+
+
+@override_generic_settings(settings, {"agent_limits.sql_statement_cache_size": 2})
+def test_sql_statement_cache_literals():
+    first = sql_statement("SELECT * FROM a WHERE b = 1", sqlite3)
+
+    # Statements with literal values in them are only shared while still
+    # in use, so the values aren't kept once the statement is discarded.
+    assert sql_statement("SELECT * FROM a WHERE b = 1", sqlite3) is first
+    assert not len(_sql_statements)
+
+    first = weakref.ref(first)
+    assert first() is None
+
+
+@override_generic_settings(
+    settings,
+    {"agent_limits.sql_statement_cache_size": 2, "agent_limits.sql_statement_cache_length_maximum": 10},
+)
+def test_sql_statement_cache_length_maximum():
+    first = sql_statement("SELECT * FROM a", sqlite3)
+
+    # Long statements are only shared while still in use.
+    assert sql_statement("SELECT * FROM a", sqlite3) is first
+    assert not len(_sql_statements)
+
+    short = sql_statement("SELECT a", sqlite3)
+    assert sql_statement("SELECT a", sqlite3) is short
+    assert len(_sql_statements) == 1
+
+
+@override_generic_settings(settings, {"agent_limits.sql_statement_cache_size": 0})
+def test_sql_statement_cache_disabled():
+    first = sql_statement("SELECT * FROM a", sqlite3)
+    assert sql_statement("SELECT * FROM a", sqlite3) is first
+    assert not len(_sql_statements)
+
+
+class DummyDB(object):
+    def __init__(self, quoting_style):
+        self.quoting_style = quoting_style
+
+
+@pytest.mark.parametrize(
+    "quoting_style,sql,obfuscated",
+    (
+        (
+            "single",
+            "SELECT * FROM t WHERE a = 'x' AND b = 1 AND c = true",
+            "SELECT * FROM t WHERE a = ? AND b = ? AND c = ?",
+        ),
+        ("single", "SELECT * FROM t WHERE a = '1 true' AND b = -1.5e3", "SELECT * FROM t WHERE a = ? AND b = ?"),
+        ("single", "SELECT * FROM t1 WHERE a = :1 AND b = 0x1F", "SELECT * FROM t1 WHERE a = :1 AND b = ?"),
+        ("single+double", 'SELECT * FROM t WHERE a = "x" AND b = NULL', "SELECT * FROM t WHERE a = ? AND b = ?"),
+        (
+            "single+dollar",
+            "SELECT * FROM t WHERE a = $tag$1 'x'$tag$ AND b = $1",
+            "SELECT * FROM t WHERE a = ? AND b = $?",
+        ),
+        ("single+oracle", "SELECT * FROM t WHERE a = q'[x 'y']' AND b = 1", "SELECT * FROM t WHERE a = ? AND b = ?"),
+        ("single+oracle", "SELECT * FROM t WHERE a = trueq'[x]'", "SELECT * FROM t WHERE a = ??"),
+        ("single", "SELECT * FROM t WHERE a = 'x", "?"),
+    ),
+)
+def test_obfuscate_sql(quoting_style, sql, obfuscated):
+    assert _obfuscate_sql(sql, DummyDB(quoting_style)) == obfuscated
+
+
+@pytest.mark.parametrize(
+    "sql,normalized",
+    (
+        ("  SELECT  *\n\tFROM  t  WHERE a = ?  ", "SELECT*FROM t WHERE a=?"),
+        ("INSERT INTO t (a, b) VALUES (?, ?), (?, ?)", "INSERT INTO t(?)VALUES(?),(?)"),
+        ("INSERT INTO t VALUES (%(a)s, %(b)s)", "INSERT INTO t VALUES(?)"),
+        ("SELECT * FROM t WHERE a = %s AND b = :name AND c = :1", "SELECT*FROM t WHERE a=?AND b=?AND c=?"),
+        ("SELECT a\xa0\r\nFROM t", "SELECT a FROM t"),
+        ("", ""),
+    ),
+)
+def test_normalize_sql(sql, normalized):
+    assert _normalize_sql(sql) == normalized
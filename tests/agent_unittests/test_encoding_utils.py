@@ -12,9 +12,23 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections import OrderedDict, namedtuple
+
 import pytest
 
-from newrelic.common.encoding_utils import camel_case, snake_case
+from newrelic.common.encoding_utils import (
+    camel_case,
+    json_decode,
+    json_encode,
+    json_encode_chunks,
+    json_encoder,
+    orjson,
+    orjson_encode,
+    snake_case,
+)
+from newrelic.core.config import global_settings
+
+Pair = namedtuple("Pair", ["first", "second"])
 
 
 @pytest.mark.parametrize("input_,expected,upper", [
@@ -50,3 +64,57 @@ def test_camel_case(input_, expected, upper):
 def test_snake_case(input_, expected):
     output = snake_case(input_)
     assert output == expected
+
+
+@pytest.mark.parametrize("batch_size", (1, 2, 256))
+@pytest.mark.parametrize("payload", [
+    lambda: [],
+    lambda: "string",
+    lambda: {"key": [1, 2]},
+    lambda: ["RUN_ID", {"reservoir_size": 5}, []],
+    lambda: ["RUN_ID", {"reservoir_size": 5}, [[{"a": 1}, {}, {}], [{"b": b"bytes"}, {}, {}], [{"c": 3}, {}, {}]]],
+    lambda: ["RUN_ID", 1.0, 2.0, ([{"name": "metric"}, [i, 0.0]] for i in range(5))],
+    lambda: [(i for i in range(3)), [[1, [2, [3]]]], (4,)],
+])
+def test_json_encode_chunks(payload, batch_size):
+    # Payloads are built by a function as generators are consumed when
+    # encoded.
+    expected = json_encode(payload())
+    assert "".join(json_encode_chunks(payload(), batch_size=batch_size)) == expected
+
+
+@pytest.mark.skipif(orjson is None, reason="orjson is not installed")
+@pytest.mark.parametrize("payload", [
+    lambda: ["RUN_ID", 1.5, 1e16, [[{"name": "metric", "scope": ""}, [1, 0.25, 0.25, 0.25, 0.25, 0.0625]]]],
+    lambda: [{"intrinsic": "value", "unicode": u"\u00e9\u4e2d"}, {}, {"agent": None, "bool": True}],
+    lambda: {1: "int", 2.5: "float", True: "bool", None: "null", "str": "str"},
+    lambda: [b"latin-1 \xe9", (i for i in range(3)), Pair(1, 2), OrderedDict([("b", 1), ("a", 2)])],
+    lambda: [2 ** 64, u"lone \ud800 surrogate"],
+])
+def test_orjson_encode_parity(payload):
+    assert json_decode(orjson_encode(payload())) == json_decode(json_encode(payload()))
+    assert json_decode("".join(json_encode_chunks(payload(), batch_size=2, encoder=orjson_encode))) == json_decode(
+        json_encode(payload())
+    )
+
+
+@pytest.mark.skipif(orjson is None, reason="orjson is not installed")
+def test_orjson_encode_unserializable():
+    with pytest.raises(TypeError):
+        orjson_encode([object()])
+
+
+@pytest.mark.parametrize("name", ("auto", "json", "orjson", "unknown"))
+def test_json_encoder(name):
+    if name == "json" or (orjson is None and name != "orjson"):
+        assert json_encoder(name) is json_encode
+    elif orjson is not None:
+        assert json_encoder(name) is orjson_encode
+    else:
+        assert json_encoder(name) is json_encode
+
+
+def test_json_library_default():
+    # Payloads are only encoded with orjson when configured, as it doesn't
+    # escape non-ASCII characters and encodes NaN and Infinity as null.
+    assert json_encoder(global_settings().json_library) is json_encode
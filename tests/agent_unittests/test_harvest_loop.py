@@ -14,6 +14,7 @@
 
 import random
 import tempfile
+import threading
 import time
 
 import pytest
@@ -23,18 +24,28 @@ from testing_support.fixtures import (
     override_generic_settings,
 )
 
-from newrelic.common.agent_http import DeveloperModeClient
+from newrelic.common.agent_http import (
+    DeveloperModeClient,
+    close_persistent_connection_pools,
+    persistent_connection_pool,
+)
 from newrelic.common.object_wrapper import function_wrapper, transient_function_wrapper
-from newrelic.core.application import Application
+from newrelic.core.application import Application, HarvestSender, HarvestSendPool
 from newrelic.core.config import finalize_application_settings, global_settings
 from newrelic.core.custom_event import create_custom_event
 from newrelic.core.error_node import ErrorNode
 from newrelic.core.function_node import FunctionNode
+from newrelic.core.internal_metrics import internal_count_metric
 from newrelic.core.log_event_node import LogEventNode
+from newrelic.core.log_line_counter import harvest_log_line_metrics, record_log_line
 from newrelic.core.root_node import RootNode
 from newrelic.core.stats_engine import CustomMetrics, SampledDataSet, DimensionalMetrics
 from newrelic.core.transaction_node import TransactionNode
-from newrelic.network.exceptions import RetryDataForRequest
+from newrelic.network.exceptions import (
+    ForceAgentDisconnect,
+    ForceAgentRestart,
+    RetryDataForRequest,
+)
 
 settings = global_settings()
 
@@ -483,6 +494,63 @@ def test_transaction_count(transaction_node):
     assert app._transaction_count == 0
 
 
+@override_generic_settings(
+    settings,
+    {
+        "developer_mode": True,
+        "license_key": "**NOT A LICENSE KEY**",
+        "feature_flag": set(),
+        "collect_custom_events": False,
+        "application_logging.forwarding.enabled": False,
+        "stats_engine.thread_local_workareas": True,
+    },
+)
+def test_thread_local_workareas(transaction_node):
+    app = Application("Python Agent Test (Harvest Loop)")
+    app.connect_to_data_collector(None)
+
+    # Keep all threads alive until each has recorded its transactions so
+    # that thread IDs are not reused.
+    recorded = threading.Semaphore(0)
+    release = threading.Event()
+
+    def record_transactions():
+        for _ in range(2):
+            app.record_transaction(transaction_node)
+        recorded.release()
+        release.wait()
+
+    threads = [threading.Thread(target=record_transactions) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for _ in threads:
+        recorded.acquire()
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    # Transactions are held in a workarea per thread until harvest
+    assert len(app._stats_workareas) == 3
+    assert ("OtherTransaction/Function/main", "") not in app._stats_engine.stats_table
+
+    stats_key = ("OtherTransaction/Function/main", "")
+    metric_counts = []
+
+    @transient_function_wrapper("newrelic.core.stats_engine", "StatsEngine.metric_data")
+    def _capture_metric_data(wrapped, instance, args, kwargs):
+        metric_counts.append(instance.stats_table[stats_key].call_count)
+        return wrapped(*args, **kwargs)
+
+    _capture_metric_data(app.harvest)()
+
+    assert metric_counts == [6]
+    assert app._stats_engine.transaction_events.num_seen == 0
+
+    # Workareas which recorded nothing since the last harvest are retired
+    app.harvest()
+    assert not app._stats_workareas
+
+
 @override_generic_settings(
     settings,
     {
@@ -551,6 +619,261 @@ def test_reservoir_sizes(transaction_node):
     assert app._stats_engine.span_events.num_samples == 102
 
 
+_concurrent_harvest_settings = {
+    "developer_mode": True,
+    "license_key": "**NOT A LICENSE KEY**",
+    "feature_flag": set(),
+    "distributed_tracing.enabled": True,
+    "application_logging.forwarding.enabled": True,
+    "agent_limits.harvest_send_workers": 4,
+}
+
+
+@override_generic_settings(settings, _concurrent_harvest_settings)
+def test_concurrent_harvest(transaction_node):
+    endpoints_called = []
+
+    @transient_function_wrapper("newrelic.core.agent_protocol", "AgentProtocol.send")
+    def send_request_wrapper(wrapped, instance, args, kwargs):
+        endpoints_called.append(args[0])
+        return wrapped(*args, **kwargs)
+
+    app = Application("Python Agent Test (Harvest Loop)")
+    app.connect_to_data_collector(None)
+    app.record_transaction(transaction_node)
+
+    send_request_wrapper(app.harvest)()
+
+    event_endpoints = ("span_event_data", "error_event_data", "custom_event_data", "log_event_data", "error_data")
+    metric_data = endpoints_called.index("metric_data")
+    for endpoint in event_endpoints:
+        assert endpoints_called.index(endpoint) < metric_data
+
+    assert app._stats_engine.span_events.num_seen == 0
+    assert app._stats_engine.custom_events.num_seen == 0
+    assert app._stats_engine.log_events.num_seen == 0
+
+
+@failing_endpoint("span_event_data")
+@override_generic_settings(settings, _concurrent_harvest_settings)
+def test_concurrent_harvest_failed_endpoint(transaction_node):
+    endpoints_called = []
+
+    @transient_function_wrapper("newrelic.core.agent_protocol", "AgentProtocol.send")
+    def send_request_wrapper(wrapped, instance, args, kwargs):
+        endpoints_called.append(args[0])
+        return wrapped(*args, **kwargs)
+
+    app = Application("Python Agent Test (Harvest Loop)")
+    app.connect_to_data_collector(None)
+    app.record_transaction(transaction_node)
+
+    send_request_wrapper(app.harvest)()
+
+    # The failed span events are rolled back into the next harvest, while
+    # the events which were sent at the same time are not. As for a failure
+    # sending sequentially, metric data is not sent but rolled back.
+    assert "metric_data" not in endpoints_called
+    assert app._stats_engine.span_events.num_seen == 102
+    assert app._stats_engine.custom_events.num_seen == 0
+    assert app._stats_engine.metrics_count() > 0
+
+
+@override_generic_settings(settings, _concurrent_harvest_settings)
+def test_concurrent_harvest_reuses_send_pool(transaction_node):
+    app = Application("Python Agent Test (Harvest Loop)")
+    app.connect_to_data_collector(None)
+
+    app.record_transaction(transaction_node)
+    app.harvest()
+
+    pool = app._send_pool
+    workers = list(pool._workers)
+    assert workers
+
+    app.record_transaction(transaction_node)
+    app.harvest()
+
+    # The threads are kept by the application rather than started for
+    # every harvest.
+    assert app._send_pool is pool
+    assert pool._workers == workers
+    assert all(worker.is_alive() for worker in workers)
+
+    app.internal_agent_shutdown(restart=False)
+    assert app._send_pool is None
+
+
+@pytest.mark.parametrize("exc_type", (ForceAgentRestart, ForceAgentDisconnect))
+@override_generic_settings(settings, _concurrent_harvest_settings)
+def test_concurrent_harvest_sends_payloads_before_shutdown(transaction_node, exc_type):
+    endpoints_called = []
+
+    @transient_function_wrapper("newrelic.core.agent_protocol", "AgentProtocol.send")
+    def send_request_wrapper(wrapped, instance, args, kwargs):
+        if args[0] == "custom_event_data":
+            time.sleep(0.1)
+
+        endpoints_called.append(args[0])
+        return wrapped(*args, **kwargs)
+
+    # The harvest is aborted on the harvest thread while the payloads which
+    # were already handed off are still being sent.
+    @transient_function_wrapper("newrelic.core.stats_engine", "StatsEngine.transaction_trace_data")
+    def transaction_trace_data_wrapper(wrapped, instance, args, kwargs):
+        raise exc_type()
+
+    app = Application("Python Agent Test (Harvest Loop)")
+    app.connect_to_data_collector(None)
+    app.record_transaction(transaction_node)
+
+    app.activate_session = lambda *args, **kwargs: None
+    transaction_trace_data_wrapper(send_request_wrapper(app.harvest))()
+
+    # The session is only shut down once the payloads still being sent
+    # using it have been sent.
+    assert endpoints_called.index("custom_event_data") < endpoints_called.index("shutdown")
+
+
+@pytest.mark.parametrize("restart", (True, False))
+@override_generic_settings(
+    settings,
+    {
+        "developer_mode": True,
+        "license_key": "**NOT A LICENSE KEY**",
+    },
+)
+def test_agent_shutdown_keeps_persistent_connections(restart):
+    app = Application("Python Agent Test (Harvest Loop)")
+    app.connect_to_data_collector(None)
+
+    closed = []
+
+    class FakeConnectionPool(object):
+        pool = []
+
+        def close(self):
+            closed.append(self)
+
+    pool = persistent_connection_pool(("harvest-loop.fake", 443), FakeConnectionPool)
+
+    # The persistent connections are shared with other applications, so
+    # are left open when the session of one application is shut down as
+    # the agent is told to restart or to disconnect.
+    try:
+        app.activate_session = lambda *args, **kwargs: None
+        app.internal_agent_shutdown(restart=restart)
+
+        assert closed == []
+        assert persistent_connection_pool(("harvest-loop.fake", 443), FakeConnectionPool) is pool
+    finally:
+        close_persistent_connection_pools()
+
+    assert closed == [pool]
+
+
+@pytest.mark.parametrize("default_application", (True, False))
+@override_generic_settings(
+    settings,
+    {
+        "developer_mode": True,
+    },
+)
+def test_harvest_log_line_metrics_outside_transaction(default_application):
+    app_name = settings.app_name if default_application else "Python Agent Test (Harvest Loop)"
+    app = Application(app_name)
+    app.connect_to_data_collector(None)
+
+    metric_names = []
+
+    @transient_function_wrapper("newrelic.core.stats_engine", "StatsEngine.metric_data")
+    def capture_metric_names(wrapped, instance, args, kwargs):
+        metric_names.extend(name for name, _ in instance.stats_table)
+        return wrapped(*args, **kwargs)
+
+    @capture_metric_names
+    def _test():
+        harvest_log_line_metrics()
+
+        record_log_line("WARNING")
+        record_log_line("WARNING")
+
+        app.harvest()
+
+    _test()
+
+    # Log lines counted outside of transactions are only reported by the
+    # default application, which the hooks would have recorded them in.
+    expected = ["Logging/lines", "Logging/lines/WARNING"] if default_application else []
+    assert sorted(name for name in metric_names if name.startswith("Logging/lines")) == expected
+
+    if not default_application:
+        assert harvest_log_line_metrics()
+
+
+def test_harvest_sender_close_completes_sent_payloads():
+    pool = HarvestSendPool(2)
+    internal_metrics = CustomMetrics()
+    sender = HarvestSender(internal_metrics, pool)
+    callbacks = []
+
+    def send():
+        internal_count_metric("Supportability/Test/Sent", 1)
+
+    def fail():
+        raise RetryDataForRequest()
+
+    sender.send(lambda: callbacks.append("sent"), send)
+    sender.send(lambda: callbacks.append("failed"), fail)
+    sender.send(lambda: callbacks.append("no payload"))
+
+    # Closing the sender, as when the harvest is aborted before waiting on
+    # it, still runs the callbacks of the payloads which were sent and
+    # keeps their metrics, without raising the exception from the failure.
+    sender.close()
+    pool.shutdown()
+
+    assert callbacks == ["sent", "no payload"]
+    assert dict(internal_metrics.metrics())["Supportability/Test/Sent"][0] == 1
+
+
+@pytest.mark.parametrize("priority", (0.5, 1.5))
+@override_generic_settings(
+    settings,
+    {
+        "developer_mode": True,
+        "license_key": "**NOT A LICENSE KEY**",
+        "feature_flag": set(),
+        "distributed_tracing.enabled": True,
+        "event_harvest_config.harvest_limits.span_event_data": 1,
+    },
+)
+def test_span_events_not_generated_for_full_reservoir(transaction_node, priority):
+    app = Application("Python Agent Test (Harvest Loop)")
+    app.connect_to_data_collector(None)
+
+    # Fill the reservoir with a span which can only be displaced by one with
+    # a higher priority than the transaction (priority=1.0) being recorded.
+    app._stats_engine.span_events.add("span event", priority=priority)
+
+    calls = []
+
+    @transient_function_wrapper("newrelic.core.transaction_node", "TransactionNode.span_events")
+    def _span_events(wrapped, instance, args, kwargs):
+        calls.append(True)
+        return wrapped(*args, **kwargs)
+
+    _span_events(app.record_transaction)(transaction_node)
+
+    # Span events are only generated when they could be kept, but all are
+    # still counted as seen. Add 1 for the root span.
+    assert bool(calls) == (priority < 1.0)
+    assert app._stats_engine.span_events.num_seen == 1 + 102
+    assert app._stats_engine.span_events.num_samples == 1
+    if priority > 1.0:
+        assert list(app._stats_engine.span_events) == ["span event"]
+
+
 @pytest.mark.parametrize(
     "harvest_name, event_name",
     [
@@ -31,6 +31,8 @@ from newrelic.common.agent_http import (
     HttpClient,
     InsecureHttpClient,
     ServerlessModeClient,
+    SupportabilityMixin,
+    close_persistent_connection_pools,
 )
 from newrelic.common.encoding_utils import ensure_str
 from newrelic.common.object_names import callable_name
@@ -120,6 +122,17 @@ class SecureServer(InsecureServer):
             )
 
 
+def keep_alive_response(self):
+    self.server.connections.append(self.connection)
+    content_length = int(self.headers.get("Content-Length", 0))
+    if content_length:
+        self.rfile.read(content_length)
+    self.send_response(200)
+    self.send_header("Content-Length", "2")
+    self.end_headers()
+    self.wfile.write(b"ok")
+
+
 @pytest.fixture(scope="module")
 def server():
     with SecureServer() as server:
@@ -259,6 +272,47 @@ def test_http_close_connection(server):
     client.close_connection()
 
 
+class InsecureApplicationModeClient(SupportabilityMixin, InsecureHttpClient):
+    pass
+
+
+@pytest.mark.parametrize("idle_timeout", (None, 0.0))
+def test_persistent_connections(idle_timeout):
+    internal_metrics = CustomMetrics()
+
+    with InsecureServer(handler=keep_alive_response) as server:
+        server.httpd.RequestHandlerClass.protocol_version = "HTTP/1.1"
+
+        try:
+            for _ in range(2):
+                with InsecureApplicationModeClient(
+                    "localhost",
+                    server.port,
+                    persistent_connections=True,
+                    connection_idle_timeout=idle_timeout,
+                ) as client:
+                    with InternalTraceContext(internal_metrics):
+                        status, _ = client.send_request()
+                    assert status == 200
+
+                    client.close_connection()
+        finally:
+            close_persistent_connection_pools()
+
+    connections = server.httpd.connections
+    internal_metrics = dict(internal_metrics.metrics())
+
+    assert len(connections) == 2
+    if idle_timeout is None:
+        assert connections[0] is connections[1]
+        assert internal_metrics["Supportability/Python/Collector/Connection/Handshakes"][0] == 1
+        assert internal_metrics["Supportability/Python/Collector/Connection/HandshakesAvoided"][0] == 1
+    else:
+        assert connections[0] is not connections[1]
+        assert internal_metrics["Supportability/Python/Collector/Connection/Handshakes"][0] == 2
+        assert "Supportability/Python/Collector/Connection/HandshakesAvoided" not in internal_metrics
+
+
 def test_http_close_connection_in_context_manager():
     client = HttpClient("localhost", 1000)
     with client:
@@ -357,6 +411,71 @@ def test_http_payload_compression(server, client_cls, method, threshold):
     assert sent_payload == payload
 
 
+@pytest.mark.parametrize("threshold", (0, 100, 1000))
+def test_http_streamed_payload(server, threshold):
+    chunks = ['["a"', ",", '"%s"' % ("*" * 200), ",", '"b"]']
+    payload = "".join(chunks).encode("utf-8")
+
+    internal_metrics = CustomMetrics()
+
+    with ApplicationModeClient(
+        "localhost",
+        server.port,
+        disable_certificate_validation=True,
+        compression_threshold=threshold,
+    ) as client:
+        # Force the stream through the compressor in several parts.
+        client.STREAMING_BUFFER_SIZE = 50
+        with InternalTraceContext(internal_metrics):
+            status, data = client.send_request(payload=iter(chunks), params={"method": "method1"})
+
+    assert status == 200
+    sent_payload = data.split(b"\n")[-1]
+    internal_metrics = dict(internal_metrics.metrics())
+
+    assert internal_metrics["Supportability/Python/Collector/method1/Output/Bytes"][:2] == [1, len(payload)]
+
+    if threshold < len(payload):
+        assert internal_metrics["Supportability/Python/Collector/method1/ZLIB/Bytes"][:2] == [1, len(sent_payload)]
+        decompressor = zlib.decompressobj(31)
+        sent_payload = decompressor.decompress(sent_payload) + decompressor.flush()
+    else:
+        assert "Supportability/Python/Collector/method1/ZLIB/Bytes" not in internal_metrics
+
+    assert sent_payload == payload
+
+
+@pytest.mark.parametrize(
+    "compression_level,time_budget,compression_time,expected_level",
+    (
+        (None, None, 1.0, None),
+        (None, 0.1, 1.0, 5),
+        (None, 0.1, 0.06, 6),
+        (None, 0.1, 0.0, 6),
+        (9, 0.1, 1.0, 9),
+    ),
+)
+def test_http_compression_level_tuning(compression_level, time_budget, compression_time, expected_level):
+    client = HttpClient(
+        "localhost",
+        compression_level=compression_level,
+        compression_time_budget=time_budget,
+    )
+    client._tune_compression_level(1024 * 1024, compression_time)
+
+    assert client._compression_level == expected_level
+
+    if expected_level == 5:
+        # Levels are stepped down no further than 1 and back up no further
+        # than the zlib default.
+        for _ in range(10):
+            client._tune_compression_level(1024 * 1024, compression_time)
+        assert client._compression_level == 1
+        for _ in range(10):
+            client._tune_compression_level(1024 * 1024, 0.0)
+        assert client._compression_level == 6
+
+
 def test_cert_path(server):
     with HttpClient("localhost", server.port, ca_bundle_path=SERVER_CERT) as client:
         status, data = client.send_request()
@@ -510,6 +629,25 @@ def test_max_payload_does_not_send(insecure_server):
     assert not data
 
 
+def test_max_payload_stops_streamed_encoding(insecure_server):
+    consumed = []
+
+    def chunks():
+        for chunk in ("[", '"*"', ",", '"*"', "]"):
+            consumed.append(chunk)
+            yield chunk
+
+    with InsecureHttpClient(
+        "localhost", insecure_server.port, max_payload_size_in_bytes=0, compression_threshold=0
+    ) as client:
+        client.STREAMING_BUFFER_SIZE = 1
+        status, data = client.send_request(payload=chunks())
+
+    assert status == 413
+    assert not data
+    assert len(consumed) == 1
+
+
 @pytest.mark.parametrize(
     "method",
     (
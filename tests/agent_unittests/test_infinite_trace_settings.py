@@ -24,6 +24,7 @@ INI_FILE_INFINITE_TRACING = b"""
 infinite_tracing.trace_observer_host = y
 infinite_tracing.trace_observer_port = 1234
 infinite_tracing.span_queue_size = 2000
+infinite_tracing.span_queue_byte_size = 1000000
 """
 
 
@@ -80,3 +81,20 @@ def test_infinite_tracing_span_queue_size(ini, env, expected_size, global_settin
 
     settings = global_settings()
     assert settings.infinite_tracing.span_queue_size == expected_size
+
+
+# Tests for loading Infinite Tracing span queue byte size setting
+# and testing values precedence
+@pytest.mark.parametrize(
+    "ini,env,expected_size",
+    (
+        (INI_FILE_EMPTY, {}, 0),
+        (INI_FILE_EMPTY, {"NEW_RELIC_INFINITE_TRACING_SPAN_QUEUE_BYTE_SIZE": "invalid"}, 0),
+        (INI_FILE_EMPTY, {"NEW_RELIC_INFINITE_TRACING_SPAN_QUEUE_BYTE_SIZE": "5000000"}, 5000000),
+        (INI_FILE_INFINITE_TRACING, {"NEW_RELIC_INFINITE_TRACING_SPAN_QUEUE_BYTE_SIZE": "3000"}, 1000000),
+    ),
+)
+def test_infinite_tracing_span_queue_byte_size(ini, env, expected_size, global_settings):
+
+    settings = global_settings()
+    assert settings.infinite_tracing.span_queue_byte_size == expected_size
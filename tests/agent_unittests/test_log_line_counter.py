@@ -0,0 +1,83 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+import pytest
+
+from newrelic.core import log_line_counter
+from newrelic.core.log_line_counter import (
+    harvest_log_line_metrics,
+    log_line_metrics,
+    record_log_line,
+)
+
+
+@pytest.fixture(autouse=True)
+def discard_counts():
+    harvest_log_line_metrics()
+
+
+def test_log_line_metrics():
+    metrics = log_line_metrics({"INFO": 2, "ERROR": 1})
+
+    assert sorted(metrics) == [
+        ("Logging/lines", {"count": 3}),
+        ("Logging/lines/ERROR", {"count": 1}),
+        ("Logging/lines/INFO", {"count": 2}),
+    ]
+
+
+def test_harvest_log_line_metrics():
+    for level_name in ("INFO", "INFO", "WARNING"):
+        record_log_line(level_name)
+
+    assert sorted(harvest_log_line_metrics()) == [
+        ("Logging/lines", {"count": 3}),
+        ("Logging/lines/INFO", {"count": 2}),
+        ("Logging/lines/WARNING", {"count": 1}),
+    ]
+
+    # Only the lines counted since the last harvest are reported.
+    assert harvest_log_line_metrics() == []
+
+    record_log_line("INFO")
+
+    assert sorted(harvest_log_line_metrics()) == [
+        ("Logging/lines", {"count": 1}),
+        ("Logging/lines/INFO", {"count": 1}),
+    ]
+
+
+def test_harvest_log_line_metrics_threads():
+    def log_lines():
+        for _ in range(5):
+            record_log_line("ERROR")
+
+    threads = [threading.Thread(target=log_lines) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    record_log_line("ERROR")
+
+    assert sorted(harvest_log_line_metrics()) == [
+        ("Logging/lines", {"count": 21}),
+        ("Logging/lines/ERROR", {"count": 21}),
+    ]
+
+    # The counts of threads which have exited are dropped once reported.
+    current_counts = log_line_counter._local.counts
+    assert [counts for _, counts, _ in log_line_counter._thread_counts] == [current_counts]
@@ -0,0 +1,82 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+
+from newrelic.common.lru_cache import LRUCache
+
+
+def test_lru_cache_evicts_unused_entries():
+    cache = LRUCache(3)
+
+    for key in "abc":
+        cache.put(key, key.upper())
+
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+
+    # Entries used since being added are given a second chance, so only
+    # the one which wasn't is evicted.
+    cache.put("d", "D")
+    assert len(cache) == 3
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == ["A", "C", "D"]
+
+    # Once all entries have been used, the oldest is evicted.
+    cache.put("e", "E")
+    assert cache.get("c") is None
+    assert [cache.get(key) for key in "ade"] == ["A", "D", "E"]
+
+    assert cache.reset_counts() == (8, 2)
+    assert cache.reset_counts() == (0, 0)
+
+
+def test_lru_cache_replaces_value():
+    cache = LRUCache(2)
+
+    cache.put("a", 1)
+    cache.put("a", 2)
+
+    assert len(cache) == 1
+    assert cache.get("a") == 2
+
+
+def test_lru_cache_maximum():
+    cache = LRUCache(0)
+    cache.put("a", 1)
+    assert not len(cache)
+
+    # Lowering the maximum evicts as many entries as needed on the next
+    # addition.
+    cache.maximum = 4
+    for key in "abcd":
+        cache.put(key, key)
+
+    cache.maximum = 2
+    cache.put("e", "e")
+    assert len(cache) == 2
+    assert cache.get("e") == "e"
+
+    cache.clear()
+    assert not len(cache)
+
+
+def test_lru_cache_copy():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+
+    copied = copy.deepcopy(cache)
+
+    assert copied.maximum == 2
+    assert not len(copied)
@@ -0,0 +1,111 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import json
+import sys
+import time
+import zlib
+
+from newrelic.core.profile_sessions import (
+    MethodTable,
+    ProfileSession,
+    ProfileSessionManager,
+    SessionState,
+)
+
+
+def outer(sample):
+    return inner(sample)
+
+
+def inner(sample):
+    return sample(sys._getframe())
+
+
+def test_method_table_stack_ids():
+    table = MethodTable()
+
+    first = outer(lambda frame: table.stack_ids(frame, "OTHER"))
+    second = outer(lambda frame: table.stack_ids(frame, "OTHER"))
+
+    # The calls from this function are on different lines, but the ids
+    # for the methods called from there on are reused.
+    assert first[-4] != second[-4]
+    assert first[-3:] == second[-3:]
+    assert len(table.methods) == len(set(first) | set(second))
+
+    methods = [table.methods[method_id] for method_id in first]
+    assert [m[1] for m in methods[-4:]] == ["test_method_table_stack_ids", "outer", "inner", "inner"]
+
+    # The leaf node starts and stops on the line being executed.
+    filename, func_name, first_line, real_line = methods[-1]
+    assert filename == __file__.replace(".pyc", ".py")
+    assert first_line == real_line == inner.__code__.co_firstlineno + 1
+
+    filename, func_name, first_line, real_line = methods[-2]
+    assert first_line == inner.__code__.co_firstlineno
+    assert real_line == first_line + 1
+
+
+def test_profile_session_data():
+    session = ProfileSession(1, time.time())
+
+    for _ in range(3):
+        assert outer(lambda frame: session.add_stack_sample("REQUEST", frame))
+
+    session.state = SessionState.FINISHED
+    session.actual_stop_time_s = time.time()
+    profile = session.profile_data()[0]
+
+    assert profile[0] == 1
+    flat_tree = json.loads(zlib.decompress(base64.standard_b64decode(profile[4])).decode("utf-8"))
+
+    node = flat_tree["REQUEST"][0]
+    while node[3]:
+        assert node[1] == 3
+        node = node[3][0]
+
+    # Only the leaf node is flagged with an @ sign.
+    method_data, call_count, _, children = node
+    assert method_data[1] == "@inner#%d" % method_data[2]
+    assert call_count == 3
+
+    # The session data, including the method ids, is reset once reported.
+    assert session._method_table.methods == []
+
+
+def test_start_profile_session_while_profiler_thread_exits():
+    manager = ProfileSessionManager()
+
+    try:
+        assert manager.start_profile_session("app", 1, time.time() - 1.0, sample_period_s=60.0)
+        assert not manager.start_profile_session("app", 2, time.time() + 60.0)
+
+        # The profiler thread stops once the session has finished. A session
+        # started as it does so is only seen as running by one of the two,
+        # so the thread is either kept or started again.
+        with manager._lock:
+            thread = manager._profiler_thread
+            thread.join(0.1)
+            assert thread.is_alive()
+
+        thread.join()
+        assert [data[0][0] for data in manager.profile_data("app")] == [1]
+
+        assert manager.start_profile_session("app", 2, time.time() + 60.0, sample_period_s=60.0)
+        assert manager._profiler_thread is not thread
+        assert manager._profiler_thread.is_alive()
+    finally:
+        manager.shutdown("app")
@@ -0,0 +1,62 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from newrelic.core.rules_engine import RulesEngine
+
+RULES = [
+    {"match_expression": "^[0-9]+$", "replacement": "*", "each_segment": True, "eval_order": 1},
+    {"match_expression": "/ignore/", "replacement": "/ignore/", "ignore": True, "eval_order": 2},
+    {"match_expression": "(a)\\1", "replacement": "\\1", "replace_all": True, "eval_order": 3},
+    {"match_expression": "(?P<x>/b)(?P=x)", "replacement": "\\g<x>", "eval_order": 4},
+]
+
+
+@pytest.mark.parametrize(
+    "rules,name,expected",
+    (
+        (RULES[:2], "/users/123/orders/456", ("/users/*/orders/*", False)),
+        (RULES[:2], "/users/abc", ("/users/abc", False)),
+        (RULES[:2], "users/123", ("users/*", False)),
+        (RULES[:2], b"/users/\xe9", (u"/users/\xe9", False)),
+        (RULES[:2], "/ignore/123", ("/ignore/*", True)),
+        (RULES, "/aa/aaaa/b/b", ("/a/aa/b", False)),
+        (RULES, "/c", ("/c", False)),
+    ),
+)
+def test_rules_engine_normalize(rules, name, expected):
+    engine = RulesEngine(rules)
+
+    # The second call is answered from the cache.
+    assert engine.normalize(name) == expected
+    assert engine.normalize(name) == expected
+
+
+def test_rules_engine_cache():
+    engine = RulesEngine(RULES[:1], cache_size=2)
+    cache = engine._RulesEngine__cache
+
+    for name in ("/1", "/2", "/1", "/3", "/2"):
+        engine.normalize(name)
+
+    assert (cache.hits, cache.misses) == (1, 4)
+    assert len(cache) == 2
+
+
+def test_rules_engine_no_rules():
+    engine = RulesEngine([])
+
+    assert engine.normalize(b"/users/1") == (u"/users/1", False)
+    assert not len(engine._RulesEngine__cache)
@@ -0,0 +1,278 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+import random
+from heapq import heappop
+
+import pytest
+
+from newrelic.core.metric import ApdexMetric, TimeMetric
+from newrelic.core.stats_engine import (
+    ApdexStats,
+    CountStats,
+    MetricNameCache,
+    MetricTable,
+    SampledDataSet,
+    StatsEngine,
+    TimeStats,
+)
+from newrelic.core.config import global_settings
+
+
+def test_metric_table_time_metrics():
+    table = MetricTable()
+    expected = TimeStats(1, 2.0, 1.0, 2.0, 2.0, 4.0)
+
+    table.record_time_metric(("Function/foo", ""), 2.0, 1.0)
+    for duration in (0.5, 3.0):
+        table.record_time_metric(("Function/foo", ""), duration)
+        expected.merge_raw_time_metric(duration)
+
+    stats = table[("Function/foo", "")]
+    assert type(stats) is TimeStats  # pylint: disable=C0123
+    assert stats == expected
+    assert stats.call_count == 3
+    assert isinstance(stats.call_count, int)
+
+
+def test_metric_table_record_time_metrics_aggregated():
+    metrics = [
+        TimeMetric(name="Datastore/all", scope="", duration=1.0, exclusive=None),
+        TimeMetric(name="Function/foo", scope="WebTransaction/foo", duration=2.0, exclusive=1.5),
+        TimeMetric(name="Datastore/all", scope=None, duration=0.5, exclusive=0.25),
+        TimeMetric(name="Function/foo", scope="WebTransaction/foo", duration=0.0, exclusive=0.0),
+        TimeMetric(name="Datastore/all", scope="", duration=3.0, exclusive=None),
+    ]
+
+    aggregated = MetricTable()
+    aggregated.record_time_metric(("Datastore/all", ""), 0.25)
+    aggregated.record_time_metrics(iter(metrics))
+
+    sequential = MetricTable()
+    sequential.record_time_metric(("Datastore/all", ""), 0.25)
+    for metric in metrics:
+        sequential.record_time_metric((metric.name, metric.scope or ""), metric.duration, metric.exclusive)
+
+    assert dict(aggregated.items()) == dict(sequential.items())
+    assert aggregated[("Datastore/all", "")].call_count == 4
+
+
+def test_metric_table_apdex_metrics():
+    table = MetricTable()
+    expected = ApdexStats(apdex_t=0.5)
+
+    for metric in (
+        ApdexMetric("Apdex", satisfying=1, tolerating=0, frustrating=0, apdex_t=0.5),
+        ApdexMetric("Apdex", satisfying=0, tolerating=1, frustrating=0, apdex_t=0.25),
+    ):
+        table.record_apdex_metric(
+            ("Apdex", ""), metric.satisfying, metric.tolerating, metric.frustrating, metric.apdex_t
+        )
+        expected.merge_apdex_metric(metric)
+
+    stats = table[("Apdex", "")]
+    assert type(stats) is ApdexStats  # pylint: disable=C0123
+    assert stats == expected
+
+
+@pytest.mark.parametrize("overlapping", (True, False))
+def test_metric_table_merge_table(overlapping):
+    table = MetricTable()
+    table.merge_stats(("Count", ""), CountStats(call_count=2))
+    table.merge_stats(("Custom", ""), TimeStats(1, 3.0, 3.0, 3.0, 3.0, 9.0))
+
+    other = MetricTable()
+    if overlapping:
+        other.merge_stats(("Count", ""), CountStats(call_count=3))
+    other.merge_stats(("Other", ""), TimeStats(1, 1.0, 1.0, 1.0, 1.0, 1.0))
+
+    table.merge_table(other)
+
+    assert table[("Count", "")].call_count == (5 if overlapping else 2)
+    assert type(table[("Count", "")]) is CountStats  # pylint: disable=C0123
+    assert table[("Other", "")] == [1, 1.0, 1.0, 1.0, 1.0, 1.0]
+    assert len(table) == 3
+    assert sorted(table.keys()) == [("Count", ""), ("Custom", ""), ("Other", "")]
+
+
+def test_metric_table_merge_table_normalizer():
+    table = MetricTable()
+    table.record_time_metric(("Function/a", ""), 1.0)
+    table.record_time_metric(("Function/b", ""), 2.0)
+    table.record_time_metric(("Function/ignore", ""), 2.0)
+
+    def normalizer(name):
+        if name == "Function/ignore":
+            return name, True
+        return "Function/*", False
+
+    normalized = MetricTable()
+    normalized.merge_table(table, normalizer)
+
+    assert list(normalized.keys()) == [("Function/*", "")]
+    assert normalized[("Function/*", "")] == [2, 3.0, 3.0, 1.0, 2.0, 5.0]
+
+
+def test_metric_name_cache():
+    normalized = []
+
+    def normalizer(name):
+        normalized.append(name)
+        return name.upper(), name == "ignore"
+
+    cache = MetricNameCache(normalizer, maximum=2)
+
+    assert cache.normalize("a") == ("A", False)
+    assert cache.normalize("ignore") == ("IGNORE", True)
+    assert cache.normalize("a") == ("A", False)
+    assert normalized == ["a", "ignore"]
+
+    # The cache is cleared once it holds the maximum number of entries.
+    cache.normalize("b")
+    cache.normalize("a")
+    assert normalized == ["a", "ignore", "b", "a"]
+
+    key = cache.payload_key(("A", "scope"))
+    assert key == {"name": "A", "scope": "scope"}
+    assert cache.payload_key(("A", "scope")) is key
+
+
+@pytest.mark.parametrize("has_normalizer", (True, False))
+def test_metric_data_name_cache(has_normalizer):
+    engine = StatsEngine()
+    engine.reset_stats(global_settings())
+    engine.record_time_metric(TimeMetric(name="Function/a", scope="", duration=1.0, exclusive=None))
+    engine.record_time_metric(TimeMetric(name="Function/b", scope="", duration=2.0, exclusive=None))
+    engine.record_time_metric(TimeMetric(name="Function/ignore", scope="", duration=2.0, exclusive=None))
+
+    def normalizer(name):
+        if name == "Function/ignore":
+            return name, True
+        return "Function/*", False
+
+    normalizer = has_normalizer and normalizer or None
+    cache = MetricNameCache(normalizer)
+
+    def by_name(item):
+        return item[0]["name"]
+
+    expected = sorted(engine.metric_data(normalizer), key=by_name)
+    first = engine.metric_data(name_cache=cache)
+    second = engine.metric_data(name_cache=cache)
+
+    assert sorted(first, key=by_name) == expected
+    assert sorted(second, key=by_name) == expected
+
+    # The payload keys are reused from one harvest to the next.
+    assert all(a[0] is b[0] for a, b in zip(first, second))
+
+
+@pytest.mark.parametrize(
+    "capacity,num_existing,num_merged,priority",
+    (
+        (10, 3, 4, None),
+        (10, 3, 7, None),
+        (10, 3, 20, None),
+        (10, 15, 20, None),
+        (10, 15, 20, 0.5),
+        (10, 15, 0, None),
+        (0, 5, 5, None),
+        (10.5, 3, 20, None),
+    ),
+)
+def test_sampled_data_set_merge(capacity, num_existing, num_merged, priority):
+    priorities = random.sample(range(1000), num_existing + num_merged)
+    priorities = [p / 1000.0 for p in priorities]
+
+    data_set = SampledDataSet(capacity)
+    for sample_priority in priorities[:num_existing]:
+        data_set.add(sample_priority, sample_priority)
+
+    other = SampledDataSet(num_merged)
+    for sample_priority in priorities[num_existing:]:
+        other.add(sample_priority, sample_priority)
+    # Account for samples seen but not retained by the other data set.
+    other.num_seen += 3
+
+    data_set.merge(other, priority)
+
+    expected = priorities[:num_existing] + [max(priority or -1, p) for p in priorities[num_existing:]]
+    # Fractional capacities retain the next whole number of samples.
+    expected = sorted(expected, reverse=True)[: max(int(math.ceil(capacity)), 0)]
+
+    assert data_set.num_seen == num_existing + num_merged + 3
+    assert data_set.num_samples == len(expected)
+    assert data_set.heap == (capacity > 0 and len(expected) >= capacity)
+    assert sorted((p for p, _, _ in data_set.pq), reverse=True) == expected
+
+    # The queue must remain usable as a heap.
+    if data_set.heap:
+        data_set.add("sample", 2.0)
+        pq = list(data_set.pq)
+        popped = [heappop(pq)[0] for _ in range(len(pq))]
+        assert popped == sorted(popped)
+        assert popped[-1] == 2.0
+
+
+@pytest.mark.parametrize(
+    "priorities,expected",
+    (
+        ([0.5, 0.5, 0.5, 0.5, 0.5], ["first", 0, 1]),
+        ([0.75, 0.5, 0.5, 0.5, 0.25], ["first", 0, 1]),
+        ([0.25, 0.5, 0.5, 0.75, 0.5], ["first", 1, 3]),
+    ),
+)
+def test_sampled_data_set_merge_ties(priorities, expected):
+    data_set = SampledDataSet(3)
+    data_set.add("first", 0.5)
+
+    other = SampledDataSet(len(priorities))
+    for i, sample_priority in enumerate(priorities):
+        other.add(i, sample_priority)
+
+    data_set.merge(other)
+
+    # Between samples of equal priority, the ones seen first are kept, as
+    # add() only replaces a sample with one of strictly higher priority.
+    assert sorted((s for _, _, s in data_set.pq), key=str) == sorted(expected, key=str)
+    assert data_set.num_seen == len(priorities) + 1
+
+    # The queue must remain usable as a heap.
+    data_set.add("last", 0.6)
+    assert "last" in [s for _, _, s in data_set.pq]
+
+
+@pytest.mark.parametrize("num_merged", (3, 8))
+def test_sampled_data_set_merge_matches_add(num_merged):
+    # Whether the merged samples are pushed through the heap one at a time
+    # or selected from in bulk, the samples kept are those which add()
+    # would have kept had every sample been added in the order seen.
+    priorities = [(i * 7 % 4) / 4.0 for i in range(10 + num_merged)]
+
+    data_set = SampledDataSet(10)
+    expected = SampledDataSet(10)
+    other = SampledDataSet(num_merged)
+
+    for i, sample_priority in enumerate(priorities):
+        expected.add(i, sample_priority)
+        if i < 10:
+            data_set.add(i, sample_priority)
+        else:
+            other.add(i, sample_priority)
+
+    data_set.merge(other)
+
+    assert sorted(data_set.samples) == sorted(expected.samples)
+    assert data_set.num_seen == expected.num_seen
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import gc
 import threading
 
 import pytest
@@ -54,6 +55,22 @@ def test_trace_cache_methods(trace_cache):
     assert len(list(trace_cache.values())) == 1
 
 
+def test_trace_cache_get(trace_cache):
+    obj = DummyTrace()
+    default = DummyTrace()
+
+    assert trace_cache.get(1) is None
+    assert trace_cache.get(1, default) is default
+
+    trace_cache[1] = obj
+    assert trace_cache.get(1) is obj
+
+    # Once the trace has been garbage collected the default is returned.
+    del obj
+    gc.collect()
+    assert trace_cache.get(1, default) is default
+
+
 @pytest.fixture(scope="function")
 def iterate_trace_cache(trace_cache):
     def _iterate_trace_cache(shutdown):
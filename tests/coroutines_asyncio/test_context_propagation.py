@@ -426,3 +426,25 @@ def test_transaction_end_on_different_task(event_loop):
         await task
 
     event_loop.run_until_complete(test())
+
+
+def test_current_thread_id_outside_and_inside_task(event_loop):
+    import asyncio
+    import threading
+
+    from newrelic.core.trace_cache import current_task
+
+    cache = trace_cache()
+
+    # Outside of a running event loop there is no current task, so the
+    # thread ID is used.
+    assert current_task(asyncio) is None
+    assert cache.current_thread_id() == threading.current_thread().ident
+
+    async def _test():
+        return current_task(asyncio), cache.current_thread_id()
+
+    task, thread_id = event_loop.run_until_complete(_test())
+
+    assert task is not None
+    assert thread_id == id(task)
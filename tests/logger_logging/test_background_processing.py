@@ -0,0 +1,205 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import threading
+
+from testing_support.fixtures import (
+    override_application_settings,
+    override_generic_settings,
+    reset_core_stats_engine,
+)
+from testing_support.validators.validate_custom_metrics_outside_transaction import (
+    validate_custom_metrics_outside_transaction,
+)
+from testing_support.validators.validate_log_event_count import validate_log_event_count
+from testing_support.validators.validate_log_event_count_outside_transaction import (
+    validate_log_event_count_outside_transaction,
+)
+from testing_support.validators.validate_log_events_outside_transaction import (
+    validate_log_events_outside_transaction,
+)
+
+from newrelic.api.background_task import background_task
+from newrelic.api.time_trace import current_trace
+from newrelic.api.transaction import current_transaction
+from newrelic.core.config import global_settings
+from newrelic.core.log_event_buffer import drain_log_event_buffers
+from newrelic.hooks.logger_logging import _log_event_buffer
+
+_background_processing_settings = {
+    "application_logging.background_processing.enabled": True,
+    # Leave the draining to the tests rather than the background thread.
+    "application_logging.background_processing.interval": 60.0,
+}
+
+
+def background_processing(wrapped):
+    # Enable background processing for logging both inside and outside of
+    # transactions, which read the application and global settings.
+    wrapped = override_application_settings(_background_processing_settings)(wrapped)
+    return override_generic_settings(global_settings(), _background_processing_settings)(wrapped)
+
+
+def set_trace_ids():
+    txn = current_transaction()
+    if txn:
+        txn._trace_id = "abcdefgh12345678"
+    trace = current_trace()
+    if trace:
+        trace.guid = "abcdefgh"
+
+
+def exercise_logging(logger):
+    set_trace_ids()
+
+    logger.debug("A")
+    logger.info("B")
+    logger.warning("C")
+    logger.error("D %s", "arg")
+    logger.critical({"message": "E"})
+
+    assert len(logger.caplog.records) == 3
+
+
+_common_attributes_service_linking = {
+    "timestamp": None,
+    "hostname": None,
+    "entity.name": "Python Agent Test (logger_logging)",
+    "entity.guid": None,
+}
+_common_attributes_trace_linking = {"span.id": "abcdefgh", "trace.id": "abcdefgh12345678"}
+_common_attributes_trace_linking.update(_common_attributes_service_linking)
+
+_test_logging_events = [
+    {"message": "C", "level": "WARNING"},
+    {"message": "D arg", "level": "ERROR"},
+    {"message": "E", "level": "CRITICAL"},
+]
+_test_logging_inside_transaction_events = [
+    dict(event, **_common_attributes_trace_linking) for event in _test_logging_events
+]
+_test_logging_outside_transaction_events = [
+    dict(event, **_common_attributes_service_linking) for event in _test_logging_events
+]
+
+_test_logging_metrics = [
+    ("Logging/lines", 3),
+    ("Logging/lines/WARNING", 1),
+    ("Logging/lines/ERROR", 1),
+    ("Logging/lines/CRITICAL", 1),
+]
+
+
+@reset_core_stats_engine()
+def test_background_processing_inside_transaction(instrumented_logger):
+    @background_processing
+    @validate_log_event_count(0)
+    @background_task()
+    def _test():
+        exercise_logging(instrumented_logger)
+
+    @background_processing
+    @validate_log_events_outside_transaction(_test_logging_inside_transaction_events)
+    @validate_log_event_count_outside_transaction(3)
+    @validate_custom_metrics_outside_transaction(_test_logging_metrics)
+    def _drain():
+        drain_log_event_buffers()
+
+    # The log events are recorded when the buffered records are processed,
+    # rather than as part of the transaction, yet still link to its trace.
+    _test()
+    _drain()
+
+
+@reset_core_stats_engine()
+def test_background_processing_outside_transaction(instrumented_logger):
+    @background_processing
+    @validate_log_events_outside_transaction(_test_logging_outside_transaction_events)
+    @validate_log_event_count_outside_transaction(3)
+    @validate_custom_metrics_outside_transaction(_test_logging_metrics)
+    def _test():
+        exercise_logging(instrumented_logger)
+        drain_log_event_buffers()
+
+    _test()
+
+
+@reset_core_stats_engine()
+def test_background_processing_buffers_record_snapshot(instrumented_logger):
+    expected_events = [dict({"message": "F 1", "level": "ERROR"}, **_common_attributes_trace_linking)]
+
+    @background_processing
+    @validate_log_events_outside_transaction(expected_events)
+    @validate_log_event_count_outside_transaction(1)
+    def _test():
+        @background_task()
+        def _log():
+            set_trace_ids()
+            current_transaction()._priority = 1.5
+
+            instrumented_logger.error("F %s", 1)
+
+        _log()
+
+        # Only a copy of the attributes of the record is buffered, along
+        # with the ids and priority linking it to the transaction, rather
+        # than the transaction itself. The message is formatted later, and
+        # isn't affected by the decorating of the record once logged.
+        (entry,) = _log_event_buffer._local.buffer
+        level_name, (record_class, record_attrs), trace_id, span_id, priority = entry
+        assert (level_name, trace_id, span_id, priority) == ("ERROR", "abcdefgh12345678", "abcdefgh", 1.5)
+        assert record_class is logging.LogRecord
+        assert (record_attrs["msg"], record_attrs["args"]) == ("F %s", (1,))
+        assert "_nr_original_message" not in record_attrs
+
+        drain_log_event_buffers()
+
+    _test()
+
+
+@reset_core_stats_engine()
+def test_background_processing_multiple_threads(instrumented_logger):
+    @background_processing
+    @validate_log_event_count_outside_transaction(6)
+    def _test():
+        threads = [threading.Thread(target=exercise_logging, args=(instrumented_logger,)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        drain_log_event_buffers()
+
+    # Each thread logs into its own buffer, all of which are drained.
+    instrumented_logger.caplog.records = _ThreadSafeRecords()
+    _test()
+
+
+class _ThreadSafeRecords(list):
+    # exercise_logging() expects to see only the records from its own thread.
+    def __init__(self):
+        super(_ThreadSafeRecords, self).__init__()
+        self._local = threading.local()
+
+    def append(self, record):
+        self._thread_records().append(record)
+
+    def _thread_records(self):
+        if not hasattr(self._local, "records"):
+            self._local.records = []
+        return self._local.records
+
+    def __len__(self):
+        return len(self._thread_records())
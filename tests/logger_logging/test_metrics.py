@@ -13,7 +13,9 @@
 # limitations under the License.
 
 from newrelic.packages import six
+from newrelic.api.application import application_instance
 from newrelic.api.background_task import background_task
+from newrelic.core.log_line_counter import harvest_log_line_metrics
 from testing_support.fixtures import reset_core_stats_engine
 from testing_support.validators.validate_custom_metrics_outside_transaction import validate_custom_metrics_outside_transaction
 from testing_support.validators.validate_transaction_metrics import validate_transaction_metrics
@@ -56,4 +58,8 @@ def test_logging_metrics_outside_transaction(logger):
     def test():
         exercise_logging(logger)
 
+        # Log lines outside of a transaction are only counted, with the
+        # metrics being recorded against the application at harvest.
+        application_instance().record_custom_metrics(harvest_log_line_metrics())
+
     test()
@@ -12,10 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import random
 import sys
 
 import numpy as np
 import pandas
+import pytest
 from testing_support.fixtures import (
     override_application_settings,
     reset_core_stats_engine,
@@ -25,6 +27,8 @@ from testing_support.validators.validate_ml_event_count import validate_ml_event
 from testing_support.validators.validate_ml_events import validate_ml_events
 
 from newrelic.api.background_task import background_task
+from newrelic.api.transaction import current_transaction
+from newrelic.hooks import mlmodel_sklearn
 
 pandas_df_category_recorded_custom_events = [
     (
@@ -427,3 +431,91 @@ def test_custom_event_count_multilabel_output():
         clf.predict([x_train[-1]])
 
     _test()
+
+
+def _sampled_row_events(rows):
+    return [
+        (
+            {"type": "InferenceData"},
+            {
+                "inference_id": None,
+                "prediction_id": None,
+                "modelName": "ExtraTreeRegressor",
+                "model_version": "0.0.0",
+                "feature.0": row,
+                "feature.1": row,
+                "label.0": None,
+                "new_relic_data_schema_version": 2,
+            },
+        )
+        for row in rows
+    ]
+
+
+# The rows kept by the reservoir strategy with the random number generator
+# used by the hook seeded the same as in the test.
+_RESERVOIR_ROWS = tuple(sorted(random.Random(0).sample(range(5), 2)))
+
+
+@pytest.mark.parametrize(
+    "strategy,priority,expected_rows",
+    (
+        ("first", None, (0, 1)),
+        ("reservoir", 1.5, _RESERVOIR_ROWS),
+        (None, None, _RESERVOIR_ROWS),
+        (None, 1.5, (0, 1)),
+    ),
+)
+@reset_core_stats_engine()
+def test_inference_events_sampling(strategy, priority, expected_rows):
+    @override_application_settings(
+        {
+            "machine_learning.inference_events_sampling.max_rows": 2,
+            "machine_learning.inference_events_sampling.strategy": strategy,
+        }
+    )
+    @validate_ml_events(_sampled_row_events(expected_rows))
+    @validate_ml_event_count(count=2)
+    @background_task()
+    def _test():
+        import sklearn.tree
+
+        transaction = current_transaction()
+
+        clf = getattr(sklearn.tree, "ExtraTreeRegressor")(random_state=0)
+        model = clf.fit([[0, 0], [1, 1]], [0, 1])
+
+        # The priority is set once the model has been fitted, as it may be
+        # decided as the traces for fitting the model complete.
+        transaction._priority = priority
+
+        mlmodel_sklearn.random = random.Random(0)
+        try:
+            model.predict([[row, row] for row in range(5)])
+        finally:
+            mlmodel_sklearn.random = random
+
+        # Rows which were not sampled are still counted as seen.
+        assert transaction._ml_events.num_seen == 5
+
+    _test()
+
+
+@reset_core_stats_engine()
+def test_inference_events_limited_to_reservoir_capacity():
+    @validate_ml_event_count(count=3)
+    @background_task()
+    def _test():
+        import sklearn.tree
+
+        transaction = current_transaction()
+        transaction._ml_events.capacity = 3
+
+        clf = getattr(sklearn.tree, "ExtraTreeRegressor")(random_state=0)
+        model = clf.fit([[0, 0], [1, 1]], [0, 1])
+        model.predict([[row, row] for row in range(2)])
+        model.predict([[row, row] for row in range(5)])
+
+        assert transaction._ml_events.num_seen == 7
+
+    _test()
@@ -58,6 +58,7 @@ from newrelic.core.attribute_filter import (
     AttributeFilter,
 )
 from newrelic.core.config import apply_config_setting, flatten_settings, global_settings
+from newrelic.core.log_line_counter import harvest_log_line_metrics
 from newrelic.network.exceptions import RetryDataForRequest
 from newrelic.packages import six
 
@@ -1133,6 +1134,10 @@ def reset_core_stats_engine():
         custom_stats = core_application._stats_custom_engine
         custom_stats.reset_stats(custom_stats.settings)
 
+        # Discard log lines counted outside of transactions which would
+        # otherwise only be recorded at the next harvest.
+        harvest_log_line_metrics()
+
         return wrapped(*args, **kwargs)
 
     return _reset_core_stats_engine